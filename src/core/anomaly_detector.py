@@ -0,0 +1,258 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import argparse
+import joblib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+MODEL_DIR = os.path.join(BASE_DIR, 'models', 'anomaly')
+MODEL_PATH = os.path.join(MODEL_DIR, 'timesheet_model_latest.pkl')
+
+# Urutan kolom harus sama persis dengan saat training (train_anomaly.py)
+RAW_FEATURES = ['complexity', 'hist_avg', 'skill', 'duration']
+FEATURES = RAW_FEATURES + ['deviation_ratio']
+
+# Streaming (export bulanan): baris per chunk & jumlah worker
+CHUNK_ROWS = 100_000
+SNAPSHOT_CHUNKS = 20   # simpan snapshot baseline tiap N chunk (resume setelah restart)
+SCORE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Batch kecil (API / score_one) lewat evaluator array (forest_arrays.py); batch besar tetap sklearn
+FLAT_MAX_ROWS = 2_000
+
+class AnomalyDetector:
+    """Isolation Forest timesheet scorer: load once, score whole batches.
+
+    Labels follow sklearn (1 = normal, -1 = anomaly); `score` is the
+    decision_function value, negative for anomalies. With `flat` (default),
+    batches up to FLAT_MAX_ROWS use the flattened forest, which gives
+    identical scores without sklearn's per-call overhead.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, model=None, flat=True):
+        if model is None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"[ERR] Model not found at {model_path}. Run training script first.")
+            model = joblib.load(model_path)
+        self.model_path = model_path
+        self.model = model
+        # Model boleh pakai subset FEATURES (hasil sweep train_anomaly.py), urutan tetap dari model
+        self.columns = list(getattr(self.model, 'feature_names_in_', FEATURES))
+        if not set(self.columns) <= set(FEATURES):
+            raise ValueError(f"[ERR] Model expects {self.columns}, detector builds {FEATURES}.")
+        self.flat = None
+        if flat:
+            from forest_arrays import FlatForest
+            self.flat = FlatForest.from_model(self.model)
+
+    @classmethod
+    def from_registry(cls, ref="latest", registry=None, mmap=True):
+        """Detector for a registry version (alias or hash) of the timesheet model."""
+        import model_registry
+        reg = registry or model_registry.get_registry()
+        return cls(reg.path(model_registry.ANOMALY_MODEL, ref),
+                   model=reg.load(model_registry.ANOMALY_MODEL, ref, mmap=mmap))
+
+    def features(self, data):
+        """Feature frame for a DataFrame (raw columns) or an (n, 4) / (n, 5) array."""
+        if isinstance(data, pd.DataFrame):
+            X = data[RAW_FEATURES].to_numpy(dtype=float)
+            index = data.index
+        else:
+            X = np.atleast_2d(np.asarray(data, dtype=float))[:, :len(RAW_FEATURES)]
+            index = None
+        ratio = X[:, 3] / X[:, 1]   # deviation_ratio = duration / hist_avg
+        return pd.DataFrame(np.column_stack([X, ratio]), columns=FEATURES, index=index)
+
+    def score(self, data):
+        """Label + score per row from a single score_samples pass over the batch."""
+        X = self.features(data)
+        if self.flat is not None and len(X) <= FLAT_MAX_ROWS:
+            score = self.flat.decision_function(X[self.columns].to_numpy())
+        else:
+            score = self.model.score_samples(X[self.columns]) - self.model.offset_   # == decision_function
+        label = np.where(score < 0, -1, 1)                          # == predict
+        return pd.DataFrame({
+            'deviation_ratio': X['deviation_ratio'].to_numpy(),
+            'label': label,
+            'is_anomaly': label == -1,
+            'score': score,
+        }, index=X.index)
+
+    def score_with_baseline(self, data, baseline, update=True):
+        """Score entries carrying employee_id; hist_avg comes from a BaselineStore (see baseline_store.py)."""
+        from baseline_store import training_scale
+        enriched = baseline.enrich(data, update)
+        res = self.score(training_scale(enriched))
+        return pd.concat([enriched.drop(columns=[c for c in res.columns if c in enriched.columns]), res], axis=1)
+
+    def score_one(self, complexity, hist_avg, skill, duration):
+        row = self.score([[complexity, hist_avg, skill, duration]]).iloc[0]
+        return {"label": int(row['label']), "is_anomaly": bool(row['is_anomaly']),
+                "score": float(row['score']), "deviation_ratio": float(row['deviation_ratio'])}
+
+# ==========================================
+# STREAMING SCORING (file besar, memori terbatas)
+# ==========================================
+_DETECTOR = None   # 1 detector per worker process, model di-load sekali
+
+def _init_worker(model_path, n_jobs):
+    global _DETECTOR
+    _DETECTOR = AnomalyDetector(model_path, flat=False)   # chunk streaming selalu besar
+    if n_jobs is not None: _DETECTOR.model.n_jobs = n_jobs  # worker pool: 1 thread/proses, hindari oversubscription
+
+def _score_chunk(chunk, flagged_only=True, baseline=False):
+    if baseline:   # hist_avg dari BaselineStore -> skala training dulu (lihat baseline_store.training_scale)
+        from baseline_store import training_scale
+        res = _DETECTOR.score(training_scale(chunk))
+    else:
+        res = _DETECTOR.score(chunk)
+    cols = ['deviation_ratio', 'score', 'label']
+    # Export training/hasil scoring lama sudah punya label/deviation_ratio -> ditimpa, bukan diduplikasi
+    out = pd.concat([chunk.drop(columns=[c for c in cols if c in chunk.columns]), res[cols]], axis=1)
+    if flagged_only: out = out[res['is_anomaly'].to_numpy()]
+    return len(chunk), out
+
+def score_file(input_path, output_path, chunk_rows=CHUNK_ROWS, workers=None, flagged_only=True,
+               model_path=MODEL_PATH, progress=True, baseline_path=None):
+    """Score a timesheet CSV chunk by chunk and append results to `output_path`.
+
+    At most 2 chunks per worker are in flight, so memory is bounded by
+    chunk_rows x workers regardless of file size. Rows keep their input
+    order; with `flagged_only` only anomalies are written. With
+    `baseline_path`, hist_avg is taken from the per-employee baseline
+    snapshot (updated in this process, chunk by chunk, before scoring) and
+    the snapshot is saved every SNAPSHOT_CHUNKS chunks and at the end.
+    """
+    workers = workers or SCORE_WORKERS
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    stats = {"rows": 0, "flagged": 0, "chunks": 0}
+    start = time.perf_counter()
+
+    def write(result):
+        n, out = result
+        out.to_csv(tmp, mode='a' if stats['chunks'] else 'w', header=not stats['chunks'], index=False)
+        stats['rows'] += n
+        stats['flagged'] += int((out['label'] == -1).sum())
+        stats['chunks'] += 1
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"[INFO] chunk {stats['chunks']:>4} | rows {stats['rows']:>12,} | flagged {stats['flagged']:>10,} "
+                  f"| {stats['rows'] / max(elapsed, 1e-9):>10,.0f} rows/s", flush=True)
+
+    reader = pd.read_csv(input_path, chunksize=chunk_rows)
+    if baseline_path:
+        from baseline_store import BaselineStore
+        store = BaselineStore.open(baseline_path)
+
+        def enriched(chunks):
+            for i, chunk in enumerate(chunks, 1):
+                yield store.enrich(chunk)
+                if i % SNAPSHOT_CHUNKS == 0: store.save(baseline_path)
+            store.save(baseline_path)
+        reader = enriched(reader)
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path, 1)) as pool:
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(_score_chunk, chunk, flagged_only, bool(baseline_path)))
+                    if len(pending) >= 2 * workers: write(pending.popleft().result())
+                while pending: write(pending.popleft().result())   # urutan chunk tetap
+        else:
+            _init_worker(model_path, None)
+            for chunk in reader: write(_score_chunk(chunk, flagged_only, bool(baseline_path)))
+
+        if stats['chunks'] == 0: raise ValueError(f"[ERR] No rows in {input_path}")
+        os.replace(tmp, output_path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)   # output lama tetap utuh, tidak ada .tmp yatim
+        raise
+    stats["elapsed_s"] = time.perf_counter() - start
+    stats["rows_per_s"] = stats['rows'] / max(stats['elapsed_s'], 1e-9)
+    print(f"[SUCCESS] {stats['rows']:,} rows scored, {stats['flagged']:,} flagged in {stats['elapsed_s']:.1f}s "
+          f"({stats['rows_per_s']:,.0f} rows/s) -> {output_path}")
+    return stats
+
+def random_timesheets(n, seed=42, employees=1_000):
+    """Plausible timesheet rows (normal pace with some mark-ups) for benchmarking."""
+    rng = np.random.default_rng(seed)
+    complexity = rng.integers(1, 6, n)
+    hist_avg = complexity * 2.0
+    return pd.DataFrame({
+        'complexity': complexity,
+        'hist_avg': hist_avg,
+        'skill': rng.integers(1, 4, n),
+        'duration': hist_avg * rng.uniform(0.7, 2.5, n),
+        'employee_id': rng.integers(0, employees, n),
+    })
+
+def benchmark(n=20000, per_row_n=500, detector=None, seed=42):
+    """Rows/second of batch scoring vs the old one-row-DataFrame predict + decision_function path."""
+    det = detector or AnomalyDetector()
+    data = random_timesheets(n, seed)
+
+    start = time.perf_counter()
+    batch = det.score(data)
+    batch_s = time.perf_counter() - start
+
+    # Jalur lama: DataFrame 1 baris, predict + decision_function per entry
+    sample = data.head(per_row_n)
+    labels, scores = [], []
+    start = time.perf_counter()
+    for row in sample.itertuples(index=False):
+        X = pd.DataFrame([[row.complexity, row.hist_avg, row.skill, row.duration, row.duration / row.hist_avg]],
+                         columns=FEATURES)
+        labels.append(det.model.predict(X)[0])
+        scores.append(det.model.decision_function(X)[0])
+    row_s = time.perf_counter() - start
+
+    same = (np.array_equal(batch['label'].to_numpy()[:len(sample)], labels) and
+            np.allclose(batch['score'].to_numpy()[:len(sample)], scores, rtol=0, atol=1e-12))
+    res = {
+        "rows": n,
+        "batch_rows_per_s": n / batch_s,
+        "per_row_rows_per_s": len(sample) / row_s,
+        "speedup": (n / batch_s) / (len(sample) / row_s),
+        "identical": same,
+        "anomaly_rate": float(batch['is_anomaly'].mean()),
+    }
+    print(f"[INFO] Batch  : {res['batch_rows_per_s']:>12,.0f} rows/s ({n:,} rows)")
+    print(f"[INFO] Per-row: {res['per_row_rows_per_s']:>12,.0f} rows/s ({len(sample):,} rows)")
+    print(f"[INFO] Speedup: {res['speedup']:.0f}x | identical results: {same} | "
+          f"anomaly rate {res['anomaly_rate']*100:.1f}%")
+    return res
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Timesheet anomaly scoring")
+    sub = parser.add_subparsers(dest="command")
+    p = sub.add_parser("score", help="stream-score a CSV export (nightly batch)")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--all", action="store_true", help="write every row, not only anomalies")
+    p.add_argument("--model", default=MODEL_PATH)
+    p.add_argument("--quiet", action="store_true", help="no per-chunk progress")
+    p.add_argument("--baseline", default=None, metavar="SNAPSHOT",
+                   help="take hist_avg from per-employee history (input needs employee_id)")
+    b = sub.add_parser("bench", help="batch vs per-row throughput")
+    b.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if args.command == "score":
+        score_file(args.input, args.output, args.chunk_rows, args.workers, not args.all,
+                   args.model, progress=not args.quiet, baseline_path=args.baseline)
+    else:
+        benchmark(getattr(args, 'rows', 20000))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import pandas as pd
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from data_store import write_frame, read_frame, CACHE_FORMAT
+from engines import make_engine, DEFAULT_ENGINE
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+CACHE_DIR = os.path.join(BASE_DIR, 'datasets', 'cache', 'backtest')
+
+INITIAL = '730 days'
+PERIOD = '180 days'
+HORIZON = '30 days'
+BACKTEST_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+def make_cutoffs(ds, initial=INITIAL, period=PERIOD, horizon=HORIZON):
+    """Cutoffs anchored at the first date, so existing ones stay put as history grows.
+
+    (prophet's cross_validation anchors at the last date, which shifts every
+    cutoff - and invalidates every cached fold - each time a day is appended.)
+    """
+    ds = pd.to_datetime(ds)
+    first = ds.min() + pd.Timedelta(initial)
+    last = ds.max() - pd.Timedelta(horizon)
+    if first > last:
+        raise ValueError(f"[ERR] Less data than initial + horizon ({initial} + {horizon}).")
+    return list(pd.date_range(first, last, freq=pd.Timedelta(period)))
+
+def _frame_hash(df, cols):
+    if df is None or df.empty: return "none"
+    h = pd.util.hash_pandas_object(df[cols].astype({c: str for c in cols if df[c].dtype.name == 'category'}),
+                                   index=False)
+    return hashlib.sha1(h.values.tobytes()).hexdigest()
+
+def fold_key(df, holidays, params, cutoff, horizon, engine=DEFAULT_ENGINE):
+    """Cache key: data seen by the fold (train + eval window), engine, params, cutoff."""
+    window = df[df['ds'] <= cutoff + pd.Timedelta(horizon)]
+    payload = json.dumps({
+        "engine": engine,
+        "data": _frame_hash(window, ['ds', 'y', 'headcount']),
+        "holidays": _frame_hash(holidays, ['holiday', 'ds', 'lower_window', 'upper_window']),
+        "params": params,
+        "cutoff": cutoff.isoformat(),
+        "horizon": horizon,
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def run_fold(df, holidays, params, cutoff, horizon, engine=DEFAULT_ENGINE):
+    """Fit on ds <= cutoff and predict (cutoff, cutoff + horizon] - one CV fold."""
+    train_df = df[df['ds'] <= cutoff]
+    test_df = df[(df['ds'] > cutoff) & (df['ds'] <= cutoff + pd.Timedelta(horizon))]
+    model = make_engine(engine).fit(train_df, holidays, params=params, verbose=False)
+    fc = model.predict(test_df[['ds', 'headcount']])
+
+    out = fc[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].copy()
+    out['y'] = test_df['y'].to_numpy()
+    out['cutoff'] = cutoff
+    return out
+
+def _run_fold_task(task):
+    return run_fold(*task)
+
+def run_backtest(pid, df, holidays, params=None, initial=INITIAL, period=PERIOD,
+                 horizon=HORIZON, workers=None, cache_dir=CACHE_DIR, engine=DEFAULT_ENGINE):
+    """[F7] Rolling-origin backtest; only folds not already cached are fitted."""
+    from forecast_engine import MODEL_PARAMS, tuned_params
+
+    start = time.perf_counter()
+    df = df.assign(ds=pd.to_datetime(df['ds'])).sort_values('ds')
+    # Param Prophet hanya relevan untuk engine prophet
+    # (termasuk hasil tuning, supaya fold di-cache ulang kalau best params berubah)
+    params = {**MODEL_PARAMS, **tuned_params(pid), **(params or {})} if engine == "prophet" else dict(params or {})
+    workers = workers or BACKTEST_WORKERS
+
+    ext = "parquet" if CACHE_FORMAT == "parquet" else "pkl"
+    proj_dir = os.path.join(cache_dir, pid)
+    os.makedirs(proj_dir, exist_ok=True)
+
+    folds, missing = {}, []
+    for cutoff in make_cutoffs(df['ds'], initial, period, horizon):
+        path = os.path.join(proj_dir, f"{fold_key(df, holidays, params, cutoff, horizon, engine)}.{ext}")
+        if os.path.exists(path): folds[cutoff] = read_frame(path)
+        else: missing.append((cutoff, path))
+
+    tasks = [(df, holidays, params, cutoff, horizon, engine) for cutoff, _ in missing]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_run_fold_task, tasks))
+    else:
+        results = [_run_fold_task(t) for t in tasks]
+
+    for (cutoff, path), fold in zip(missing, results):
+        write_frame(fold, path)
+        folds[cutoff] = fold
+
+    from prophet.diagnostics import performance_metrics
+
+    cv = pd.concat([folds[c] for c in sorted(folds)], ignore_index=True)
+    metrics = performance_metrics(cv, rolling_window=0)  # 1 baris per horizon (hari)
+    return {
+        "cv": cv,
+        "metrics": metrics,
+        "mape": float(metrics['mape'].mean() * 100) if 'mape' in metrics else float('nan'),
+        "rmse": float(metrics['rmse'].mean()),
+        "folds": len(folds),
+        "cached": len(folds) - len(missing),
+        "computed": len(missing),
+        "elapsed_s": time.perf_counter() - start,
+    }
+
+if __name__ == "__main__":
+    from forecast_engine import PROJECT_CONFIGS, get_data
+
+    for pid in PROJECT_CONFIGS:
+        df, holidays = get_data(pid)
+        bt = run_backtest(pid, df, holidays)
+        print(f"{pid:<12} | MAPE {bt['mape']:6.2f}% | RMSE {bt['rmse']:,.0f} | "
+              f"folds {bt['folds']} ({bt['cached']} cached, {bt['computed']} new) | {bt['elapsed_s']:.2f}s")
@@ -0,0 +1,360 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+SNAPSHOT_PATH = os.path.join(BASE_DIR, 'datasets', 'cache', 'anomaly', 'baseline_snapshot.npz')
+
+WINDOW = 32           # jumlah entry terakhir per key untuk quantile "recent"
+MIN_COUNT = 5         # minimal histori sebelum baseline karyawan dipakai
+PRIOR_HOURS = 2.0     # fallback lama: hist_avg = complexity * 2.0 (sama dengan training)
+ALL = None            # key agregat per complexity; employee id selalu str, jadi tidak bisa bentrok
+QUANTILES = (0.5, 0.9)
+SNAPSHOT_VERSION = 2  # v2: key agregat disimpan lewat kolom `aggregate`, bukan employee "*"
+
+def valid_entries(employees, complexities, durations=None):
+    """Mask of entries that can be keyed (and learned): no missing id, complexity or duration."""
+    bad = pd.isna(np.asarray(employees, dtype=object)) | pd.isna(np.asarray(complexities, dtype=float))
+    if durations is not None: bad |= pd.isna(np.asarray(durations, dtype=float))
+    return ~bad
+
+class BaselineStore:
+    """Rolling duration statistics per (employee, complexity), updated in O(1).
+
+    Each key keeps count/mean/M2 (Welford; batches merged with Chan's
+    formula) plus a ring buffer of the last WINDOW durations for recent
+    quantiles, in preallocated numpy columns (~170 bytes per key). Every
+    update also feeds the (ALL, complexity) aggregate used as fallback for
+    employees with little history.
+    """
+
+    def __init__(self, window=WINDOW, capacity=1024):
+        self.window = window
+        self.index = {}     # (employee, complexity) -> baris
+        self.keys = []
+        self.updates = 0
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.mean = np.zeros(capacity)
+        self.m2 = np.zeros(capacity)
+        self.recent = np.full((capacity, self.window), np.nan, dtype=np.float32)
+        self.pos = np.zeros(capacity, dtype=np.int64)   # total tulis -> slot = pos % window
+
+    def _grow(self, needed):
+        capacity = len(self.count)
+        if needed <= capacity: return
+        while capacity < needed: capacity *= 2
+        old = (self.count, self.mean, self.m2, self.recent, self.pos)
+        self._alloc(capacity)
+        for new, arr in zip((self.count, self.mean, self.m2, self.recent, self.pos), old):
+            new[:len(arr)] = arr
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _row(self, key, create=True):
+        row = self.index.get(key)
+        if row is None and create:
+            row = len(self.keys)
+            self._grow(row + 1)
+            self.index[key] = row
+            self.keys.append(key)
+        return row
+
+    def _rows(self, employees, complexities, create=True):
+        """Row per entry; dict lookups only once per distinct key in the batch.
+
+        `employees=ALL` gives the complexity aggregate rows. Entries must be
+        valid (see valid_entries): factorize codes a missing id as -1, which
+        would index the last employee's row.
+        """
+        if not len(complexities): return np.zeros(0, dtype=np.int64)
+        if not valid_entries(np.zeros(len(complexities)) if employees is ALL else employees, complexities).all():
+            raise ValueError("[ERR] Entries without employee_id/complexity cannot be keyed")
+        complexities = np.asarray(complexities).astype(np.int64)
+        if employees is ALL:
+            codes, uniq = pd.factorize(complexities)
+            keys = [(ALL, int(c)) for c in uniq]
+            rows = np.array([self._row(k) if create else self.index.get(k, -1) for k in keys], dtype=np.int64)
+            return rows[codes]
+        emp_codes, emp_uniq = pd.factorize(np.asarray(employees))
+        low = complexities.min()
+        span = complexities.max() - low + 1
+        codes, uniq = pd.factorize(emp_codes.astype(np.int64) * span + (complexities - low))
+        keys = zip((str(e) for e in emp_uniq[uniq // span]), (uniq % span + low).tolist())
+        rows = np.array([self._row(k) if create else self.index.get(k, -1) for k in keys], dtype=np.int64)
+        return rows[codes]
+
+    # --- Update ---
+    def update(self, employee, complexity, duration):
+        """Add one timesheet entry (employee key + complexity aggregate)."""
+        if not valid_entries([employee], [complexity], [duration])[0]:
+            print(f"[ERR] Skipped entry without employee_id/complexity/duration: {employee!r}, {complexity!r}")
+            return
+        x = float(duration)
+        for key in ((str(employee), int(complexity)), (ALL, int(complexity))):
+            r = self._row(key)
+            self.count[r] += 1
+            delta = x - self.mean[r]
+            self.mean[r] += delta / self.count[r]
+            self.m2[r] += delta * (x - self.mean[r])
+            self.recent[r, self.pos[r] % self.window] = x
+            self.pos[r] += 1
+        self.updates += 1
+
+    def update_batch(self, employees, complexities, durations):
+        """Vectorized equivalent of update() over arrays, in input order."""
+        durations = np.asarray(durations, dtype=float)
+        valid = valid_entries(employees, complexities, durations)
+        if not valid.all():
+            print(f"[ERR] Skipped {int((~valid).sum())} entries without employee_id/complexity/duration")
+            employees, complexities = np.asarray(employees)[valid], np.asarray(complexities)[valid]
+            durations = durations[valid]
+        if not len(durations): return
+        complexities = np.asarray(complexities).astype(int)
+        rows = np.concatenate([self._rows(employees, complexities), self._rows(ALL, complexities)])
+        values = np.concatenate([durations, durations])
+
+        # Statistik batch per key lalu merge (Chan et al.)
+        touched, local = np.unique(rows, return_inverse=True)
+        n_b = np.bincount(local)
+        mean_b = np.bincount(local, weights=values) / n_b
+        m2_b = np.bincount(local, weights=(values - mean_b[local]) ** 2)
+        n_a, mean_a = self.count[touched], self.mean[touched]
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self.mean[touched] = mean_a + delta * n_b / n
+        self.m2[touched] += m2_b + delta ** 2 * n_a * n_b / n
+        self.count[touched] = n
+
+        # Ring buffer: hanya WINDOW nilai terakhir per key yang ditulis
+        order = np.argsort(local, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(n_b)[:-1]])
+        seq = np.empty(len(order), dtype=np.int64)
+        seq[order] = np.arange(len(order)) - np.repeat(starts, n_b)
+        keep = seq >= (n_b[local] - self.window)
+        slot = (self.pos[rows] + seq) % self.window
+        self.recent[rows[keep], slot[keep]] = values[keep]
+        self.pos[touched] += n_b
+        self.updates += len(durations)
+
+    # --- Lookup ---
+    def stats(self, rows):
+        """count, mean, std and recent quantiles for store rows (-1 = unknown key)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        known = rows >= 0
+        r = np.where(known, rows, 0)
+        count = np.where(known, self.count[r], 0)
+        out = {"count": count,
+               "mean": np.where(count > 0, self.mean[r], np.nan),
+               "std": np.where(count > 1, np.sqrt(self.m2[r] / np.maximum(count - 1, 1)), np.nan)}
+
+        uniq, inverse = np.unique(r[known], return_inverse=True)
+        window = np.sort(self.recent[uniq].astype(float), axis=1)   # NaN (slot kosong) di ujung
+        filled = (~np.isnan(window)).sum(axis=1)
+        take = lambda i: np.take_along_axis(window, i[:, None], axis=1)[:, 0]
+        for q in QUANTILES:
+            # Interpolasi linear seperti np.quantile, tapi vectorized untuk semua key sekaligus
+            at = q * np.maximum(filled - 1, 0)
+            lo = np.floor(at).astype(np.int64)
+            hi = np.minimum(lo + 1, np.maximum(filled - 1, 0))
+            values = np.where(filled > 0, take(lo) + (take(hi) - take(lo)) * (at - lo), np.nan)
+            out[f"p{int(q * 100)}"] = np.full(len(rows), np.nan)
+            out[f"p{int(q * 100)}"][known] = values[inverse]
+        return pd.DataFrame(out)
+
+    def lookup(self, employees, complexities, min_count=MIN_COUNT):
+        """Baseline per entry: employee history, else complexity aggregate, else the static prior."""
+        complexities = np.asarray(complexities).astype(int)
+        own = self.stats(self._rows(employees, complexities, create=False))
+        agg = self.stats(self._rows(ALL, complexities, create=False))
+
+        use_own = own['count'].to_numpy() >= min_count
+        use_agg = ~use_own & (agg['count'].to_numpy() >= min_count)
+        res = pd.DataFrame({c: np.where(use_own, own[c], agg[c]) for c in own}).add_prefix('baseline_')
+        res.loc[~use_own & ~use_agg, ['baseline_mean', 'baseline_std', 'baseline_p50', 'baseline_p90']] = np.nan
+        res['hist_avg'] = np.where(use_own | use_agg, res['baseline_mean'], complexities * PRIOR_HOURS)
+        res['baseline_source'] = np.select([use_own, use_agg], ['employee', 'complexity'], 'prior')
+        return res
+
+    def enrich(self, df, update=True, min_count=MIN_COUNT):
+        """Fill hist_avg (+ baseline_* columns) from history as of *before* this batch, then learn it.
+
+        Entries in the same batch do not see each other, so a burst of
+        marked-up entries cannot raise its own baseline before scoring.
+        Rows without employee_id/complexity/duration are dropped ([ERR]).
+        """
+        valid = valid_entries(df['employee_id'], df['complexity'], df['duration'])
+        if not valid.all():
+            print(f"[ERR] Dropped {int((~valid).sum())} entries without employee_id/complexity/duration")
+            df = df[valid]
+        base = self.lookup(df['employee_id'], df['complexity'], min_count)
+        base.index = df.index
+        out = df.drop(columns=[c for c in base.columns if c in df.columns]).join(base)
+        if update: self.update_batch(df['employee_id'], df['complexity'], df['duration'])
+        return out
+
+    # --- Snapshot ---
+    def save(self, path=SNAPSHOT_PATH):
+        """Atomic uncompressed .npz snapshot of the used rows."""
+        n = len(self.keys)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp,
+                 employee=np.array(["" if k[0] is ALL else k[0] for k in self.keys], dtype=str),
+                 aggregate=np.array([k[0] is ALL for k in self.keys], dtype=bool),
+                 complexity=np.array([k[1] for k in self.keys], dtype=np.int64),
+                 count=self.count[:n], mean=self.mean[:n], m2=self.m2[:n],
+                 recent=self.recent[:n], pos=self.pos[:n],
+                 meta=np.array(json.dumps({"version": SNAPSHOT_VERSION, "window": self.window,
+                                           "updates": self.updates,
+                                           "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")})))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        with np.load(path) as snap:
+            meta = json.loads(str(snap['meta']))
+            if meta.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"[ERR] Snapshot version {meta.get('version')} != {SNAPSHOT_VERSION}: {path}")
+            n = len(snap['count'])
+            store = cls(meta['window'], capacity=max(1024, n))
+            employees = [ALL if agg else e for e, agg in zip(snap['employee'].tolist(), snap['aggregate'].tolist())]
+            store.keys = list(zip(employees, snap['complexity'].tolist()))
+            store.index = {k: i for i, k in enumerate(store.keys)}
+            for name in ('count', 'mean', 'm2', 'recent', 'pos'):
+                getattr(store, name)[:n] = snap[name]
+        store.updates = meta['updates']
+        return store
+
+    @classmethod
+    def open(cls, path=SNAPSHOT_PATH, window=WINDOW):
+        """Resume from the snapshot if there is one, else start empty."""
+        if os.path.exists(path): return cls.load(path)
+        return cls(window)
+
+    def nbytes(self):
+        n = len(self.keys)
+        return sum(arr[:n].nbytes for arr in (self.count, self.mean, self.m2, self.recent, self.pos))
+
+def training_scale(df):
+    """Enriched entries re-expressed on the scale the detector was trained on.
+
+    The Isolation Forest only ever saw hist_avg = complexity * PRIOR_HOURS
+    (train_anomaly.py); feeding it a personal mean such as 3.1 h puts the
+    row outside that distribution and inflates the anomaly rate. Instead
+    hist_avg is set back to the task-level value and duration is scaled by
+    the same factor, so deviation_ratio (duration vs the baseline) is kept.
+    Drop this once the model is retrained on baseline-derived hist_avg.
+    """
+    prior = df['complexity'].to_numpy(dtype=float) * PRIOR_HOURS
+    hist_avg = df['hist_avg'].to_numpy(dtype=float)
+    # hist_avg 0/NaN: tidak ada skala personal -> duration apa adanya (sama dengan fallback prior)
+    scale = np.divide(prior, hist_avg, out=np.ones_like(prior), where=hist_avg > 0)
+    return df.assign(hist_avg=prior, duration=df['duration'].to_numpy(dtype=float) * scale)
+
+# ==========================================
+# BUILD / BENCHMARK
+# ==========================================
+def replay(csv_path, store=None, chunk_rows=100_000, snapshot_path=SNAPSHOT_PATH):
+    """Feed a timesheet export (employee_id, complexity, duration) into the store, then snapshot."""
+    store = store or BaselineStore.open(snapshot_path)
+    start = time.perf_counter()
+    rows = 0
+    for chunk in pd.read_csv(csv_path, usecols=['employee_id', 'complexity', 'duration'], chunksize=chunk_rows):
+        store.update_batch(chunk['employee_id'], chunk['complexity'], chunk['duration'])
+        rows += len(chunk)
+    elapsed = time.perf_counter() - start
+    path = store.save(snapshot_path)
+    print(f"[SUCCESS] {rows:,} entries in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f}/s), "
+          f"{len(store):,} keys ({store.nbytes() / 1e6:.2f} MB) -> {path}")
+    return store
+
+def benchmark(n=200_000, employees=5_000, seed=42):
+    """Updates/s of single vs batched updates, agreement between the two, snapshot round-trip."""
+    from anomaly_detector import random_timesheets
+    data = random_timesheets(n, seed, employees)
+
+    single = BaselineStore()
+    sample = data.head(min(n, 50_000))
+    start = time.perf_counter()
+    for row in sample.itertuples(index=False):
+        single.update(row.employee_id, row.complexity, row.duration)
+    single_s = time.perf_counter() - start
+
+    batch = BaselineStore()
+    start = time.perf_counter()
+    batch.update_batch(data['employee_id'], data['complexity'], data['duration'])
+    batch_s = time.perf_counter() - start
+
+    check = BaselineStore()
+    check.update_batch(sample['employee_id'], sample['complexity'], sample['duration'])
+    a = single.lookup(sample['employee_id'], sample['complexity'])
+    b = check.lookup(sample['employee_id'], sample['complexity'])
+    same = (np.allclose(a['hist_avg'], b['hist_avg']) and
+            np.allclose(a['baseline_std'], b['baseline_std'], equal_nan=True) and
+            np.allclose(a['baseline_p90'], b['baseline_p90'], equal_nan=True))
+
+    with tempfile.TemporaryDirectory(prefix="baseline_bench_") as tmp_dir:
+        tmp = os.path.join(tmp_dir, "snapshot.npz")
+        start = time.perf_counter()
+        batch.save(tmp)
+        restored = BaselineStore.load(tmp)
+        snap_s = time.perf_counter() - start
+        size = os.path.getsize(tmp)
+    keys = data[['employee_id', 'complexity']]
+    restored_ok = restored.lookup(keys['employee_id'], keys['complexity']).equals(
+        batch.lookup(keys['employee_id'], keys['complexity']))
+
+    start = time.perf_counter()
+    batch.lookup(data['employee_id'], data['complexity'])
+    lookup_s = time.perf_counter() - start
+
+    res = {"single_updates_s": len(sample) / single_s, "batch_updates_s": n / batch_s,
+           "lookups_s": n / lookup_s, "keys": len(batch), "bytes_per_key": batch.nbytes() / len(batch),
+           "snapshot_mb": size / 1e6, "snapshot_roundtrip_s": snap_s,
+           "single_matches_batch": bool(same), "restored_identical": bool(restored_ok)}
+    print(f"[INFO] single update : {res['single_updates_s']:>12,.0f} /s")
+    print(f"[INFO] batch update  : {res['batch_updates_s']:>12,.0f} /s ({n:,} entries)")
+    print(f"[INFO] lookup        : {res['lookups_s']:>12,.0f} /s")
+    print(f"[INFO] {res['keys']:,} keys x {res['bytes_per_key']:.0f} B | snapshot {res['snapshot_mb']:.2f} MB, "
+          f"save+load {snap_s * 1000:.0f} ms")
+    print(f"[QC] single == batch: {same} | restored == live: {restored_ok}")
+    return res
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-employee timesheet baselines")
+    sub = parser.add_subparsers(dest="command", required=True)
+    r = sub.add_parser("replay", help="feed a timesheet CSV into the snapshot")
+    r.add_argument("input")
+    r.add_argument("--snapshot", default=SNAPSHOT_PATH)
+    s = sub.add_parser("show", help="baseline of one employee per complexity")
+    s.add_argument("employee")
+    s.add_argument("--snapshot", default=SNAPSHOT_PATH)
+    b = sub.add_parser("bench", help="update/lookup throughput")
+    b.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "replay":
+        replay(args.input, snapshot_path=args.snapshot)
+    elif args.command == "show":
+        store = BaselineStore.load(args.snapshot)
+        levels = np.arange(1, 6)
+        res = store.lookup(np.full(len(levels), args.employee), levels)
+        res.insert(0, 'complexity', levels)
+        print(res.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    else:
+        benchmark(args.rows)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
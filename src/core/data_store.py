@@ -0,0 +1,218 @@
+import pandas as pd
+import os
+import json
+import time
+import hashlib
+import importlib.util
+
+# Parquet (columnar) kalau pyarrow tersedia, fallback ke pickle per partisi
+CACHE_FORMAT = "parquet" if importlib.util.find_spec("pyarrow") else "pickle"
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+DATA_PATH = os.path.join(BASE_DIR, 'datasets', 'synthetic', 'multi_project_costs.csv')
+EVENTS_PATH = os.path.join(BASE_DIR, 'datasets', 'synthetic', 'multi_project_events.csv')
+CACHE_DIR = os.path.join(BASE_DIR, 'datasets', 'cache', 'forecasting')
+
+MANIFEST = "manifest.json"
+CACHE_VERSION = 1
+
+# Dtype kompak: project_id/holiday categorical, window & headcount int kecil
+COST_DTYPES = {'project_id': 'category', 'y': 'int64', 'cap': 'int64', 'headcount': 'int16'}
+EVENT_DTYPES = {'project_id': 'category', 'holiday': 'category',
+                'lower_window': 'int16', 'upper_window': 'int16'}
+
+def _file_hash(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _signature(path):
+    if not os.path.exists(path): return None
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def write_frame(df, path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if CACHE_FORMAT == "parquet": df.to_parquet(tmp, index=False)
+    else: df.to_pickle(tmp)
+    os.replace(tmp, path)  # atomic, aman kalau beberapa worker build bersamaan
+
+def read_frame(path):
+    if CACHE_FORMAT == "parquet": return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+class CostStore:
+    """Per-project partitioned cache of the cost/event CSVs.
+
+    The CSVs are parsed once into one file per project; the cache is rebuilt
+    whenever a source file's content hash changes (mtime/size are only used
+    as a cheap first check).
+    """
+
+    def __init__(self, data_path=DATA_PATH, events_path=EVENTS_PATH, cache_dir=CACHE_DIR):
+        self.data_path = data_path
+        self.events_path = events_path
+        self.cache_dir = cache_dir
+        self._manifest = None
+        self._checked_sig = None
+
+    # --- Manifest ---
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path()) as f: return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f: json.dump(manifest, f, indent=2)
+        os.replace(tmp, self._manifest_path())
+
+    def _sources(self):
+        return {"costs": self.data_path, "events": self.events_path}
+
+    def _is_fresh(self, manifest):
+        if not manifest or manifest.get("version") != CACHE_VERSION: return False
+        if manifest.get("format") != CACHE_FORMAT: return False
+
+        touched = False
+        for key, path in self._sources().items():
+            entry = manifest["sources"].get(key)
+            sig = _signature(path)
+            if entry is None or sig is None:
+                if entry is None and sig is None: continue
+                return False
+            if entry["mtime_ns"] == sig["mtime_ns"] and entry["size"] == sig["size"]: continue
+            # mtime berubah: cek isi sebelum rebuild (mis. file hanya di-touch / di-copy ulang)
+            if entry["size"] != sig["size"] or entry["sha1"] != _file_hash(path): return False
+            entry.update(sig)
+            touched = True
+
+        if touched: self._save_manifest(manifest)
+        return True
+
+    def ensure(self):
+        """Return the manifest, rebuilding the partitions if the sources changed."""
+        sig = (_signature(self.data_path), _signature(self.events_path))
+        if self._manifest is not None and sig == self._checked_sig:
+            return self._manifest
+
+        manifest = self._load_manifest()
+        if not self._is_fresh(manifest):
+            manifest = self.build()
+        self._manifest, self._checked_sig = manifest, sig
+        return manifest
+
+    def version(self):
+        """Source signature the cache currently reflects (changes on rebuild)."""
+        self.ensure()
+        return tuple((s["mtime_ns"], s["size"]) if s else None for s in self._checked_sig)
+
+    def build(self):
+        if not os.path.exists(self.data_path): raise FileNotFoundError("[ERR] Dataset not found.")
+        start = time.perf_counter()
+
+        costs = pd.read_csv(self.data_path, dtype=COST_DTYPES, parse_dates=['ds'])
+        events = None
+        if os.path.exists(self.events_path):
+            events = pd.read_csv(self.events_path, dtype=EVENT_DTYPES, parse_dates=['ds'])
+
+        os.makedirs(os.path.join(self.cache_dir, 'costs'), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, 'events'), exist_ok=True)
+
+        projects = {}
+        for pid, part in costs.groupby('project_id', observed=True, sort=False):
+            write_frame(part.reset_index(drop=True), self._partition_path('costs', pid))
+            projects[str(pid)] = {"rows": len(part)}
+
+        if events is not None:
+            for pid in projects:
+                part = events[events['project_id'] == pid].reset_index(drop=True)
+                write_frame(part, self._partition_path('events', pid))
+
+        manifest = {
+            "version": CACHE_VERSION,
+            "format": CACHE_FORMAT,
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "sources": {},
+            "projects": projects,
+            "has_events": events is not None,
+        }
+        for key, path in self._sources().items():
+            sig = _signature(path)
+            if sig: manifest["sources"][key] = {**sig, "sha1": _file_hash(path)}
+        self._save_manifest(manifest)
+
+        print(f"[CACHE] Rebuilt {len(projects)} partitions in {time.perf_counter() - start:.2f}s ({CACHE_FORMAT})")
+        return manifest
+
+    # --- Access ---
+    def _partition_path(self, kind, pid):
+        ext = "parquet" if CACHE_FORMAT == "parquet" else "pkl"
+        return os.path.join(self.cache_dir, kind, f"{pid}.{ext}")
+
+    def projects(self):
+        return list(self.ensure()["projects"])
+
+    def get(self, pid):
+        """Return (costs, holidays) for one project, same contract as the old get_data."""
+        manifest = self.ensure()
+        if pid not in manifest["projects"]: raise ValueError(f"[ERR] No data for {pid}")
+
+        df_proj = read_frame(self._partition_path('costs', pid))
+        holidays = None
+        if manifest["has_events"]:
+            holidays = read_frame(self._partition_path('events', pid))
+            # Prophet menggabungkan tabel ini dengan country holidays -> pakai string biasa
+            holidays['holiday'] = holidays['holiday'].astype(str)
+        return df_proj, holidays
+
+_STORES = {}
+
+def open_store(data_path=DATA_PATH, events_path=EVENTS_PATH, cache_dir=CACHE_DIR):
+    """Process-wide store per source pair, so the manifest is only re-read on change."""
+    key = (data_path, events_path, cache_dir)
+    if key not in _STORES: _STORES[key] = CostStore(data_path, events_path, cache_dir)
+    return _STORES[key]
+
+def benchmark(store=None):
+    """Compare the old read-CSV-per-project path with the partition cache."""
+    store = store or open_store()
+    pids = store.projects()
+
+    start = time.perf_counter()
+    full_mem = 0
+    for pid in pids:
+        df = pd.read_csv(store.data_path)
+        full_mem = max(full_mem, df.memory_usage(deep=True).sum())
+        df[df['project_id'] == pid].copy()
+        if os.path.exists(store.events_path):
+            ev = pd.read_csv(store.events_path)
+            ev[ev['project_id'] == pid].copy()
+    csv_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    part_mem = 0
+    for pid in pids:
+        df, _ = store.get(pid)
+        part_mem = max(part_mem, df.memory_usage(deep=True).sum())
+    cache_time = time.perf_counter() - start
+
+    print("-" * 60)
+    print(f"DATA LOAD BENCHMARK ({len(pids)} projects)")
+    print("-" * 60)
+    print(f"  CSV per project : {csv_time*1000:8.1f} ms | peak frame {full_mem/1e6:6.2f} MB")
+    print(f"  Partition cache : {cache_time*1000:8.1f} ms | peak frame {part_mem/1e6:6.2f} MB")
+    print(f"  Speedup         : {csv_time / cache_time:.1f}x")
+    print("-" * 60)
+    return {"csv_s": csv_time, "cache_s": cache_time, "csv_bytes": int(full_mem), "cache_bytes": int(part_mem)}
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,206 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+from statistics import NormalDist
+
+# Engine per project dipilih lewat PROJECT_CONFIGS[pid]['engine'] (default: prophet)
+DEFAULT_ENGINE = "prophet"
+
+class ProphetEngine:
+    """Prophet + cmdstan, configured by forecast_engine.train ([F1]-[F6])."""
+    name = "prophet"
+
+    def __init__(self):
+        self.model = None
+
+    def fit(self, df, holidays, params=None, verbose=True):
+        from forecast_engine import train  # lazy: forecast_engine meng-import modul ini
+        self.model = train(df, holidays, params=params, verbose=verbose)
+        return self
+
+    def predict(self, future):
+        return self.model.predict(future)
+
+    def forecast(self, periods, headcount):
+        future = self.model.make_future_dataframe(periods=periods)
+        future['headcount'] = headcount
+        return self.predict(future)
+
+    def save(self, pid, mape=None):
+        from forecast_engine import save_model
+        return save_model(self.model, pid, mape)
+
+    def plot(self, forecast, title):
+        import matplotlib.pyplot as plt
+        self.model.plot(forecast)
+        plt.title(title)
+
+class NumpyEngine:
+    """Least-squares baseline: trend + weekday + day-of-month + headcount + hold events.
+
+    Mirrors what gen_cost_data simulates; fit and predict are a couple of
+    matrix ops, no Stan involved.
+    """
+    name = "numpy"
+    HEADCOUNT_COL = 2 + 6 + 30   # intercept, t, 6 weekday, 30 day-of-month
+    extra_regressors = {}        # history disimpan mentah (beda dengan Prophet)
+
+    def __init__(self, interval_width=0.95, uncertainty_samples=1000):
+        self.interval_width = interval_width
+        self.uncertainty_samples = uncertainty_samples
+        self.coef = None
+
+    # --- Design matrix ---
+    def _events(self, holidays):
+        if holidays is None or holidays.empty: return {}
+        windows = {}
+        for row in holidays.itertuples():
+            start = pd.Timestamp(row.ds).normalize()
+            days = pd.date_range(start + pd.Timedelta(days=int(row.lower_window)),
+                                 start + pd.Timedelta(days=int(row.upper_window)), freq='D')
+            windows.setdefault(str(row.holiday), []).extend(days.to_numpy())
+        return {name: np.unique(np.array(d, dtype='datetime64[ns]')) for name, d in windows.items()}
+
+    def _design(self, ds, headcount):
+        ds = pd.to_datetime(pd.Series(ds)).reset_index(drop=True)
+        t = ((ds - self.start).dt.total_seconds() / 86400.0 / 365.25).to_numpy()
+        dow = ds.dt.weekday.to_numpy()
+        dom = ds.dt.day.to_numpy()
+        day = ds.dt.normalize().to_numpy()
+
+        cols = [np.ones(len(ds)), t]
+        cols += [(dow == d).astype(float) for d in range(1, 7)]      # Senin = baseline
+        cols += [(dom == d).astype(float) for d in range(2, 32)]     # tanggal 1 = baseline
+        cols.append(np.asarray(headcount, dtype=float))              # [F6]
+        cols += [np.isin(day, self.events[name]).astype(float) for name in self.event_names]  # [F4]
+        return np.column_stack(cols)
+
+    # --- API ---
+    def fit(self, df, holidays, params=None, verbose=True):
+        self.start = pd.to_datetime(df['ds']).min()
+        self.events = self._events(holidays)
+        self.event_names = sorted(self.events)
+        self.history = df[['ds', 'y', 'headcount']].assign(ds=pd.to_datetime(df['ds'])).reset_index(drop=True)
+
+        X = self._design(self.history['ds'], self.history['headcount'])
+        y = self.history['y'].to_numpy(dtype=float)
+        self.coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+        resid = y - X @ self.coef
+        self.sigma = float(resid.std(ddof=min(X.shape[1], len(y) - 1)))
+        return self
+
+    def predict(self, future):
+        X = self._design(future['ds'], future['headcount'])
+        yhat = X @ self.coef
+        # [F10] Baseline = intercept + trend + headcount, sisanya efek kalender/event
+        base = [0, 1, self.HEADCOUNT_COL]
+        trend = X[:, base] @ self.coef[base]
+        z = NormalDist().inv_cdf(0.5 + self.interval_width / 2)
+        return pd.DataFrame({
+            'ds': pd.to_datetime(future['ds']).to_numpy(),
+            'trend': trend,
+            'multiplicative_terms': (yhat - trend) / np.where(trend == 0, 1.0, trend),
+            'yhat_lower': yhat - z * self.sigma,
+            'yhat_upper': yhat + z * self.sigma,
+            'yhat': yhat,
+        })
+
+    def make_future_dataframe(self, periods, include_history=True):
+        """Same contract as Prophet's, so ForecastService can serve either engine."""
+        last = self.history['ds'].max()
+        future = pd.date_range(last + pd.Timedelta(days=1), periods=periods, freq='D')
+        ds = np.concatenate([self.history['ds'].to_numpy(), future.to_numpy()]) if include_history else future
+        return pd.DataFrame({'ds': ds})
+
+    def predictive_samples(self, future):
+        """[F3] `uncertainty_samples` paths of yhat + N(0, sigma) noise, shape (days, samples)."""
+        yhat = self.predict(future)['yhat'].to_numpy()
+        noise = np.random.normal(0.0, self.sigma, size=(len(yhat), self.uncertainty_samples))
+        return {'yhat': yhat[:, None] + noise}
+
+    def forecast(self, periods, headcount):
+        future = self.make_future_dataframe(periods)
+        future['headcount'] = np.concatenate([self.history['headcount'].to_numpy(), np.full(periods, headcount)])
+        return self.predict(future)
+
+    def save(self, pid, mape=None):
+        from forecast_engine import MODEL_DIR, quality_gate
+        if mape is not None: quality_gate(mape)
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        path = os.path.join(MODEL_DIR, f"model_{pid}.npz")
+        np.savez(path, coef=self.coef, sigma=self.sigma, start=np.datetime64(self.start, 'ns'),
+                 meta=json.dumps({"event_names": self.event_names, "interval_width": self.interval_width}),
+                 history_ds=self.history['ds'].to_numpy(dtype='datetime64[ns]'),
+                 history_y=self.history['y'].to_numpy(dtype=float),
+                 history_headcount=self.history['headcount'].to_numpy(dtype=float),
+                 **{f"event_{i}": self.events[name] for i, name in enumerate(self.event_names)})
+
+        # Model Prophet lama untuk pid ini tidak boleh ikut di-serve lagi
+        stale = os.path.join(MODEL_DIR, f"model_{pid}.json")
+        if os.path.exists(stale):
+            os.remove(stale)
+            print(f"[INFO] Removed stale Prophet artifact {stale}")
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Rebuild a fitted engine (history included) from save()."""
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            engine = cls(meta['interval_width'])
+            engine.coef, engine.sigma = data['coef'], float(data['sigma'])
+            engine.start = pd.Timestamp(data['start'].item())
+            engine.event_names = meta['event_names']
+            engine.events = {name: data[f"event_{i}"] for i, name in enumerate(engine.event_names)}
+            engine.history = pd.DataFrame({'ds': pd.to_datetime(data['history_ds']),
+                                           'y': data['history_y'], 'headcount': data['history_headcount']})
+        return engine
+
+    def plot(self, forecast, title):
+        import matplotlib.pyplot as plt
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(self.history['ds'], self.history['y'], 'k.', markersize=2)
+        ax.plot(forecast['ds'], forecast['yhat'], color='#0072B2')
+        ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0072B2', alpha=0.2)
+        ax.set_title(title)
+
+ENGINES = {ProphetEngine.name: ProphetEngine, NumpyEngine.name: NumpyEngine}
+
+def make_engine(name=None):
+    name = name or DEFAULT_ENGINE
+    if name not in ENGINES: raise ValueError(f"[ERR] Unknown engine '{name}' (options: {', '.join(ENGINES)})")
+    return ENGINES[name]()
+
+def mape(y, yhat):
+    y, yhat = np.asarray(y, dtype=float), np.asarray(yhat, dtype=float)
+    mask = y != 0
+    return float(np.mean(np.abs((y[mask] - yhat[mask]) / y[mask])) * 100)
+
+def benchmark(pids=None, holdout_days=90):
+    """Fit/predict time and holdout MAPE of every engine on the same split."""
+    from forecast_engine import PROJECT_CONFIGS, get_data
+
+    rows = []
+    for pid in pids or PROJECT_CONFIGS:
+        df, holidays = get_data(pid)
+        split = pd.to_datetime(df['ds']).max() - pd.Timedelta(days=holdout_days)
+        train_df, test_df = df[df['ds'] <= split], df[df['ds'] > split]
+
+        for name in ENGINES:
+            engine = make_engine(name)
+            t0 = time.perf_counter()
+            engine.fit(train_df, holidays, verbose=False)
+            t1 = time.perf_counter()
+            fc = engine.predict(test_df[['ds', 'headcount']])
+            t2 = time.perf_counter()
+            rows.append({"project": pid, "engine": name, "fit_ms": (t1 - t0) * 1000,
+                         "predict_ms": (t2 - t1) * 1000, "mape": mape(test_df['y'], fc['yhat'])})
+
+    table = pd.DataFrame(rows)
+    print(table.pivot(index='project', columns='engine', values=['fit_ms', 'predict_ms', 'mape']).round(2))
+    return table
+
+if __name__ == "__main__":
+    benchmark()
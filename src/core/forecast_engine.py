@@ -1,18 +1,30 @@
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-from prophet.serialize import model_to_json
-from prophet.diagnostics import cross_validation, performance_metrics
-import matplotlib.pyplot as plt
 import os
+import sys
+import json
+import time
 import logging
+import argparse
+import contextlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import data_store
+import backtest
+import engines
+
+# prophet / cmdstanpy / matplotlib baru di-import saat dipakai (startup cepat untuk cron)
 
 # --- CONFIG ---
 DEV_MODE = True
+STARTUP_BUDGET_S = 1.0   # Batas waktu proses `import forecast_engine` (tanpa model)
+HEAVY_MODULES = ('prophet', 'cmdstanpy', 'matplotlib', 'scipy')
 logging.getLogger('prophet').setLevel(logging.WARNING)
 logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
 
 # Config disamakan dengan Generator
+# Opsional per project: "engine": "numpy" (baseline least-squares, lihat engines.py)
 PROJECT_CONFIGS = {
     "PROJ_ALPHA": { "name": "Alpha (Enterprise)", "budget": 80000000000 },
     "PROJ_BETA":  { "name": "Beta (Growth)", "budget": 5000000000 },
@@ -24,47 +36,150 @@ BASE_DIR = os.getcwd()
 DATA_PATH = os.path.join(BASE_DIR, 'datasets', 'synthetic', 'multi_project_costs.csv')
 EVENTS_PATH = os.path.join(BASE_DIR, 'datasets', 'synthetic', 'multi_project_events.csv')
 MODEL_DIR = os.path.join(BASE_DIR, 'models', 'forecasting', 'budget')
+# Hasil tune_model.py: {pid: {"params": {...}, "mape": ...}}, "DEFAULT" = fallback semua project
+BEST_PARAMS_PATH = os.path.join(MODEL_DIR, 'best_params.json')
+DEFAULT_TUNED_KEY = "DEFAULT"
+
+# Portfolio: 1 project per worker process, CV di dalam worker jalan serial
+PORTFOLIO_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# [F1] Linear growth for daily cost stability
+# [F3] Risk Guard 95% interval
+MODEL_PARAMS = {
+    'growth': 'linear', 'interval_width': 0.95,
+    'changepoint_prior_scale': 0.05, 'seasonality_mode': 'multiplicative',
+    'daily_seasonality': False,
+}
 
 def get_data(pid):
     if not os.path.exists(DATA_PATH): raise FileNotFoundError("[ERR] Dataset not found.")
-    df = pd.read_csv(DATA_PATH)
-    df_proj = df[df['project_id'] == pid].copy()
-    
-    holidays = None
-    if os.path.exists(EVENTS_PATH):
-        ev = pd.read_csv(EVENTS_PATH)
-        holidays = ev[ev['project_id'] == pid].copy()
-        
-    if df_proj.empty: raise ValueError(f"[ERR] No data for {pid}")
-    return df_proj, holidays
+    # Partisi per project (di-build sekali dari CSV, rebuild otomatis kalau CSV berubah)
+    return data_store.open_store(DATA_PATH, EVENTS_PATH).get(pid)
+
+_tuned_cache = {}
 
-def train(df, holidays):
-    if DEV_MODE: print(f"[INFO] Training model on {len(df)} records...")
+def tuned_params(pid=None):
+    """Best params written by tune_model for `pid` (or the DEFAULT entry), {} if none."""
+    if not os.path.exists(BEST_PARAMS_PATH): return {}
+    mtime = os.stat(BEST_PARAMS_PATH).st_mtime_ns
+    if _tuned_cache.get('mtime') != mtime:
+        with open(BEST_PARAMS_PATH) as f: _tuned_cache.update(mtime=mtime, data=json.load(f))
+    data = _tuned_cache['data']
+    entry = data.get(pid) or data.get(DEFAULT_TUNED_KEY) or {}
+    return dict(entry.get('params', {}))
+
+def train(df, holidays, init=None, params=None, verbose=True):
+    if DEV_MODE and verbose: print(f"[INFO] Training model on {len(df)} records{' (warm start)' if init else ''}...")
     
-    # [F1] Linear growth for daily cost stability
-    # [F3] Risk Guard 95% interval
+    from prophet import Prophet
+
+    # Urutan prioritas: default < hasil tuning project < params eksplisit
+    pid = str(df['project_id'].iloc[0]) if 'project_id' in df and len(df) else None
+
     # [F4] Shock Absorber via holidays
-    model = Prophet(
-        growth='linear', interval_width=0.95, holidays=holidays,
-        changepoint_prior_scale=0.05, seasonality_mode='multiplicative',
-        daily_seasonality=False
-    )
+    model = Prophet(holidays=holidays, **{**MODEL_PARAMS, **tuned_params(pid), **(params or {})})
     model.add_country_holidays(country_name='ID') # [F2] Smart Calendar
     model.add_regressor('headcount')              # [F6] Scenario Planning
-    model.fit(df)
+    if init: model.fit(df, init=init)             # Stan mulai dari parameter lama
+    else: model.fit(df)
     return model
 
-def save_model(model, pid, mape):
+def quality_gate(mape):
+    """[F7] Quality Gate"""
+    status = "PASSED" if mape < 20.0 else "WARNING"
+    print(f"[QC] Model Quality: {status} (Error: {mape:.2f}%)")
+    return status
+
+def save_model(model, pid, mape=None):
     os.makedirs(MODEL_DIR, exist_ok=True)
     path = os.path.join(MODEL_DIR, f"model_{pid}.json")
     
-    # [F7] Quality Gate
-    status = "PASSED" if mape < 20.0 else "WARNING"
-    print(f"[QC] Model Quality: {status} (Error: {mape:.2f}%)")
+    if mape is not None: quality_gate(mape)
     
+    from prophet.serialize import model_to_json
     with open(path, 'w') as f: f.write(model_to_json(model))
+
+    # Artifact numpy engine lama untuk pid ini tidak boleh ikut di-serve lagi
+    stale = os.path.join(MODEL_DIR, f"model_{pid}.npz")
+    if os.path.exists(stale):
+        os.remove(stale)
+        print(f"[INFO] Removed stale numpy artifact {stale}")
     return path
 
+def load_model(pid):
+    path = os.path.join(MODEL_DIR, f"model_{pid}.json")
+    if not os.path.exists(path): return None
+    from prophet.serialize import model_from_json
+    with open(path) as f: return model_from_json(f.read())
+
+def warm_start_params(model):
+    """MAP parameters of a fitted model in the shape Stan expects as init."""
+    return {
+        'k': model.params['k'][0][0],
+        'm': model.params['m'][0][0],
+        'sigma_obs': model.params['sigma_obs'][0][0],
+        'delta': model.params['delta'][0],
+        'beta': model.params['beta'][0],
+    }
+
+def param_drift(model, reference):
+    """Max absolute difference per parameter group (scaled space) between two fits."""
+    drift = {}
+    for name in ['k', 'm', 'sigma_obs', 'delta', 'beta']:
+        a, b = model.params[name].ravel(), reference.params[name].ravel()
+        drift[name] = float(np.abs(a - b).max()) if a.shape == b.shape else float('nan')
+    return drift
+
+def refit(pid, compare=False, verbose=True):
+    """Daily refresh: warm-start from the saved model, skip if no rows were appended."""
+    df, holidays = get_data(pid)
+    info = {"project": pid, "new_rows": len(df), "warm": False, "fit_s": 0.0}
+
+    engine_name = PROJECT_CONFIGS.get(pid, {}).get('engine', engines.DEFAULT_ENGINE)
+    if engine_name != "prophet":
+        # Engine non-Stan sudah murah, cukup fit ulang penuh
+        start = time.perf_counter()
+        engine = engines.make_engine(engine_name).fit(df, holidays, verbose=verbose)
+        info["fit_s"] = time.perf_counter() - start
+        engine.save(pid)
+        return engine, info
+
+    prev = load_model(pid)
+
+    if prev is not None:
+        # Bandingkan per hari: model JSON menyimpan ds dengan presisi milidetik
+        last = prev.history['ds'].max().normalize()
+        old_rows = int((pd.to_datetime(df['ds']).dt.normalize() <= last).sum())
+        info["new_rows"] = len(df) - old_rows
+        if info["new_rows"] == 0:
+            print(f"[INFO] {pid}: no new rows since {last:%Y-%m-%d}, keeping saved model.")
+            return prev, info
+        # Hanya append yang aman untuk warm start; data lama berubah -> cold fit
+        info["warm"] = old_rows == len(prev.history)
+
+    start = time.perf_counter()
+    model = train(df, holidays, init=warm_start_params(prev) if info["warm"] else None, verbose=verbose)
+    info["fit_s"] = time.perf_counter() - start
+
+    if compare:
+        start = time.perf_counter()
+        cold = train(df, holidays, verbose=verbose)
+        info["cold_fit_s"] = time.perf_counter() - start
+        info["drift"] = param_drift(model, cold)
+        # Drift di level forecast (yang dilihat user): selisih relatif yhat 30 hari
+        future = model.make_future_dataframe(periods=30, include_history=False)
+        future['headcount'] = df['headcount'].iloc[-1]
+        samples = model.uncertainty_samples
+        model.uncertainty_samples = cold.uncertainty_samples = 0
+        warm_fc, cold_fc = model.predict(future)['yhat'], cold.predict(future)['yhat']
+        model.uncertainty_samples = cold.uncertainty_samples = samples
+        info["yhat_drift_pct"] = float((np.abs(warm_fc - cold_fc) / np.abs(cold_fc)).max() * 100)
+
+    save_model(model, pid)
+    print(f"[REFIT] {pid}: +{info['new_rows']} rows, {'warm' if info['warm'] else 'cold'} fit {info['fit_s']:.2f}s"
+          + (f" (cold {info['cold_fit_s']:.2f}s, max yhat drift {info['yhat_drift_pct']:.3f}%)" if compare else ""))
+    return model, info
+
 def explain_forecast(forecast):
     """[F10] Explainable AI Logic"""
     fut = forecast.tail(30)
@@ -77,39 +192,57 @@ def explain_forecast(forecast):
         narrative += f" Seasonality {impact} cost by {abs(seasonal)*100:.1f}%."
     return narrative
 
-def run_analysis(pid, mode="SINGLE"):
+def next_window(forecast, df, days=30):
+    """[F9] Forecast rows for the `days` days right after the last actual row."""
+    return forecast[forecast['ds'] > df['ds'].max()].head(days)
+
+def compute_runway(forecast, df, budget):
+    """[F8] Status + tanggal budget habis dari forecast (yhat) setelah data terakhir."""
+    spent = df['y'].sum()
+    if spent >= budget:
+        return "CRITICAL_OVER", None
+
+    future_fc = forecast[forecast['ds'] > df['ds'].max()].copy()
+    future_fc['cumsum'] = future_fc['yhat'].cumsum() + spent
+    over = future_fc[future_fc['cumsum'] >= budget]
+    runway = over.iloc[0]['ds'] if not over.empty else None
+    return ("WARNING" if runway else "SAFE"), runway
+
+def save_plot(engine, forecast, title, path):
+    """Render the forecast chart to a file - headless, never opens a GUI window."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    engine.plot(forecast, title)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    plt.savefig(path, dpi=120, bbox_inches='tight')
+    plt.close('all')
+    print(f"[INFO] Plot saved to {path}")
+
+def run_analysis(pid, mode="SINGLE", cv_workers=None, plot_path=None, verbose=True):
     try:
         cfg = PROJECT_CONFIGS[pid]
         df, holidays = get_data(pid)
-        model = train(df, holidays)
+        engine_name = cfg.get('engine', engines.DEFAULT_ENGINE)
+        engine = engines.make_engine(engine_name).fit(df, holidays, verbose=verbose)
         
-        # Eval
-        cv = cross_validation(model, initial='730 days', period='180 days', horizon='30 days', parallel="processes")
-        mape = performance_metrics(cv)['mape'].mean() * 100
-        save_model(model, pid, mape)
+        # Eval (fold yang sudah pernah dihitung diambil dari cache)
+        mape = backtest.run_backtest(pid, df, holidays, engine=engine_name, workers=cv_workers)['mape']
+        engine.save(pid, mape)
         
         # Forecast
-        future = model.make_future_dataframe(periods=90)
-        future['headcount'] = df['headcount'].iloc[-1]
-        forecast = model.predict(future)
+        forecast = engine.forecast(90, df['headcount'].iloc[-1])
         
         # [F8] Runway Calculation
         spent = df['y'].sum()
         budget = cfg['budget']
-        
-        if spent >= budget:
-            status = "CRITICAL_OVER"
-            runway = None
-        else:
-            future_fc = forecast[forecast['ds'] > df['ds'].max()].copy()
-            future_fc['cumsum'] = future_fc['yhat'].cumsum() + spent
-            over = future_fc[future_fc['cumsum'] >= budget]
-            runway = over.iloc[0]['ds'] if not over.empty else None
-            status = "WARNING" if runway else "SAFE"
-
-        # [F9] Portfolio Data Preparation
-        next_month = forecast.tail(30)['yhat'].sum()
-        explanation = explain_forecast(forecast)
+        status, runway = compute_runway(forecast, df, budget)
+
+        # [F9] Portfolio Data Preparation: hari 1-30 setelah data terakhir (sama dengan serve mode)
+        window = next_window(forecast, df)
+        next_month = window['yhat'].sum()
+        explanation = explain_forecast(window)
         
         result = {
             "project": cfg['name'],
@@ -124,10 +257,8 @@ def run_analysis(pid, mode="SINGLE"):
 
         if mode == "SINGLE":
             print_report(result)
-            if DEV_MODE:
-                model.plot(forecast)
-                plt.title(f"{cfg['name']} (MAPE: {mape:.2f}%)")
-                plt.show()
+            if plot_path:
+                save_plot(engine, forecast, f"{cfg['name']} (MAPE: {mape:.2f}%)", plot_path)
                 
         return result
 
@@ -156,24 +287,158 @@ def print_report(res):
     print(f"  AI Logic     : {res['explanation']}")
     print("-"*60 + "\n")
 
-if __name__ == "__main__":
-    # --- SELECT MODE ---
-    # Options: SINGLE (Detail + Graph) or PORTFOLIO (Summary Table)
-    EXEC_MODE = "SINGLE"
-    
-    if EXEC_MODE == "PORTFOLIO":
-        print("[INFO] Starting Portfolio Analysis...\n")
-        agg_forecast = 0
-        for pid in PROJECT_CONFIGS:
-            r = run_analysis(pid, mode="PORTFOLIO")
-            if r: 
-                agg_forecast += r['forecast_30d']
-                print(f"{r['project']:<30} | {r['status']:<15} | Fcst: {r['forecast_30d']:,.0f}")
-        
-        print("\n" + "="*60)
-        print(f"TOTAL COMPANY CASHFLOW NEEDED (Next 30 Days): IDR {agg_forecast:,.0f}")
-        print("="*60)
+def _portfolio_task(pid, verbose=True):
+    """Worker entry point: one project, no nested pool inside the CV step."""
+    start = time.perf_counter()
+    res = run_analysis(pid, mode="PORTFOLIO", cv_workers=1, verbose=verbose)
+    return pid, res, time.perf_counter() - start
+
+def run_portfolio(pids=None, workers=None, verbose=True):
+    """[F9] Portfolio run spread over a bounded process pool."""
+    pids = list(pids or PROJECT_CONFIGS)
+    workers = max(1, min(workers or PORTFOLIO_WORKERS, len(pids)))
+    print(f"[INFO] Starting Portfolio Analysis ({len(pids)} projects, {workers} workers)...\n")
+
+    data_store.open_store(DATA_PATH, EVENTS_PATH).ensure()  # build cache sebelum fork worker
+
+    results, timings = {}, {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_portfolio_task, pid, verbose): pid for pid in pids}
+        for fut in as_completed(futures):
+            try:
+                pid, res, elapsed = fut.result()
+            except Exception as e:
+                pid, res, elapsed = futures[fut], None, float('nan')
+                print(f"[ERR] {pid}: worker failed ({e})")
+            results[pid], timings[pid] = res, elapsed
+    wall = time.perf_counter() - start
+
+    # Summary table tetap urut sesuai PROJECT_CONFIGS
+    agg_forecast = 0
+    for pid in pids:
+        r = results.get(pid)
+        if r:
+            agg_forecast += r['forecast_30d']
+            print(f"{r['project']:<30} | {r['status']:<15} | Fcst: {r['forecast_30d']:,.0f}")
+
+    print("\n" + "="*60)
+    print(f"TOTAL COMPANY CASHFLOW NEEDED (Next 30 Days): IDR {agg_forecast:,.0f}")
+    print("="*60)
+
+    print("\nTIMINGS:")
+    for pid in pids:
+        print(f"  {pid:<20} : {timings[pid]:.1f}s")
+    serial = np.nansum(list(timings.values()))
+    print(f"  {'Wall-clock':<20} : {wall:.1f}s (sum {serial:.1f}s, speedup {serial / wall:.1f}x)")
+
+    return results, timings
 
+# --- CLI ---
+def to_record(pid, res):
+    """Flatten a result dict into JSON/CSV friendly values."""
+    rec = {"project_id": pid}
+    for key, val in (res or {}).items():
+        if isinstance(val, pd.Timestamp): val = val.strftime('%Y-%m-%d')
+        elif isinstance(val, np.generic): val = val.item()
+        rec[key] = val
+    return rec
+
+def write_output(records, fmt, output=None):
+    if fmt == "json": text = json.dumps(records, indent=2, default=str)
+    else: text = pd.DataFrame(records).to_csv(index=False)
+    if output:
+        with open(output, 'w') as f: f.write(text)
+        print(f"[INFO] {len(records)} records written to {output}", file=sys.stderr)
     else:
-        # Test specific volatile project
-        run_analysis("PROJ_DELTA", mode="SINGLE")
\ No newline at end of file
+        sys.stdout.write(text + ("\n" if not text.endswith("\n") else ""))
+
+def run_serve(pids=None):
+    """Serve-only: answer from saved models, no training at all."""
+    from forecast_service import get_service
+
+    svc = get_service()
+    records = []
+    for pid in pids or svc.projects():
+        try:
+            res = {**svc.runway(pid), "forecast_30d": svc.next_30d(pid)}
+        except Exception as e:
+            print(f"[ERR] {pid}: {e}")
+            continue
+        print(f"{res['project']:<30} | {res['status']:<15} | Fcst: {res['forecast_30d']:,.0f}")
+        records.append(to_record(pid, res))
+    return records
+
+def check_startup(budget=STARTUP_BUDGET_S, runs=3):
+    """Time `import forecast_engine` in a fresh interpreter; fail if over budget."""
+    code = ("import sys, time; t = time.perf_counter(); import forecast_engine; "
+            "print(time.perf_counter() - t); "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+
+    best, heavy = float('inf'), ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                             capture_output=True, text=True, check=True).stdout.split("\n")
+        best = min(best, time.perf_counter() - start)
+        heavy = out[1].strip()
+
+    ok = best <= budget and not heavy
+    print(f"[{'PASS' if ok else 'FAIL'}] Startup {best:.2f}s (budget {budget:.2f}s)"
+          + (f", heavy modules loaded at import: {heavy}" if heavy else ""))
+    return ok
+
+def main(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=["text", "json", "csv"], default="text")
+    common.add_argument("--output", help="write json/csv here instead of stdout")
+    common.add_argument("--quiet", action="store_true", help="no training logs")
+
+    parser = argparse.ArgumentParser(description="Budget burn-rate forecasting engine")
+    parser.add_argument("--check-startup", action="store_true",
+                        help=f"measure import time against the {STARTUP_BUDGET_S:.1f}s budget")
+    sub = parser.add_subparsers(dest="mode")
+
+    p = sub.add_parser("single", parents=[common], help="train + detailed report for one project")
+    p.add_argument("project", nargs="?", default="PROJ_DELTA")
+    p.add_argument("--plot", metavar="PNG", help="save the forecast chart (headless)")
+    p = sub.add_parser("portfolio", parents=[common], help="all projects on a process pool")
+    p.add_argument("--workers", type=int)
+    p = sub.add_parser("serve", parents=[common], help="saved models only, no training")
+    p.add_argument("projects", nargs="*")
+    p = sub.add_parser("refit", parents=[common], help="daily warm-start refresh")
+    p.add_argument("projects", nargs="*")
+    p.add_argument("--compare", action="store_true", help="also run a cold fit and report drift")
+
+    args = parser.parse_args(argv)
+    if args.check_startup:
+        return 0 if check_startup() else 1
+    if not args.mode:
+        parser.print_help()
+        return 2
+    # --quiet diteruskan eksplisit: engines.py meng-import forecast_engine sebagai modul terpisah
+    # dari __main__, jadi mengubah DEV_MODE di sini tidak sampai ke train()
+    verbose = not args.quiet
+
+    # Mode json/csv: log ke stderr supaya stdout bersih untuk di-pipe
+    machine = args.format != "text"
+    with contextlib.redirect_stdout(sys.stderr) if machine else contextlib.nullcontext():
+        if args.mode == "single":
+            res = run_analysis(args.project, mode="PORTFOLIO" if machine else "SINGLE", plot_path=args.plot,
+                               verbose=verbose)
+            records = [to_record(args.project, res)] if res else []
+        elif args.mode == "portfolio":
+            results, timings = run_portfolio(workers=args.workers, verbose=verbose)
+            records = [{**to_record(pid, r), "elapsed_s": timings[pid]} for pid, r in results.items() if r]
+        elif args.mode == "serve":
+            records = run_serve(args.projects)
+        else:
+            records = [to_record(pid, refit(pid, compare=args.compare, verbose=verbose)[1])
+                       for pid in args.projects or PROJECT_CONFIGS]
+
+    if machine: write_output(records, args.format, args.output)
+    return 0 if records else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import pandas as pd
+import os
+import time
+import glob
+from collections import OrderedDict
+from prophet.serialize import model_from_json
+
+import data_store
+from engines import NumpyEngine
+from forecast_engine import PROJECT_CONFIGS, DATA_PATH, EVENTS_PATH, MODEL_DIR, compute_runway
+
+# --- CONFIG ---
+MAX_MODELS = 32       # Model Prophet di memori (LRU)
+MAX_FORECASTS = 8     # Hasil predict yang di-memo per model
+ARTIFACT_EXTS = (".json", ".npz")   # Prophet (save_model) / NumpyEngine.save
+
+def model_history(model):
+    """model.history with extra regressors back in raw units.
+
+    Prophet keeps regressors standardized in its history ((x - mu) / std),
+    so e.g. headcount 52 is stored as -0.57; callers expect the raw value.
+    """
+    df = model.history.copy()
+    for name, reg in model.extra_regressors.items():
+        if name in df: df[name] = df[name] * reg['std'] + reg['mu']
+    return df
+
+class ForecastService:
+    """Serving path for the saved model_{pid}.json / .npz artifacts.
+
+    Models are deserialized once and kept in an LRU keyed by
+    (project, file version), so overwriting an artifact invalidates it.
+    Projects are discovered from the model directory, not PROJECT_CONFIGS.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, max_models=MAX_MODELS):
+        self.model_dir = model_dir
+        self.max_models = max_models
+        self._models = OrderedDict()   # (pid, version) -> {"model", "forecasts"}
+        self._history = {}             # (pid, data version) -> actual costs
+        self.stats = {"hits": 0, "loads": 0, "load_s": 0.0}
+
+    # --- Artifacts ---
+    def model_path(self, pid):
+        """Newest artifact of the project, whichever engine wrote it."""
+        paths = [os.path.join(self.model_dir, f"model_{pid}{ext}") for ext in ARTIFACT_EXTS]
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths: raise FileNotFoundError(f"[ERR] No saved model for {pid}")
+        return max(paths, key=os.path.getmtime)
+
+    def projects(self):
+        files = [f for ext in ARTIFACT_EXTS for f in glob.glob(os.path.join(self.model_dir, f"model_*{ext}"))]
+        return sorted({os.path.splitext(os.path.basename(f))[0][len("model_"):] for f in files})
+
+    def _version(self, pid):
+        path = self.model_path(pid)
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _entry(self, pid):
+        key = (pid, self._version(pid))
+        if key in self._models:
+            self._models.move_to_end(key)
+            self.stats["hits"] += 1
+            return self._models[key]
+
+        start = time.perf_counter()
+        path = key[1][0]
+        if path.endswith(".npz"): model = NumpyEngine.load(path)
+        else:
+            with open(path) as f: model = model_from_json(f.read())
+        self.stats["loads"] += 1
+        self.stats["load_s"] += time.perf_counter() - start
+
+        # Versi lama project yang sama tidak akan dipakai lagi
+        for old in [k for k in self._models if k[0] == pid]: del self._models[old]
+        self._models[key] = {"model": model, "forecasts": OrderedDict()}
+        while len(self._models) > self.max_models: self._models.popitem(last=False)
+        return self._models[key]
+
+    def get_model(self, pid):
+        return self._entry(pid)["model"]
+
+    # --- Data ---
+    def history(self, pid):
+        """Actual costs: the data store if it has the project, else the model's own history."""
+        store = data_store.open_store(DATA_PATH, EVENTS_PATH)
+        try:
+            key = (pid, store.version())
+            if key not in self._history:
+                for old in [k for k in self._history if k[0] == pid]: del self._history[old]
+                self._history[key] = store.get(pid)[0]
+            return self._history[key]
+        except (FileNotFoundError, ValueError):
+            return model_history(self.get_model(pid))
+
+    def last_headcount(self, pid):
+        """Raw headcount of the latest actual row (default scenario for predict)."""
+        return float(self.history(pid)['headcount'].iloc[-1])
+
+    def budget(self, pid, df=None):
+        if pid in PROJECT_CONFIGS: return PROJECT_CONFIGS[pid]['budget']
+        df = self.history(pid) if df is None else df
+        if 'cap' not in df: raise ValueError(f"[ERR] No budget for {pid}")
+        return df['cap'].iloc[-1]  # [F1] cap = plafon budget dari generator
+
+    # --- Queries ---
+    def predict(self, pid, periods=30, headcount=None, uncertainty=True):
+        """Forecast `periods` days after the last actual row.
+
+        The dates come from the data, not from the model: a saved model
+        older than the data store would otherwise forecast days that
+        already have actuals (and shorten the runway horizon).
+        """
+        entry = self._entry(pid)
+        model = entry["model"]
+        last = pd.Timestamp(self.history(pid)['ds'].max())
+        if headcount is None: headcount = self.last_headcount(pid)
+
+        # Forecast yang lebih panjang dengan skenario sama cukup dipotong
+        for key in entry["forecasts"]:
+            if key[1:] == (last, float(headcount), uncertainty) and key[0] >= periods:
+                entry["forecasts"].move_to_end(key)
+                return entry["forecasts"][key].head(periods)
+        key = (periods, last, float(headcount), uncertainty)
+
+        future = pd.DataFrame({'ds': pd.date_range(last + pd.Timedelta(days=1), periods=periods, freq='D')})
+        future['headcount'] = headcount
+        samples = model.uncertainty_samples
+        if not uncertainty: model.uncertainty_samples = 0  # skip sampling interval
+        try:
+            forecast = model.predict(future)
+        finally:
+            model.uncertainty_samples = samples
+
+        entry["forecasts"][key] = forecast
+        while len(entry["forecasts"]) > MAX_FORECASTS: entry["forecasts"].popitem(last=False)
+        return forecast
+
+    def next_30d(self, pid, headcount=None):
+        """[F9] Cash needed in days 1-30 after the last actual row (same window as run_analysis)."""
+        return float(self.predict(pid, 30, headcount, uncertainty=False)['yhat'].sum())
+
+    def runway(self, pid, horizon=90, headcount=None):
+        """[F8] Budget status and exhaustion date, same rule as run_analysis."""
+        df = self.history(pid)
+        budget = self.budget(pid, df)
+        forecast = self.predict(pid, horizon, headcount, uncertainty=False)
+        status, runway = compute_runway(forecast, df, budget)
+        spent = float(df['y'].sum())
+        return {
+            "project": PROJECT_CONFIGS.get(pid, {}).get('name', pid),
+            "budget": budget,
+            "spent": spent,
+            "pct": (spent / budget) * 100,
+            "status": status,
+            "runway": runway,
+        }
+
+_SERVICE = None
+
+def get_service():
+    global _SERVICE
+    if _SERVICE is None: _SERVICE = ForecastService()
+    return _SERVICE
+
+if __name__ == "__main__":
+    svc = get_service()
+    print(f"[INFO] Serving {len(svc.projects())} saved models from {svc.model_dir}\n")
+
+    for pid in svc.projects():
+        t0 = time.perf_counter()
+        try:
+            cold = svc.runway(pid)
+        except Exception as e:
+            print(f"[ERR] {pid}: {e}")
+            continue
+        t1 = time.perf_counter()
+        svc.runway(pid)
+        fc30 = svc.next_30d(pid)
+        t2 = time.perf_counter()
+
+        end = cold['runway'].strftime('%Y-%m-%d') if cold['runway'] is not None else "-"
+        print(f"{cold['project']:<25} | {cold['status']:<13} | Runway: {end:<10} | Fcst: {fc30:,.0f}"
+              f" | cold {1000*(t1-t0):.0f} ms, warm {1000*(t2-t1):.1f} ms")
+
+    print(f"\n[INFO] Model loads: {svc.stats['loads']} ({svc.stats['load_s']:.2f}s), cache hits: {svc.stats['hits']}")
@@ -0,0 +1,211 @@
+import numpy as np
+import os
+import sys
+import json
+import time
+import argparse
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+MODEL_PATH = os.path.join(BASE_DIR, 'models', 'anomaly', 'timesheet_model_latest.pkl')
+FLAT_PATH = os.path.join(BASE_DIR, 'models', 'anomaly', 'timesheet_forest_flat.npz')
+FLAT_MODEL = "anomaly/timesheet_flat"   # nama di model registry
+
+CHUNK_ROWS = 500   # baris per pass: array kerja (trees x rows) tetap di cache
+MAX_DEPTH = 20     # layout padded butuh 2^depth slot per tree
+BENCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+def _average_path_length(n):
+    """Same formula as sklearn.ensemble._iforest._average_path_length."""
+    n = np.asarray(n, dtype=float)
+    out = np.zeros(n.shape)
+    big = n > 2
+    out[n == 2] = 1.0
+    out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+    return out
+
+def export_forest(model):
+    """Flatten a fitted IsolationForest into perfect-binary-tree arrays.
+
+    Every tree is padded to depth D = max_depth in heap order (children of
+    slot i are 2i+1 / 2i+2), so traversal is D gathers with no branching.
+    Padding slots send every value left (threshold +inf, NaN left) down to
+    the bottom slot of the original leaf; leaf_value holds sklearn's per-leaf
+    depth term (decision path length + average path length - 1).
+    """
+    n_features = model.n_features_in_
+    depth = int(max(e.tree_.max_depth for e in model.estimators_))
+    if depth > MAX_DEPTH:
+        raise ValueError(f"[ERR] Tree depth {depth} > {MAX_DEPTH}: padded layout would need 2^{depth} slots per tree")
+    # Aturan sklearn: kolom hanya di-subset kalau max_features < jumlah fitur
+    subsample = model._max_features != n_features
+
+    n_trees, n_inner = len(model.estimators_), 2 ** depth - 1
+    feature = np.zeros((n_trees, n_inner), dtype=np.int32)
+    threshold = np.full((n_trees, n_inner), np.inf)
+    missing_left = np.ones((n_trees, n_inner), dtype=bool)
+    leaf_value = np.zeros((n_trees, n_inner + 1))
+
+    for t, (est, feats) in enumerate(zip(model.estimators_, model.estimators_features_)):
+        tree = est.tree_
+        feats = np.asarray(feats)
+        missing = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8))
+        value = model._decision_path_lengths[t] + model._average_path_length_per_tree[t] - 1.0
+        stack = [(0, 0)]   # (node sklearn, slot heap)
+        while stack:
+            node, slot = stack.pop()
+            if tree.children_left[node] == -1:
+                while slot < n_inner: slot = 2 * slot + 1   # turun lewat padding (selalu kiri)
+                leaf_value[t, slot - n_inner] = value[node]
+                continue
+            f = tree.feature[node]
+            feature[t, slot] = feats[f] if subsample else f
+            threshold[t, slot] = tree.threshold[node]
+            missing_left[t, slot] = bool(missing[node])
+            stack += [(tree.children_left[node], 2 * slot + 1), (tree.children_right[node], 2 * slot + 2)]
+
+    return {
+        "feature": feature, "threshold": threshold, "missing_left": missing_left, "leaf_value": leaf_value,
+        "meta": np.array(json.dumps({
+            "n_features": int(n_features),
+            "n_trees": n_trees,
+            "depth": depth,
+            "denominator": float(n_trees * _average_path_length([model._max_samples])[0]),
+            "offset": float(model.offset_),
+        })),
+    }
+
+class FlatForest:
+    """Vectorized Isolation Forest evaluator over export_forest() arrays.
+
+    Reproduces sklearn bit for bit: input cast to float32 (as sklearn's
+    validation does), splits compared in float64, NaN routed by
+    missing_go_to_left, and per-tree depths accumulated in tree order.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        meta = json.loads(str(arrays['meta']))
+        self.n_features, self.n_trees, self.depth = meta['n_features'], meta['n_trees'], meta['depth']
+        self.denominator, self.offset_ = meta['denominator'], meta['offset']
+        for name in ('feature', 'threshold', 'missing_left', 'leaf_value'):
+            setattr(self, name, np.asarray(arrays[name]).ravel())
+        self.n_inner = 2 ** self.depth - 1
+        self._tree_base = (np.arange(self.n_trees, dtype=np.int32) * self.n_inner)[:, None]
+        self._leaf_base = self._tree_base + self._tree_base // self.n_inner - self.n_inner   # t*(n_inner+1) - n_inner
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(export_forest(model))
+
+    @classmethod
+    def load(cls, path=FLAT_PATH, mmap=True):
+        """Load an exported .npz; memory-mapped so worker processes share one page-cache copy."""
+        from model_registry import LOADERS
+        return cls(LOADERS['npz'](path, mmap))
+
+    def save(self, path=FLAT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, **{k: np.asarray(v) for k, v in self.arrays.items()})   # tanpa kompresi -> bisa mmap
+        os.replace(tmp, path)
+        return path
+
+    def _depths(self, X):
+        n = X.shape[0]
+        cols = np.ascontiguousarray(X.T).ravel()   # feature-major: gather per fitur lebih cache-friendly
+        row = np.arange(n, dtype=np.int32)[None, :]
+        has_nan = bool(np.isnan(cols).any())
+        slot = np.zeros((self.n_trees, n), dtype=np.int32)
+        for _ in range(self.depth):
+            g = self._tree_base + slot
+            x = cols[self.feature[g] * n + row]
+            right = x > self.threshold[g]   # == not (x <= threshold); NaN -> False
+            if has_nan: right = np.where(np.isnan(x), ~self.missing_left[g], right)
+            slot = 2 * slot + 1 + right
+
+        values = self.leaf_value[self._leaf_base + slot]   # (trees, rows)
+        return np.add.accumulate(values, axis=0)[-1]       # penjumlahan berurutan per tree, sama dengan sklearn
+
+    def score_samples(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1: X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"[ERR] Expected {self.n_features} features, got {X.shape[1]}")
+        X = X.astype(np.float64)   # nilai float32, dibandingkan dengan threshold float64
+
+        depths = (np.concatenate([self._depths(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+                  if len(X) else np.zeros(0))
+        if self.denominator == 0: return -np.ones_like(depths)
+        return -(2 ** (-np.divide(depths, self.denominator)))
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+# ==========================================
+# BENCHMARK vs SKLEARN
+# ==========================================
+def benchmark(sizes=BENCH_SIZES, model_path=MODEL_PATH, budget_s=2.0, seed=42):
+    """Latency per call and rows/s of FlatForest vs sklearn decision_function per batch size."""
+    import joblib
+    import pandas as pd
+    from anomaly_detector import FEATURES, random_timesheets
+
+    model = joblib.load(model_path)
+    forest = FlatForest.from_model(model)
+    data = random_timesheets(max(sizes), seed)
+    data['deviation_ratio'] = data['duration'] / data['hist_avg']
+    X_all = data[FEATURES]
+
+    def timed(fn, X):
+        runs, start, out = 0, time.perf_counter(), None
+        while True:   # ulang sampai budget habis (min 1x) -> latency stabil untuk batch kecil
+            t0 = time.perf_counter()
+            out = fn(X)
+            best = min(best, time.perf_counter() - t0) if runs else time.perf_counter() - t0
+            runs += 1
+            if time.perf_counter() - start > budget_s / 2 or runs >= 200: return out, best
+
+    rows = []
+    for n in sizes:
+        X = X_all.iloc[:n]
+        ref, sk_s = timed(model.decision_function, X)
+        got, flat_s = timed(forest.decision_function, X.to_numpy())
+        rows.append({"batch": n, "sklearn_ms": sk_s * 1000, "flat_ms": flat_s * 1000,
+                     "sklearn_rows_s": n / sk_s, "flat_rows_s": n / flat_s, "speedup": sk_s / flat_s,
+                     "identical": bool(np.array_equal(ref, got))})
+    table = pd.DataFrame(rows)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flattened Isolation Forest export + evaluator")
+    sub = parser.add_subparsers(dest="command", required=True)
+    e = sub.add_parser("export", help="flatten the sklearn model to an .npz")
+    e.add_argument("--model", default=MODEL_PATH)
+    e.add_argument("--out", default=FLAT_PATH)
+    e.add_argument("--register", action="store_true", help=f"also store it in the model registry as {FLAT_MODEL}")
+    b = sub.add_parser("bench", help="latency/throughput vs sklearn")
+    b.add_argument("--model", default=MODEL_PATH)
+    b.add_argument("--sizes", type=int, nargs="*", default=BENCH_SIZES)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        import joblib
+        forest = FlatForest.from_model(joblib.load(args.model))
+        path = forest.save(args.out)
+        print(f"[SUCCESS] {forest.n_trees} trees, depth {forest.depth} -> {path} "
+              f"({os.path.getsize(path) / 1e6:.2f} MB)")
+        if args.register:
+            from model_registry import get_registry
+            v = get_registry().register(FLAT_MODEL, path, source=os.path.relpath(args.model, BASE_DIR))
+            print(f"[REGISTRY] {FLAT_MODEL}@{v['hash'][:12]} -> latest")
+    else:
+        benchmark(args.sizes, args.model)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
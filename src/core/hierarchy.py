@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from statistics import NormalDist
+from prophet.serialize import model_to_json, model_from_json
+
+import data_store
+from forecast_engine import PROJECT_CONFIGS, DATA_PATH, EVENTS_PATH, MODEL_DIR, train
+from forecast_service import get_service
+from scenario_planner import future_frame
+
+# --- CONFIG ---
+TOP_ID = "TOTAL"
+TOP_MODEL_PATH = os.path.join(MODEL_DIR, 'hierarchy', f"model_{TOP_ID}.json")
+TOP_META_PATH = os.path.join(MODEL_DIR, 'hierarchy', f"model_{TOP_ID}.meta.json")   # fingerprint data training
+HORIZON_DAYS = 30
+HIER_SAMPLES = 500   # Sample path per node untuk estimasi varians
+
+def aggregate_data(pids=None):
+    """Company-level daily series (sum of y and headcount) plus every project's hold events."""
+    store = data_store.open_store(DATA_PATH, EVENTS_PATH)
+    pids = list(pids or store.projects())
+
+    frames, events = [], []
+    for pid in pids:
+        df, holidays = store.get(pid)
+        frames.append(df[['ds', 'y', 'headcount']].assign(ds=df['ds'].dt.normalize()))
+        if holidays is not None and not holidays.empty:
+            events.append(holidays.assign(holiday=holidays['holiday'] + f"_{pid}"))
+
+    total = (pd.concat(frames).groupby('ds')
+             .agg(y=('y', 'sum'), headcount=('headcount', 'sum'), n=('y', 'size')).reset_index())
+    total = total[total['n'] == len(pids)].drop(columns='n')   # hanya hari yang lengkap semua project
+    holidays = pd.concat(events, ignore_index=True) if events else None
+    return total, holidays, pids
+
+def fingerprint(total, pids):
+    """Identity of the aggregate series: projects, row count, last date and a content hash."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(total[['ds', 'y', 'headcount']], index=False).values).hexdigest()
+    return {"projects": sorted(pids), "rows": len(total),
+            "last_ds": str(pd.Timestamp(total['ds'].max()).date()), "sha1": digest}
+
+def fit_top(pids=None):
+    """Fit and save the aggregate model - one Prophet fit instead of N."""
+    total, holidays, pids = aggregate_data(pids)
+    model = train(total, holidays)
+    os.makedirs(os.path.dirname(TOP_MODEL_PATH), exist_ok=True)
+    with open(TOP_MODEL_PATH, 'w') as f: f.write(model_to_json(model))
+    with open(TOP_META_PATH, 'w') as f: json.dump(fingerprint(total, pids), f, indent=2)
+    return model
+
+def load_top(expected=None):
+    """Saved aggregate model, or None if missing or fitted on other data than `expected`."""
+    if not os.path.exists(TOP_MODEL_PATH): return None
+    if expected is not None:
+        try:
+            with open(TOP_META_PATH) as f: saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            saved = None
+        if saved != expected:
+            print("[INFO] Top-level model is stale (data changed since it was fitted), refitting")
+            return None
+    with open(TOP_MODEL_PATH) as f: return model_from_json(f.read())
+
+def horizon_totals(model, df, horizon=HORIZON_DAYS, samples=HIER_SAMPLES):
+    """Sampled distribution of the cost summed over the next `horizon` days."""
+    future = future_frame(df, horizon)
+    future['headcount'] = df['headcount'].iloc[-1]
+    original = model.uncertainty_samples
+    model.uncertainty_samples = samples
+    try:
+        paths = model.predictive_samples(future)['yhat']   # (horizon, samples)
+    finally:
+        model.uncertainty_samples = original
+    return paths.sum(axis=0)
+
+def reconcile(top_mean, top_var, leaf_mean, leaf_var):
+    """WLS reconciliation of one total + its leaves (S = [1'; I], W = diag(var)).
+
+    The gap between the top forecast and the bottom-up sum is split across
+    all nodes in proportion to their variance, so the leaves add up to the
+    total and the noisier forecasts move the most.
+    """
+    gap = top_mean - leaf_mean.sum()
+    weight = top_var + leaf_var.sum()
+    leaves = leaf_mean + gap * leaf_var / weight
+    var = 1.0 / (1.0 / top_var + 1.0 / leaf_var.sum())   # gabungan 2 estimasi total
+    return leaves, leaves.sum(), var
+
+def company_forecast(refit_top=False, horizon=HORIZON_DAYS, samples=HIER_SAMPLES,
+                     interval_width=0.95, seed=42, service=None):
+    """[F9] Reconciled company cashflow for the next `horizon` days.
+
+    Leaves come from the saved per-project models (no refit); only the
+    aggregate model is fitted, and only when missing, fitted on different
+    data (fingerprint mismatch) or `refit_top=True`.
+    """
+    start = time.perf_counter()
+    svc = service or get_service()
+    total, _, pids = aggregate_data()
+
+    top = None if refit_top else load_top(fingerprint(total, pids))
+    refitted = top is None
+    if refitted: top = fit_top(pids)
+
+    np.random.seed(seed)
+    top_draws = horizon_totals(top, total, horizon, samples)
+    leaf_draws = np.array([horizon_totals(svc.get_model(pid), svc.history(pid), horizon, samples) for pid in pids])
+
+    leaf_mean, leaf_var = leaf_draws.mean(axis=1), leaf_draws.var(axis=1)
+    leaves, company, var = reconcile(top_draws.mean(), top_draws.var(), leaf_mean, leaf_var)
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+    return {
+        "horizon_days": horizon,
+        "total": float(company),
+        "lower": float(company - z * np.sqrt(var)),
+        "upper": float(company + z * np.sqrt(var)),
+        "top_only": float(top_draws.mean()),
+        "bottom_up": float(leaf_mean.sum()),
+        "leaves": pd.DataFrame({
+            "project": [PROJECT_CONFIGS.get(p, {}).get('name', p) for p in pids],
+            "base": leaf_mean,
+            "reconciled": leaves,
+        }),
+        "refit_top": refitted,
+        "elapsed_s": time.perf_counter() - start,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconciled company-level cashflow forecast")
+    parser.add_argument("--refit-top", action="store_true", help="Refit the aggregate model even if it is up to date")
+    parser.add_argument("--horizon", type=int, default=HORIZON_DAYS, help="Days ahead (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    res = company_forecast(refit_top=args.refit_top, horizon=args.horizon)
+    for row in res['leaves'].itertuples():
+        print(f"{row.project:<30} | Base: {row.base:>16,.0f} | Reconciled: {row.reconciled:>16,.0f}")
+
+    print("\n" + "="*60)
+    print(f"TOTAL COMPANY CASHFLOW NEEDED (Next {res['horizon_days']} Days): IDR {res['total']:,.0f}")
+    print(f"  95% Interval : IDR {res['lower']:,.0f} - {res['upper']:,.0f}")
+    print(f"  Top model    : IDR {res['top_only']:,.0f} | Bottom-up sum: IDR {res['bottom_up']:,.0f}")
+    print("="*60)
+    print(f"[INFO] {'Refitted' if res['refit_top'] else 'Reused'} top-level model, {res['elapsed_s']:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+import numpy as np
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+HOST = "127.0.0.1"
+PORT = 8765
+
+MAX_BATCH = 256      # item per micro-batch (teks / entry timesheet)
+MAX_WAIT_MS = 2.0    # tunggu maksimal setelah request pertama masuk sebelum batch dijalankan
+MAX_BODY = 8 << 20   # 8 MB per request
+
+# Bucket histogram latency (ms), upper bound inklusif; terakhir = +inf
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, float('inf')]
+
+class Histogram:
+    """Fixed-bucket histogram (latency in ms, or batch sizes); quantiles resolve to bucket bounds."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, unit="ms"):
+        self.buckets = list(buckets)
+        self.unit = unit
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.total: return None
+        rank, seen = q * self.total, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank: return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        u = self.unit
+        return {"count": self.total, f"mean_{u}": self.sum / self.total if self.total else None,
+                f"p50_{u}": self.quantile(0.5), f"p99_{u}": self.quantile(0.99), f"max_{u}": self.max,
+                "buckets": {("+Inf" if b == float('inf') else str(b)): c for b, c in zip(self.buckets, self.counts)}}
+
+class MicroBatcher:
+    """Coalesce concurrent requests into one model call.
+
+    Requests (each a list of items) wait in a queue; the worker takes the
+    first one, then keeps collecting until MAX_BATCH items or MAX_WAIT_MS
+    has passed, runs `fn` once on the concatenation in a worker thread (the
+    event loop keeps accepting connections) and splits the results back.
+    """
+
+    def __init__(self, name, fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, executor=None):
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.queue = asyncio.Queue()
+        self.queued_items = 0
+        self.max_queued_items = 0
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, float('inf')], unit="items")
+        self.latency = Histogram()         # antri + batch, per request
+        self.model_latency = Histogram()   # durasi fn per batch
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, items):
+        fut = asyncio.get_running_loop().create_future()
+        self.queued_items += len(items)
+        self.max_queued_items = max(self.max_queued_items, self.queued_items)
+        start = time.perf_counter()
+        await self.queue.put((items, fut))
+        try:
+            return await fut
+        finally:
+            self.latency.observe((time.perf_counter() - start) * 1000)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty(): break
+                try:
+                    # Yang sudah antri diambil tanpa menunggu; sisanya tunggu sampai deadline
+                    nxt = self.queue.get_nowait() if not self.queue.empty() else \
+                        await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(nxt)
+                size += len(nxt[0])
+
+            items = [item for req, _ in batch for item in req]
+            self.queued_items -= len(items)
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, items)
+                error = None
+            except Exception as e:   # 1 batch gagal -> semua request di batch dapat error
+                results, error = None, e
+            self.model_latency.observe((time.perf_counter() - start) * 1000)
+            self.batches += 1
+            self.items += len(items)
+            self.batch_sizes.observe(len(items))
+
+            offset = 0
+            for req, fut in batch:
+                lo, offset = offset, offset + len(req)   # geser dulu: request batal tetap punya slot
+                if fut.done(): continue   # client sudah putus
+                if error is not None: fut.set_exception(error)
+                else: fut.set_result(results[lo:offset])
+
+    def metrics(self):
+        return {"queue_depth": {"requests": self.queue.qsize(), "items": self.queued_items,
+                                "max_items": self.max_queued_items},
+                "batches": self.batches, "items": self.items,
+                "mean_batch_items": self.items / self.batches if self.batches else None,
+                "batch_items": self.batch_sizes.snapshot(), "request_latency": self.latency.snapshot(),
+                "model_latency": self.model_latency.snapshot()}
+
+# ==========================================
+# MODEL ENDPOINTS
+# ==========================================
+def make_categorize(categorizer):
+    def run(texts):
+        res = categorizer.classify(texts)
+        return [{"category": c, "confidence": round(float(p), 6), "low_confidence": bool(low)}
+                for c, p, low in zip(res['category'], res['confidence'], res['low_confidence'])]
+    return run
+
+def make_anomaly(detector):
+    from anomaly_detector import RAW_FEATURES
+
+    def run(entries):
+        X = np.array([[e[k] for k in RAW_FEATURES] for e in entries])
+        res = detector.score(X)
+        return [{"label": int(l), "is_anomaly": bool(a), "score": round(float(s), 6),
+                 "deviation_ratio": round(float(r), 6)}
+                for l, a, s, r in zip(res['label'], res['is_anomaly'], res['score'], res['deviation_ratio'])]
+    return run
+
+def _validate_entries(entries):
+    """Numeric feature dicts; checked per request so one bad entry cannot fail a whole micro-batch."""
+    from anomaly_detector import RAW_FEATURES
+    clean = []
+    for e in entries:
+        if not isinstance(e, dict): raise TypeError(f"entry must be an object, got {type(e).__name__}")
+        missing = [k for k in RAW_FEATURES if k not in e]
+        if missing: raise ValueError(f"entry missing {missing}")
+        clean.append({k: float(e[k]) for k in RAW_FEATURES})
+    return clean
+
+class InferenceServer:
+    """Asyncio HTTP/1.1 (keep-alive) front for the categorizer and anomaly models.
+
+    POST /categorize {"texts": [...]} | {"text": "..."}
+    POST /anomaly    {"entries": [{complexity, hist_avg, skill, duration}, ...]}
+    GET  /metrics    histograms + queue depth per endpoint
+    GET  /health
+    Both models are loaded once at startup; requests are micro-batched.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, categorizer=None, detector=None):
+        start = time.perf_counter()
+        if categorizer is None:
+            from task_categorizer import CachedCategorizer
+            categorizer = CachedCategorizer()
+        if detector is None:
+            from anomaly_detector import AnomalyDetector
+            detector = AnomalyDetector()
+        self.load_s = time.perf_counter() - start
+        self.max_batch, self.max_wait_ms = max_batch, max_wait_ms
+        # 1 thread: model call berurutan, event loop tetap bebas untuk I/O
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+        self.batchers = {
+            "/categorize": MicroBatcher("categorize", make_categorize(categorizer), max_batch, max_wait_ms, self.executor),
+            "/anomaly": MicroBatcher("anomaly", make_anomaly(detector), max_batch, max_wait_ms, self.executor),
+        }
+        self.categorizer = categorizer
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.started = time.time()
+
+    def metrics(self):
+        out = {"uptime_s": time.time() - self.started, "connections": self.connections, "requests": self.requests,
+               "errors": self.errors, "config": {"max_batch": self.max_batch, "max_wait_ms": self.max_wait_ms},
+               "model_load_s": self.load_s,
+               "endpoints": {path: b.metrics() for path, b in self.batchers.items()}}
+        if hasattr(self.categorizer, 'stats'): out["categorizer_cache"] = self.categorizer.stats()
+        return out
+
+    async def dispatch(self, method, path, body):
+        if method == "GET" and path == "/health": return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics": return 200, self.metrics()
+        batcher = self.batchers.get(path)
+        if batcher is None: return 404, {"error": f"unknown path {path}"}
+        if method != "POST": return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body or b"{}")
+            if path == "/categorize":
+                single = "text" in payload
+                items = [str(payload["text"])] if single else [str(t) for t in payload["texts"]]
+            else:
+                single = "entry" in payload
+                items = _validate_entries([payload["entry"]] if single else list(payload["entries"]))
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"bad request: {e}"}
+        if not items: return 200, {"results": []}
+        results = await batcher.submit(items)
+        return 200, (results[0] if single else {"results": results})
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""): break
+                    k, _, v = h.decode('latin-1').partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                    if length < 0: raise ValueError(length)
+                except ValueError:
+                    length = None
+                if length is None:   # body tidak bisa dibaca -> koneksi ditutup setelah jawab
+                    status, payload = 400, {"error": f"bad content-length: {headers.get('content-length')!r}"}
+                elif length > MAX_BODY:
+                    status, payload, body = 413, {"error": "body too large"}, None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self.dispatch(method, target.split("?")[0], body)
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+                self.requests += 1
+                if status >= 400: self.errors += 1
+
+                data = json.dumps(payload).encode()
+                keep = (headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                        and status != 413 and length is not None)
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'ERROR'}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep: break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        for b in self.batchers.values(): b.start()
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"[INFO] Serving on http://{host}:{port} (max_batch={self.max_batch}, max_wait={self.max_wait_ms} ms, "
+              f"models loaded in {self.load_s:.2f}s)", flush=True)
+        async with server:
+            await server.serve_forever()
+
+# ==========================================
+# LOAD GENERATOR
+# ==========================================
+async def _request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b""): break
+        k, _, v = h.decode().partition(":")
+        if k.lower() == "content-length": length = int(v)
+    return status, json.loads(await reader.readexactly(length))
+
+async def fetch(path, host=HOST, port=PORT, method="GET", payload=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await _request(reader, writer, method, path, payload))[1]
+    finally:
+        writer.close()
+
+def _payloads(n, seed=42):
+    """Mixed single-item requests: task texts and timesheet entries."""
+    from task_categorizer import random_tasks
+    from anomaly_detector import random_timesheets
+    texts = random_tasks(n, seed)
+    sheets = random_timesheets(n, seed).to_dict('records')
+    return [("/categorize", {"text": t}) if i % 2 == 0 else
+            ("/anomaly", {"entry": {k: float(v) for k, v in sheets[i].items() if k != 'employee_id'}})
+            for i, t in enumerate(texts)]
+
+async def load_test(requests=5_000, concurrency=64, host=HOST, port=PORT, seed=42):
+    """`concurrency` keep-alive clients send `requests` single-item requests; client-side latency."""
+    payloads = _payloads(requests, seed)
+    latency = np.zeros(requests)
+    status_ok = 0
+    next_i = 0
+
+    async def client():
+        nonlocal next_i, status_ok
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while next_i < requests:
+                i = next_i
+                next_i += 1
+                path, body = payloads[i]
+                start = time.perf_counter()
+                status, _ = await _request(reader, writer, "POST", path, body)
+                latency[i] = (time.perf_counter() - start) * 1000
+                status_ok += status == 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"requests": requests, "concurrency": concurrency, "ok": status_ok, "elapsed_s": elapsed,
+            "req_per_s": requests / elapsed, "p50_ms": float(np.percentile(latency, 50)),
+            "p90_ms": float(np.percentile(latency, 90)), "p99_ms": float(np.percentile(latency, 99)),
+            "max_ms": float(latency.max())}
+
+def _start_server(port, max_batch, max_wait_ms):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve", "--port", str(port),
+                             "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=BASE_DIR)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None: raise RuntimeError(f"[ERR] Server exited with code {proc.returncode}")
+        try:
+            asyncio.run(fetch("/health", port=port))
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise TimeoutError("[ERR] Server did not come up in 60s")
+
+def benchmark(requests=5_000, concurrency=64, port=PORT + 1, configs=((1, 0.0), (MAX_BATCH, MAX_WAIT_MS))):
+    """Load-test a fresh server per (max_batch, max_wait_ms) config: batching off vs on."""
+    import pandas as pd
+    rows = []
+    for max_batch, max_wait in configs:
+        proc = _start_server(port, max_batch, max_wait)
+        try:
+            res = asyncio.run(load_test(requests, concurrency, port=port))
+            m = asyncio.run(fetch("/metrics", port=port))
+        finally:
+            proc.terminate()
+            proc.wait()
+        ep = m["endpoints"]
+        rows.append({"max_batch": max_batch, "max_wait_ms": max_wait, **{k: res[k] for k in
+                     ("ok", "req_per_s", "p50_ms", "p90_ms", "p99_ms", "max_ms")},
+                     "cat_mean_batch": ep["/categorize"]["mean_batch_items"],
+                     "anom_mean_batch": ep["/anomaly"]["mean_batch_items"],
+                     "max_queue_items": max(e["queue_depth"]["max_items"] for e in ep.values())})
+    table = pd.DataFrame(rows)
+    print(f"[INFO] {requests:,} single-item requests, {concurrency} concurrent keep-alive clients")
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-batching inference server (categorizer + anomaly)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default=HOST)
+    s.add_argument("--port", type=int, default=PORT)
+    s.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    s.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    l = sub.add_parser("load", help="load-test a running server")
+    l.add_argument("--port", type=int, default=PORT)
+    l.add_argument("--requests", type=int, default=5_000)
+    l.add_argument("--concurrency", type=int, default=64)
+    b = sub.add_parser("bench", help="start servers with batching off/on and load-test both")
+    b.add_argument("--requests", type=int, default=5_000)
+    b.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(InferenceServer(args.max_batch, args.max_wait_ms).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "load":
+        res = asyncio.run(load_test(args.requests, args.concurrency, port=args.port))
+        print(json.dumps(res, indent=2))
+        m = asyncio.run(fetch("/metrics", port=args.port))
+        print(json.dumps({p: {k: e[k] for k in ("queue_depth", "mean_batch_items", "request_latency")}
+                          for p, e in m["endpoints"].items()}, indent=2))
+    else:
+        benchmark(args.requests, args.concurrency)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
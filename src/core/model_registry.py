@@ -0,0 +1,305 @@
+import numpy as np
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import zipfile
+import contextlib
+import multiprocessing as mp
+from datetime import datetime
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+REGISTRY_DIR = os.path.join(MODELS_DIR, 'registry')
+
+# Nama artifact standar (dipakai trainer & consumer)
+ANOMALY_MODEL = "anomaly/timesheet"
+NLP_MODEL = "nlp/task_categorizer"
+FORECAST_PREFIX = "forecast/"
+
+FORMATS = {'.pkl': 'joblib', '.joblib': 'joblib', '.json': 'prophet_json', '.npz': 'npz', '.npy': 'npy'}
+
+# ==========================================
+# MEMORY-MAPPED ARRAY LOADING
+# ==========================================
+def load_npz_mmap(path):
+    """Memory-map every array of an uncompressed .npz (np.savez) instead of reading it.
+
+    np.load ignores mmap_mode for .npz; the members are stored raw inside
+    the zip, so each one is mapped at its data offset.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as fh:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+                raise ValueError(f"[ERR] {path} is compressed, cannot memory-map {info.filename}")
+            fh.seek(info.header_offset)
+            local = fh.read(30)
+            name_len, extra_len = int.from_bytes(local[26:28], 'little'), int.from_bytes(local[28:30], 'little')
+            fh.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(fh)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(fh)
+            if dtype.hasobject:   # array object tidak bisa di-mmap
+                fh.seek(info.header_offset + 30 + name_len + extra_len)
+                arrays[info.filename[:-4]] = np.lib.format.read_array(fh, allow_pickle=False)
+                continue
+            arrays[info.filename[:-4]] = np.memmap(path, dtype=dtype, mode='r', offset=fh.tell(), shape=shape,
+                                                   order='F' if fortran else 'C')
+    return arrays
+
+def _load_joblib(path, mmap):
+    import joblib
+    return joblib.load(path, mmap_mode='r' if mmap else None)
+
+def _load_prophet_json(path, mmap):
+    from prophet.serialize import model_from_json
+    with open(path) as f: return model_from_json(f.read())
+
+def _load_npz(path, mmap):
+    if mmap: return load_npz_mmap(path)
+    with np.load(path) as data: return {k: data[k] for k in data.files}
+
+def _load_npy(path, mmap):
+    return np.load(path, mmap_mode='r' if mmap else None)
+
+LOADERS = {'joblib': _load_joblib, 'prophet_json': _load_prophet_json, 'npz': _load_npz, 'npy': _load_npy}
+
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''): h.update(block)
+    return h.hexdigest()
+
+# ==========================================
+# REGISTRY
+# ==========================================
+class ModelRegistry:
+    """Content-addressed artifact store shared by the anomaly, NLP and forecast models.
+
+    Each distinct file is stored once under objects/<sha256>; manifest.json
+    lists the versions of every artifact name with their metrics, plus
+    aliases such as `latest` pointing at a version hash.
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.json')
+
+    # --- Manifest ---
+    def manifest(self):
+        if not os.path.exists(self.manifest_path): return {"artifacts": {}}
+        with open(self.manifest_path) as f: return json.load(f)
+
+    @contextlib.contextmanager
+    def _update(self):
+        """Read-modify-write the manifest under a file lock (trainers may run concurrently)."""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'w') as lock:
+            try:
+                import fcntl
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                pass   # Windows: tanpa lock
+            data = self.manifest()
+            yield data
+            tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f: json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.manifest_path)
+
+    def object_path(self, digest, ext):
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}{ext}")
+
+    # --- Write ---
+    def register(self, name, path, metrics=None, aliases=("latest",), fmt=None, source=None):
+        """Store `path` once by content hash and record it as a version of `name`."""
+        ext = os.path.splitext(path)[1]
+        fmt = fmt or FORMATS.get(ext)
+        if fmt not in LOADERS: raise ValueError(f"[ERR] Unknown artifact format for {path}")
+
+        digest = file_hash(path)
+        target = self.object_path(digest, ext)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+
+        with self._update() as data:
+            art = data["artifacts"].setdefault(name, {"versions": [], "aliases": {}})
+            version = next((v for v in art["versions"] if v["hash"] == digest), None)
+            if version is None:
+                version = {"hash": digest, "file": os.path.relpath(target, self.root), "format": fmt,
+                           "size": os.path.getsize(target), "created": datetime.now().isoformat(timespec='seconds'),
+                           "metrics": {}, "sources": []}
+                art["versions"].append(version)
+            version["metrics"].update(metrics or {})
+            if source and source not in version["sources"]: version["sources"].append(source)
+            for alias in aliases or (): art["aliases"][alias] = digest
+        return version
+
+    def register_object(self, name, obj, metrics=None, aliases=("latest",), source=None):
+        """joblib.dump `obj` (uncompressed, so arrays stay mmap-able) and register it."""
+        import joblib, tempfile
+        fd, tmp = tempfile.mkstemp(suffix='.pkl', dir=self.root if os.path.isdir(self.root) else None)
+        os.close(fd)
+        try:
+            joblib.dump(obj, tmp)
+            return self.register(name, tmp, metrics, aliases, source=source)
+        finally:
+            os.remove(tmp)
+
+    def set_alias(self, name, alias, ref):
+        version = self.resolve(name, ref)
+        with self._update() as data: data["artifacts"][name]["aliases"][alias] = version["hash"]
+        return version
+
+    # --- Read ---
+    def names(self):
+        return sorted(self.manifest()["artifacts"])
+
+    def versions(self, name):
+        return self.manifest()["artifacts"].get(name, {}).get("versions", [])
+
+    def resolve(self, name, ref="latest"):
+        """Version entry for an alias, a full hash or a unique hash prefix."""
+        art = self.manifest()["artifacts"].get(name)
+        if art is None: raise KeyError(f"[ERR] No artifact named '{name}' in registry")
+        ref = art["aliases"].get(ref, ref)
+        matches = [v for v in art["versions"] if v["hash"].startswith(ref)]
+        if len(matches) != 1: raise KeyError(f"[ERR] '{ref}' matches {len(matches)} versions of {name}")
+        return matches[0]
+
+    def path(self, name, ref="latest"):
+        return os.path.join(self.root, self.resolve(name, ref)["file"])
+
+    def load(self, name, ref="latest", mmap=True):
+        """Load an artifact; numeric arrays are memory-mapped (shared page cache) when `mmap`."""
+        version = self.resolve(name, ref)
+        return LOADERS[version["format"]](os.path.join(self.root, version["file"]), mmap)
+
+_REGISTRY = {}
+
+def get_registry(root=REGISTRY_DIR):
+    if root not in _REGISTRY: _REGISTRY[root] = ModelRegistry(root)
+    return _REGISTRY[root]
+
+# ==========================================
+# IMPORT ARTIFACT LAMA
+# ==========================================
+def import_legacy(registry=None, models_dir=MODELS_DIR):
+    """Register the existing models/ files; identical copies collapse into one object."""
+    reg = registry or get_registry()
+    anomaly_dir = os.path.join(models_dir, 'anomaly')
+    # Arsip lama dulu (urut nama = urut tanggal), latest terakhir supaya alias-nya benar
+    files = sorted(f for f in os.listdir(anomaly_dir) if f.endswith('.pkl')) if os.path.isdir(anomaly_dir) else []
+    files.sort(key=lambda f: f == 'timesheet_model_latest.pkl')
+    for fname in files:
+        acc = re.search(r"_ACC([\d.]+)\.pkl$", fname)
+        reg.register(ANOMALY_MODEL, os.path.join(anomaly_dir, fname),
+                     metrics={"accuracy": float(acc.group(1))} if acc else None,
+                     aliases=("latest",) if fname == 'timesheet_model_latest.pkl' else (), source=f"anomaly/{fname}")
+
+    nlp_path = os.path.join(models_dir, 'nlp', 'task_categorizer_model.pkl')
+    if os.path.exists(nlp_path): reg.register(NLP_MODEL, nlp_path, source="nlp/task_categorizer_model.pkl")
+
+    budget_dir = os.path.join(models_dir, 'forecasting', 'budget')
+    for fname in sorted(os.listdir(budget_dir)) if os.path.isdir(budget_dir) else []:
+        m = re.match(r"model_(.+)\.(json|npz)$", fname)
+        if m: reg.register(FORECAST_PREFIX + m.group(1), os.path.join(budget_dir, fname), source=f"forecasting/budget/{fname}")
+    return reg
+
+# ==========================================
+# LOAD TIME & RSS PER WORKER
+# ==========================================
+def rss_mb():
+    """(private, file-backed) resident MB of this process; file-backed pages are shareable."""
+    try:
+        with open('/proc/self/status') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        kb = lambda key: int(status[key].split()[0]) / 1024
+        return kb('RssAnon'), kb('RssFile')
+    except (OSError, KeyError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+
+def _load_worker(root, name, ref, mmap, queue):
+    try:
+        reg = ModelRegistry(root)
+        fmt = reg.resolve(name, ref)["format"]
+        if fmt == 'joblib': import sklearn.ensemble, sklearn.pipeline   # library di luar hitungan artifact
+        anon0, file0 = rss_mb()
+        start = time.perf_counter()
+        obj = reg.load(name, ref, mmap=mmap)
+        if isinstance(obj, dict):   # sentuh semua array numerik supaya halaman benar-benar resident
+            for arr in obj.values():
+                if arr.dtype.kind in 'biuf': np.asarray(arr).sum()
+        load_s = time.perf_counter() - start
+        anon1, file1 = rss_mb()
+        queue.put({"pid": os.getpid(), "load_s": load_s, "private_mb": anon1 - anon0, "shared_mb": file1 - file0})
+    except Exception as e:   # parent tetap menunggu 1 hasil per worker
+        queue.put({"pid": os.getpid(), "error": f"{type(e).__name__}: {e}"})
+
+def load_report(name, ref="latest", workers=4, registry=None):
+    """Load time and RSS growth per fresh worker process, plain load vs memory-mapped."""
+    reg = registry or get_registry()
+    version = reg.resolve(name, ref)
+    ctx = mp.get_context('spawn')   # proses bersih, tanpa copy-on-write dari parent
+    rows = []
+    for mmap in (False, True):
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_load_worker, args=(reg.root, name, ref, mmap, queue)) for _ in range(workers)]
+        for p in procs: p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs: p.join()
+        for r in results:
+            if "error" in r: raise RuntimeError(f"[ERR] Worker {r['pid']} failed: {r['error']}")
+            rows.append({"mode": "mmap" if mmap else "plain", **r})
+
+    print(f"[INFO] {name}@{version['hash'][:12]} ({version['format']}, {version['size'] / 1e6:.1f} MB), {workers} workers")
+    for mode in ("plain", "mmap"):
+        sub = [r for r in rows if r["mode"] == mode]
+        print(f"  {mode:<5} | load {np.mean([r['load_s'] for r in sub]) * 1000:8.1f} ms | "
+              f"private {np.mean([r['private_mb'] for r in sub]):7.2f} MB/worker | "
+              f"shared (page cache) {np.mean([r['shared_mb'] for r in sub]):7.2f} MB/worker")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Content-addressed model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="register existing models/ artifacts")
+    sub.add_parser("list", help="artifacts, versions, metrics and aliases")
+    a = sub.add_parser("alias", help="point an alias at a version")
+    a.add_argument("name"); a.add_argument("alias"); a.add_argument("ref")
+    b = sub.add_parser("bench", help="load time + RSS per worker")
+    b.add_argument("name"); b.add_argument("--ref", default="latest"); b.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    reg = get_registry()
+    if args.command == "import":
+        import_legacy(reg)
+        print(f"[SUCCESS] Registry at {reg.root}: {len(reg.names())} artifacts")
+    elif args.command == "alias":
+        v = reg.set_alias(args.name, args.alias, args.ref)
+        print(f"[INFO] {args.name}:{args.alias} -> {v['hash'][:12]}")
+    elif args.command == "bench":
+        load_report(args.name, args.ref, args.workers, reg)
+
+    if args.command in ("import", "list"):
+        data = reg.manifest()["artifacts"]
+        for name in sorted(data):
+            by_hash = {}
+            for alias, digest in data[name]["aliases"].items(): by_hash.setdefault(digest, []).append(alias)
+            for v in data[name]["versions"]:
+                metrics = " ".join(f"{k}={val}" for k, val in v["metrics"].items())
+                print(f"  {name:<28} {v['hash'][:12]} {v['size'] / 1e6:6.2f} MB {metrics:<16} "
+                      f"{','.join(by_hash.get(v['hash'], [])):<8} ({len(v['sources'])} source file(s))")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import pandas as pd
+import numpy as np
+import time
+from prophet.utilities import regressor_coefficients
+
+from engines import NumpyEngine
+from forecast_service import get_service, model_history
+
+# --- CONFIG ---
+HEADCOUNTS = list(range(5, 65, 5))
+HORIZONS = [90, 180, 270, 365]
+
+MC_SAMPLES = 1000          # Jumlah sample path per project
+MC_MAX_CELLS = 2_000_000   # Batas (hari x sample) per batch ~16 MB float64
+
+def exhaustion_index(daily, spent, budget):
+    """[F8] First day (column) where spent + cumulative cost reaches the budget.
+
+    `daily` is (scenarios, days); returns an int array, -1 where the budget
+    holds for the whole horizon.
+    """
+    crossed = (np.cumsum(daily, axis=1) + spent) >= budget
+    idx = crossed.argmax(axis=1)
+    return np.where(crossed.any(axis=1), idx, -1)
+
+def future_frame(df, days):
+    """Daily dates right after the last actual cost row."""
+    last = pd.to_datetime(df['ds']).max()
+    return pd.DataFrame({'ds': pd.date_range(last + pd.Timedelta(days=1), periods=days, freq='D')})
+
+def scenario_costs(model, future, headcounts):
+    """[F6] Daily yhat for every headcount scenario from a single predict call.
+
+    Headcount enters Prophet linearly (additive: coef * hc, multiplicative:
+    trend * coef * hc), so one prediction at a reference headcount plus the
+    fitted coefficient gives every scenario exactly.
+    """
+    base_hc = float(model_history(model)['headcount'].iloc[-1])
+    fut = future.assign(headcount=base_hc)
+
+    samples = model.uncertainty_samples
+    model.uncertainty_samples = 0  # point forecast saja, interval tidak dipakai
+    try:
+        fc = model.predict(fut)
+    finally:
+        model.uncertainty_samples = samples
+
+    if isinstance(model, NumpyEngine):   # headcount aditif di least-squares
+        coef = {'coef': model.coef[model.HEADCOUNT_COL], 'regressor_mode': 'additive'}
+    else:
+        coef = regressor_coefficients(model).set_index('regressor').loc['headcount']
+    delta = np.asarray(headcounts, dtype=float)[:, None] - base_hc          # (S, 1)
+    scale = fc['trend'].to_numpy()[None, :] if coef['regressor_mode'] == 'multiplicative' else 1.0
+    return fc['yhat'].to_numpy()[None, :] + scale * coef['coef'] * delta    # (S, H)
+
+def scenario_grid(pid, headcounts=HEADCOUNTS, horizons=HORIZONS, service=None):
+    """Headcount x horizon what-if table for one project, served from its saved model."""
+    svc = service or get_service()
+    df = svc.history(pid)
+    budget = svc.budget(pid, df)
+    spent = float(df['y'].sum())
+
+    future = future_frame(df, max(horizons))
+    daily = scenario_costs(svc.get_model(pid), future, headcounts)
+    idx = exhaustion_index(daily, spent, budget)
+    cum = np.cumsum(daily, axis=1)
+
+    hc = np.repeat(np.asarray(headcounts), len(horizons))
+    hz = np.tile(np.asarray(horizons), len(headcounts))
+    ex = np.repeat(idx, len(horizons))
+    hit = (ex >= 0) & (ex < hz)
+
+    forecast = cum[np.repeat(np.arange(len(headcounts)), len(horizons)), hz - 1]
+    status = np.where(spent >= budget, "CRITICAL_OVER", np.where(hit, "WARNING", "SAFE"))
+    runway = np.where(hit, future['ds'].to_numpy()[np.clip(ex, 0, None)], np.datetime64('NaT'))
+
+    return pd.DataFrame({
+        'headcount': hc,
+        'horizon_days': hz,
+        'forecast_spend': forecast,
+        'projected_total': spent + forecast,
+        'pct_budget': (spent + forecast) / budget * 100,
+        'status': status,
+        'runway': pd.to_datetime(runway),
+        'days_left': np.where(hit, ex + 1, np.nan),
+    })
+
+def monte_carlo_runway(pid, horizon=365, samples=MC_SAMPLES, headcount=None, seed=42,
+                       service=None, max_cells=MC_MAX_CELLS):
+    """[F3][F8] Runway distribution from the model's predictive sample paths.
+
+    Paths are drawn in batches of at most `max_cells` (days x samples) and
+    only their exhaustion day is kept, so memory does not grow with `samples`.
+    """
+    svc = service or get_service()
+    df = svc.history(pid)
+    budget = svc.budget(pid, df)
+    spent = float(df['y'].sum())
+    model = svc.get_model(pid)
+
+    future = future_frame(df, horizon)
+    if headcount is None: headcount = df['headcount'].iloc[-1]
+    future['headcount'] = headcount
+
+    result = {"project": pid, "samples": samples, "horizon_days": horizon, "spent": spent, "budget": budget}
+    if spent >= budget:
+        return {**result, "status": "CRITICAL_OVER", "prob_overrun": 1.0, "p10": None, "p50": None, "p90": None}
+
+    np.random.seed(seed)  # Prophet sampling pakai RNG global numpy
+    batch = max(1, min(samples, max_cells // horizon))
+    days, drawn = [], 0
+    original = model.uncertainty_samples
+    try:
+        while drawn < samples:
+            model.uncertainty_samples = min(batch, samples - drawn)
+            paths = model.predictive_samples(future)['yhat'].T   # (batch, horizon)
+            days.append(exhaustion_index(paths, spent, budget))
+            drawn += paths.shape[0]
+    finally:
+        model.uncertainty_samples = original
+
+    days = np.concatenate(days).astype(float)
+    days[days < 0] = np.inf                                    # tidak habis dalam horizon
+    dates = future['ds'].to_numpy()
+
+    def pct(q):
+        d = np.quantile(days, q, method='inverted_cdf')
+        return pd.Timestamp(dates[int(d)]) if np.isfinite(d) else None
+
+    prob = float(np.isfinite(days).mean())
+    return {
+        **result,
+        "status": "WARNING" if prob >= 0.10 else "SAFE",   # P10 sudah jatuh di dalam horizon
+        "prob_overrun": prob,
+        "p10": pct(0.10),
+        "p50": pct(0.50),
+        "p90": pct(0.90),
+    }
+
+if __name__ == "__main__":
+    pid = "PROJ_BETA"
+    start = time.perf_counter()
+    table = scenario_grid(pid)
+    print(f"[INFO] {pid}: {len(HEADCOUNTS)} headcounts x {len(HORIZONS)} horizons in "
+          f"{(time.perf_counter() - start)*1000:.0f} ms\n")
+    print(table.pivot(index='headcount', columns='horizon_days', values='pct_budget').round(1))
+
+    print("\nMONTE CARLO RUNWAY (365 days):")
+    for p in get_service().projects():
+        r = monte_carlo_runway(p)
+        if r['status'] == "CRITICAL_OVER":
+            print(f"  {p:<16} | {r['status']:<13} | ALREADY EXCEEDED")
+            continue
+        fmt = lambda d: d.strftime('%Y-%m-%d') if d is not None else "> horizon"
+        print(f"  {p:<16} | {r['status']:<13} | P(overrun) {r['prob_overrun']*100:5.1f}% | "
+              f"P10 {fmt(r['p10'])} | P50 {fmt(r['p50'])} | P90 {fmt(r['p90'])}")
@@ -0,0 +1,328 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import time
+import argparse
+import re
+import itertools
+import joblib
+from collections import OrderedDict
+
+# --- CONFIG ---
+BASE_DIR = os.getcwd()
+MODEL_PATH = os.path.join(BASE_DIR, 'models', 'nlp', 'task_categorizer_model.pkl')
+HASHED_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'nlp', 'task_categorizer_hashed.pkl')
+DATA_PATH = os.path.join(BASE_DIR, 'datasets', 'synthetic', 'task_nlp_train.csv')
+
+LOW_CONFIDENCE = 0.5    # di bawah ini: AI ragu-ragu, perlu dikoreksi manusia
+STREAM_BATCH = 10_000   # teks per transform saat classify_stream
+CORRECTION_BATCH = 32   # koreksi per partial_fit (model hashed)
+CORRECTION_PASSES = 5   # koreksi diulang beberapa kali supaya cukup menggeser bobot SGD
+BENCH_SIZES = [1, 10, 100, 1_000, 10_000, 100_000, 1_000_000]
+
+# Cache prediksi: teks dinormalisasi (lowercase, spasi, filler umum di log task)
+CACHE_SIZE = 50_000
+CACHE_CHECK_S = 1.0   # artifact model di-stat paling sering 1x per detik
+FILLER_PREFIXES = ["tolong", "sedang", "progress", "selesai", "lanjut", "cek", "urgent"]
+FILLER_SUFFIXES = ["hari ini", "secepatnya", "untuk klien", "di production", "pending", "besok", "untuk sprint"]
+MIN_CORE_WORDS = 2    # filler hanya dibuang kalau sisa task minimal 2 kata ("progress report" tetap utuh)
+
+ICONS = {"DEVELOPMENT": "💻", "BUGFIX": "🐞", "MEETING": "📅", "DESIGN": "🎨", "DEVOPS": "🚀"}
+
+class TaskCategorizer:
+    """TF-IDF + LogisticRegression task classifier: load once, classify whole batches.
+
+    The pipeline's vectorizer runs once per batch and the class comes from
+    the argmax of predict_proba, so predict and predict_proba no longer
+    repeat the same sparse transform.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, model=None):
+        if model is None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"[ERR] Model not found at {model_path}. "
+                                        "Run 'src/utils/train_task_category.py' first.")
+            model = joblib.load(model_path)
+        self.model_path = model_path
+        self.model = model
+        self.vectorizer = model[:-1]   # semua step sebelum classifier (TF-IDF)
+        self.clf = model[-1]
+        self.classes_ = self.clf.classes_
+
+    @classmethod
+    def from_registry(cls, ref="latest", registry=None, mmap=True):
+        """Categorizer for a registry version (alias or hash) of the task model."""
+        import model_registry
+        reg = registry or model_registry.get_registry()
+        return cls(reg.path(model_registry.NLP_MODEL, ref),
+                   model=reg.load(model_registry.NLP_MODEL, ref, mmap=mmap))
+
+    def classify(self, texts, low_confidence=LOW_CONFIDENCE):
+        """category / confidence / low_confidence per text from one sparse transform of the batch."""
+        index = texts.index if isinstance(texts, pd.Series) else None
+        texts = [str(t) for t in texts]
+        if not texts:
+            return pd.DataFrame({'category': pd.Series(dtype=object), 'confidence': pd.Series(dtype=float),
+                                 'low_confidence': pd.Series(dtype=bool)})
+        proba = self.clf.predict_proba(self.vectorizer.transform(texts))
+        best = proba.argmax(axis=1)   # == clf.predict (softmax monoton terhadap decision_function)
+        confidence = proba[np.arange(len(best)), best]
+        return pd.DataFrame({
+            'category': self.classes_[best],
+            'confidence': confidence,
+            'low_confidence': confidence < low_confidence,
+        }, index=index)
+
+    def classify_one(self, text):
+        row = self.classify([text]).iloc[0]
+        return {"category": row['category'], "confidence": float(row['confidence']),
+                "low_confidence": bool(row['low_confidence'])}
+
+    def learn(self, texts, labels, passes=CORRECTION_PASSES, batch_size=CORRECTION_BATCH):
+        """Absorb labelled corrections with partial_fit (hashed model only; the TF-IDF one needs a retrain)."""
+        if not hasattr(self.clf, 'partial_fit'):
+            raise TypeError(f"[ERR] {type(self.clf).__name__} cannot learn incrementally. "
+                            "Train with 'train_task_category.py --mode hashed'.")
+        texts, labels = [str(t) for t in texts], np.asarray(labels)
+        unknown = set(labels) - set(self.classes_)
+        if unknown: raise ValueError(f"[ERR] Unknown categories {sorted(unknown)}; expected {list(self.classes_)}")
+        features = self.vectorizer.transform(texts)   # stateless: tidak ada vocabulary untuk di-update
+        for _ in range(passes):
+            for i in range(0, len(texts), batch_size):
+                self.clf.partial_fit(features[i:i + batch_size], labels[i:i + batch_size])
+        return self
+
+    def classify_stream(self, texts, batch_size=STREAM_BATCH):
+        """Classify any iterable of texts (file lines, queue, generator) in bounded batches.
+
+        Yields one DataFrame per batch with the text alongside the result,
+        so memory stays at batch_size texts however long the stream is.
+        """
+        it = iter(texts)
+        while True:
+            batch = list(itertools.islice(it, batch_size))
+            if not batch: return
+            res = self.classify(batch)
+            res.insert(0, 'text', batch)
+            yield res
+
+# ==========================================
+# BENCHMARK
+# ==========================================
+def random_tasks(n, seed=42, data_path=DATA_PATH):
+    """n task texts sampled from the training sentences with extra prefix/suffix noise."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(data_path)['text'].to_numpy(dtype=object)
+    prefix = np.array(["", "tolong", "lanjut", "cek", "urgent"], dtype=object)
+    suffix = np.array(["", "hari ini", "besok", "untuk sprint", "v2"], dtype=object)
+    texts = prefix[rng.integers(0, len(prefix), n)] + " " + base[rng.integers(0, len(base), n)] + " " + \
+        suffix[rng.integers(0, len(suffix), n)]
+    return [t.strip() for t in texts]
+
+def benchmark(sizes=BENCH_SIZES, categorizer=None, per_item_n=200, seed=42):
+    """Texts/s of batch classify per size vs the old predict + predict_proba per text."""
+    cat = categorizer or TaskCategorizer()
+    texts = random_tasks(max(sizes), seed)
+
+    # Jalur lama: 2x pipeline (predict + predict_proba) per teks
+    sample = texts[:per_item_n]
+    start = time.perf_counter()
+    old = [(cat.model.predict([t])[0], max(cat.model.predict_proba([t])[0])) for t in sample]
+    per_item_s = (time.perf_counter() - start) / len(sample)
+
+    ref = cat.classify(sample)
+    same = (list(ref['category']) == [c for c, _ in old] and
+            np.allclose(ref['confidence'], [p for _, p in old], rtol=0, atol=1e-12))
+
+    rows = []
+    for n in sizes:
+        batch_s = np.inf
+        for _ in range(max(1, min(20, 10_000 // n))):   # batch kecil diulang, ambil yang tercepat
+            start = time.perf_counter()
+            res = cat.classify(texts[:n])
+            batch_s = min(batch_s, time.perf_counter() - start)
+        rows.append({"texts": n, "batch_s": batch_s, "texts_per_s": n / batch_s,
+                     "per_item_texts_per_s": 1 / per_item_s, "speedup": per_item_s * n / batch_s,
+                     "low_confidence_rate": float(res['low_confidence'].mean())})
+    table = pd.DataFrame(rows)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+    print(f"[QC] batch == predict/predict_proba per text: {same}")
+    return table
+
+# ==========================================
+# PREDICTION CACHE (teks berulang)
+# ==========================================
+_SPACES = re.compile(r"\s+")
+# Filler harus kata utuh: dipisah spasi dari sisa teks di kedua sisi
+_PREFIX = re.compile(r"^(?:(?:%s) )+(?=\S)" % "|".join(map(re.escape, FILLER_PREFIXES)))
+_SUFFIX = re.compile(r"(?<=\S)(?: (?:%s))+$" % "|".join(map(re.escape, FILLER_SUFFIXES)))
+
+def normalize_text(text):
+    """Cache key: lowercase, single spaces, leading/trailing filler words removed.
+
+    Suffixes go first, so a prefix filler is never judged against a bare
+    suffix ("tolong hari ini"). If fewer than MIN_CORE_WORDS words would
+    remain, the text is kept whole: "progress report" is a task, not
+    filler + "report".
+    """
+    text = _SPACES.sub(" ", str(text).lower()).strip()
+    core = _PREFIX.sub("", _SUFFIX.sub("", text))
+    return core if len(core.split(" ")) >= MIN_CORE_WORDS else text
+
+def _signature(path):
+    if not os.path.exists(path): return None
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+class CachedCategorizer:
+    """Bounded LRU of predictions in front of a TaskCategorizer, keyed by normalize_text().
+
+    Misses of a batch are classified together (on their normalized text, so
+    every variant of a task gets the same answer). The model file is
+    re-stat'ed at most every CACHE_CHECK_S; when it changed, the model is
+    reloaded and the cache dropped.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, maxsize=CACHE_SIZE, categorizer=None, check_s=CACHE_CHECK_S):
+        self.model_path = model_path
+        self.maxsize = maxsize
+        self.check_s = check_s
+        self.categorizer = categorizer or TaskCategorizer(model_path)
+        self._sig = _signature(model_path)
+        self._checked = time.monotonic()
+        self._cache = OrderedDict()   # normalized text -> (category, confidence)
+        self.counters = dict(hits=0, misses=0, evictions=0, invalidations=0,
+                             hit_calls=0, hit_s=0.0, miss_calls=0, miss_s=0.0)
+
+    def _check_artifact(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_s: return
+        self._checked = now
+        sig = _signature(self.model_path)
+        if sig == self._sig or sig is None: return   # file hilang sementara (mis. saat replace): pakai model lama
+        self.categorizer = TaskCategorizer(self.model_path)
+        self._sig = sig
+        self._cache.clear()
+        self.counters['invalidations'] += 1
+        print(f"[CACHE] {self.model_path} changed, model reloaded and cache cleared")
+
+    def clear(self):
+        self._cache.clear()
+
+    def _predict(self, texts):
+        """(category, confidence) per text; misses classified in one batch."""
+        start = time.perf_counter()
+        self._check_artifact()
+        keys = [normalize_text(t) for t in texts]
+
+        results, missing = {}, []
+        for k in dict.fromkeys(keys):   # unik, urutan tetap
+            hit = self._cache.get(k)
+            if hit is None: missing.append(k)
+            else:
+                self._cache.move_to_end(k)
+                results[k] = hit
+        n_hits = sum(1 for k in keys if k in results)
+
+        if missing:
+            res = self.categorizer.classify(missing)
+            for k, cat, conf in zip(missing, res['category'], res['confidence']):
+                results[k] = (cat, float(conf))
+                self._cache[k] = results[k]
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+                self.counters['evictions'] += 1
+
+        c = self.counters
+        c['hits'] += n_hits
+        c['misses'] += len(keys) - n_hits
+        c['miss_s' if missing else 'hit_s'] += time.perf_counter() - start
+        c['miss_calls' if missing else 'hit_calls'] += 1
+        return [results[k] for k in keys]
+
+    def classify(self, texts, low_confidence=LOW_CONFIDENCE):
+        """Same output as TaskCategorizer.classify, served from the cache where possible."""
+        index = texts.index if isinstance(texts, pd.Series) else None
+        preds = self._predict(texts)
+        confidence = np.array([p[1] for p in preds], dtype=float)
+        return pd.DataFrame({'category': [p[0] for p in preds], 'confidence': confidence,
+                             'low_confidence': confidence < low_confidence}, index=index)
+
+    def classify_one(self, text):
+        category, confidence = self._predict([text])[0]   # tanpa DataFrame: jalur hit cukup dict lookup
+        return {"category": category, "confidence": confidence, "low_confidence": confidence < LOW_CONFIDENCE}
+
+    def stats(self):
+        c = self.counters
+        total = c['hits'] + c['misses']
+        return {"hits": c['hits'], "misses": c['misses'], "hit_rate": c['hits'] / total if total else 0.0,
+                "size": len(self._cache), "maxsize": self.maxsize, "evictions": c['evictions'],
+                "invalidations": c['invalidations'],
+                # latency rata-rata per call: semua dari cache vs call yang butuh model
+                "hit_call_ms": c['hit_s'] / max(c['hit_calls'], 1) * 1000,
+                "miss_call_ms": c['miss_s'] / max(c['miss_calls'], 1) * 1000}
+
+def benchmark_cache(n=20_000, cached=None, seed=42):
+    """Per-entry classify_one with and without the cache on a repetitive task log."""
+    cached = cached or CachedCategorizer()
+    cat = cached.categorizer
+    texts = random_tasks(n, seed)
+
+    start = time.perf_counter()
+    direct = [cat.classify_one(t)['category'] for t in texts[:2_000]]
+    direct_s = (time.perf_counter() - start) / len(direct)
+
+    latency = np.empty(n)
+    got = []
+    for i, t in enumerate(texts):
+        t0 = time.perf_counter()
+        got.append(cached.classify_one(t)['category'])
+        latency[i] = time.perf_counter() - t0
+
+    st = cached.stats()
+    agree = float(np.mean([a == b for a, b in zip(direct, got)]))
+    res = {**st, "direct_ms": direct_s * 1000, "cached_mean_ms": latency.mean() * 1000,
+           "cached_p50_ms": np.median(latency) * 1000, "cached_p99_ms": np.percentile(latency, 99) * 1000,
+           "speedup": direct_s / latency.mean(), "category_agreement": agree}
+    print(f"[INFO] Direct : {res['direct_ms']:.3f} ms/entry")
+    print(f"[INFO] Cached : mean {res['cached_mean_ms']:.3f} ms | p50 {res['cached_p50_ms']:.3f} ms | "
+          f"p99 {res['cached_p99_ms']:.3f} ms -> {res['speedup']:.0f}x")
+    print(f"[INFO] Call latency: all-hit {st['hit_call_ms']:.4f} ms | with miss {st['miss_call_ms']:.3f} ms")
+    print(f"[INFO] Hit rate {st['hit_rate']*100:.1f}% ({st['size']:,} keys for {n:,} entries) | "
+          f"same category as uncached: {agree*100:.2f}%")
+    return res
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch task categorizer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("classify", help="classify texts (args, or one per line from a file / stdin)")
+    c.add_argument("texts", nargs="*")
+    c.add_argument("--file", default=None, help="'-' = stdin")
+    c.add_argument("--batch-size", type=int, default=STREAM_BATCH)
+    b = sub.add_parser("bench", help="throughput for 1 to 1M texts")
+    b.add_argument("--sizes", type=int, nargs="*", default=BENCH_SIZES)
+    k = sub.add_parser("bench-cache", help="per-entry latency with/without the prediction cache")
+    k.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench-cache":
+        benchmark_cache(args.rows)
+        return 0
+
+    cat = TaskCategorizer()
+    if args.command == "bench":
+        benchmark(args.sizes, cat)
+        return 0
+
+    if args.file:
+        fh = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+        lines = (line.rstrip('\n') for line in fh)
+    else:
+        lines = iter(args.texts)
+    for batch in cat.classify_stream(lines, args.batch_size):
+        batch.to_csv(sys.stdout, index=False, header=False, sep='\t', float_format='%.4f')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
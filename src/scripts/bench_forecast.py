@@ -0,0 +1,253 @@
+import pandas as pd
+import numpy as np
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import platform
+import tracemalloc
+from datetime import datetime
+
+# ==========================================
+# 1. SETUP PATH & CONFIG
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'core'))
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'utils'))
+
+import data_store
+import backtest
+import engines
+import gen_cost_data
+
+logging.getLogger('prophet').setLevel(logging.WARNING)
+logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+# Baseline sengaja machine-local (Result/benchmarks di-gitignore): angka detik hanya
+# bisa dibandingkan di mesin yang sama, jadi tiap mesin/CI simpan sendiri via --save-baseline
+RESULT_DIR = os.path.join(BASE_DIR, 'Result', 'benchmarks')
+BASELINE_PATH = os.path.join(RESULT_DIR, 'forecast_baseline.json')
+
+SEED = 42
+START_DATE = datetime(2015, 1, 1)
+REGRESSION_TOLERANCE = 0.25   # > 25% lebih lambat dari baseline = regresi
+REGRESSION_MIN_S = 0.05       # abaikan selisih kecil (noise timer)
+
+# Param Prophet eksplisit untuk semua key tuning, supaya best_params.json tidak ikut mengubah angka
+BENCH_PARAMS = {'changepoint_prior_scale': 0.05, 'seasonality_prior_scale': 10.0, 'seasonality_mode': 'multiplicative'}
+
+# Grid benchmark: penuh sesuai kebutuhan, --quick untuk cek cepat
+GRIDS = {
+    "full":  {"years": [1, 3, 5, 10], "events": [0, 10, 50, 200], "projects": [1, 10, 100, 500]},
+    "quick": {"years": [1, 3],        "events": [0, 20],          "projects": [1, 10]},
+}
+
+# ==========================================
+# 2. HELPER
+# ==========================================
+MEASURE_MEMORY = True   # --skip-memory: tanpa run tambahan di bawah tracemalloc
+
+def measure(fn, repeat=1):
+    """Best wall time over `repeat` untraced runs, plus peak memory from one separate traced run.
+
+    tracemalloc hooks every allocation and slows pandas/numpy code down a
+    lot, so it never wraps the timed runs.
+    """
+    best, out = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+
+    peak = float('nan')
+    if MEASURE_MEMORY:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out, best, peak
+
+def engine_params(engine):
+    return BENCH_PARAMS if engine == "prophet" else None
+
+def warm_up(engine):
+    """Pay one-off import costs before the first timed stage."""
+    if engine == "prophet":
+        from prophet import Prophet  # noqa: F401  (import prophet + cmdstanpy ~1-2s)
+
+def make_history(n_projects, years, seed=SEED):
+    projects = gen_cost_data.make_projects(n_projects)
+    return gen_cost_data.build_frames(projects, days=365 * years, start_date=START_DATE, seed=seed, verbose=False)
+
+def spaced_events(df, n_events, window=7):
+    """`n_events` project_hold rows spread evenly over the history."""
+    if n_events == 0: return df.iloc[:0][['project_id']].assign(holiday='', ds=df['ds'].iloc[:0], lower_window=0, upper_window=0)
+    idx = np.linspace(0, len(df) - window - 1, n_events).astype(int)
+    return pd.DataFrame({'project_id': df['project_id'].iloc[0], 'holiday': 'project_hold',
+                         'ds': df['ds'].iloc[idx].to_numpy(), 'lower_window': 0, 'upper_window': window})
+
+# ==========================================
+# 3. SUITES
+# ==========================================
+def bench_history(grid, engine, repeat):
+    """fit / predict / cv vs years of history (1 project, generator events)."""
+    rows = []
+    for years in grid["years"]:
+        costs, events = make_history(1, years)
+        df = costs.assign(ds=pd.to_datetime(costs['ds']))
+        hol = events.assign(ds=pd.to_datetime(events['ds']))
+
+        model, fit_s, fit_mem = measure(lambda: engines.make_engine(engine).fit(df, hol, engine_params(engine), verbose=False), repeat)
+        _, pred_s, pred_mem = measure(lambda: model.forecast(90, df['headcount'].iloc[-1]), repeat)
+        rows += [
+            {"suite": "history", "case": f"{years}y", "stage": "fit", "seconds": fit_s, "peak_mb": fit_mem / 1e6},
+            {"suite": "history", "case": f"{years}y", "stage": "predict", "seconds": pred_s, "peak_mb": pred_mem / 1e6},
+        ]
+
+        if 365 * years > 760:   # CV butuh > initial (730 hari) + horizon
+            def cv():
+                with tempfile.TemporaryDirectory() as tmp:  # cache kosong -> semua fold dihitung
+                    return backtest.run_backtest("BENCH", df, hol, params=engine_params(engine), engine=engine,
+                                                 workers=1, cache_dir=tmp)
+            res, cv_s, cv_mem = measure(cv, repeat)
+            rows.append({"suite": "history", "case": f"{years}y", "stage": f"cv_{res['folds']}folds",
+                         "seconds": cv_s, "peak_mb": cv_mem / 1e6})
+    return rows
+
+def bench_events(grid, engine, repeat):
+    """fit / predict vs number of holiday/event rows (3 years, 1 project)."""
+    rows = []
+    costs, _ = make_history(1, 3)
+    df = costs.assign(ds=pd.to_datetime(costs['ds']))
+    for n in grid["events"]:
+        hol = spaced_events(df, n)
+        model, fit_s, fit_mem = measure(lambda: engines.make_engine(engine).fit(df, hol, engine_params(engine), verbose=False), repeat)
+        _, pred_s, pred_mem = measure(lambda: model.forecast(90, df['headcount'].iloc[-1]), repeat)
+        rows += [
+            {"suite": "events", "case": f"{n}ev", "stage": "fit", "seconds": fit_s, "peak_mb": fit_mem / 1e6},
+            {"suite": "events", "case": f"{n}ev", "stage": "predict", "seconds": pred_s, "peak_mb": pred_mem / 1e6},
+        ]
+    return rows
+
+def bench_projects(grid, engine, repeat):
+    """generate -> partition cache -> load + fit every project, vs number of projects."""
+    rows = []
+    for n in grid["projects"]:
+        tmp = tempfile.mkdtemp(prefix="bench_forecast_")
+        try:
+            (costs, events), gen_s, gen_mem = measure(lambda: make_history(n, 3), 1)
+            costs_path, events_path = os.path.join(tmp, 'costs.csv'), os.path.join(tmp, 'events.csv')
+            costs.to_csv(costs_path, index=False)
+            events.to_csv(events_path, index=False)
+
+            store = data_store.CostStore(costs_path, events_path, os.path.join(tmp, 'cache'))
+            _, build_s, build_mem = measure(store.build, 1)
+
+            def fit_all():
+                for pid in store.projects():
+                    df, hol = store.get(pid)
+                    engines.make_engine(engine).fit(df, hol, engine_params(engine), verbose=False)
+            _, fit_s, fit_mem = measure(fit_all, repeat)
+
+            case = f"{n}proj"
+            rows += [
+                {"suite": "projects", "case": case, "stage": "generate", "seconds": gen_s, "peak_mb": gen_mem / 1e6},
+                {"suite": "projects", "case": case, "stage": "store_build", "seconds": build_s, "peak_mb": build_mem / 1e6},
+                {"suite": "projects", "case": case, "stage": "load_fit_all", "seconds": fit_s, "peak_mb": fit_mem / 1e6},
+            ]
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return rows
+
+SUITES = {"history": bench_history, "events": bench_events, "projects": bench_projects}
+
+# ==========================================
+# 4. BASELINE & REGRESI
+# ==========================================
+def compare(rows, baseline):
+    """Mark rows that are slower than the stored baseline beyond tolerance."""
+    base = {(r["suite"], r["case"], r["stage"], r["engine"]): r["seconds"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in rows:
+        ref = base.get((r["suite"], r["case"], r["stage"], r["engine"]))
+        r["baseline_s"] = ref
+        r["regression"] = bool(ref is not None and r["seconds"] > ref * (1 + REGRESSION_TOLERANCE)
+                               and r["seconds"] - ref > REGRESSION_MIN_S)
+        if r["regression"]: regressions.append(r)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast fit/predict/CV scaling benchmark")
+    parser.add_argument("--suite", choices=list(SUITES), nargs="*", default=list(SUITES))
+    parser.add_argument("--engine", choices=list(engines.ENGINES), default="prophet")
+    parser.add_argument("--quick", action="store_true", help="small grid for a fast sanity run")
+    parser.add_argument("--repeat", type=int, default=1, help="best-of-N timing")
+    parser.add_argument("--skip-memory", action="store_true", help="timings only, no extra traced run per stage")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the new baseline (machine-local, Result/ is not tracked)")
+    args = parser.parse_args(argv)
+
+    global MEASURE_MEMORY
+    MEASURE_MEMORY = not args.skip_memory
+    grid = GRIDS["quick" if args.quick else "full"]
+    print(f"[INFO] Benchmark engine={args.engine} grid={'quick' if args.quick else 'full'} suites={args.suite}")
+    warm_up(args.engine)
+
+    rows = []
+    for name in args.suite:
+        start = time.perf_counter()
+        suite_rows = SUITES[name](grid, args.engine, args.repeat)
+        for r in suite_rows: r["engine"] = args.engine
+        rows += suite_rows
+        print(f"[INFO] Suite '{name}' done in {time.perf_counter() - start:.1f}s")
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f: baseline = json.load(f)
+    if baseline and (baseline.get("machine"), baseline.get("cpus")) != (platform.machine(), os.cpu_count()):
+        print(f"[INFO] Baseline was recorded on {baseline.get('machine')} with {baseline.get('cpus')} CPUs; "
+              "timings are only comparable on the same machine")
+    regressions = compare(rows, baseline)
+
+    report = {
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": SEED,
+        "params": engine_params(args.engine),
+        "grid": grid,
+        "results": rows,
+    }
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    out_path = os.path.join(RESULT_DIR, f"forecast_bench_{stamp}.json")
+    with open(out_path, 'w') as f: json.dump(report, f, indent=2)
+
+    table = pd.DataFrame(rows)
+    print("\n" + table[["suite", "case", "stage", "seconds", "peak_mb", "baseline_s", "regression"]]
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"\n[INFO] Results written to {out_path}")
+
+    if args.save_baseline:
+        # Gabung dengan baseline lama supaya suite/engine lain tidak hilang
+        keep = [r for r in baseline.get("results", [])
+                if (r["suite"], r["case"], r["stage"], r["engine"]) not in
+                {(x["suite"], x["case"], x["stage"], x["engine"]) for x in rows}]
+        with open(BASELINE_PATH, 'w') as f: json.dump({**report, "results": keep + rows}, f, indent=2)
+        print(f"[INFO] Baseline updated: {BASELINE_PATH}")
+
+    if regressions:
+        print(f"[FAILED] {len(regressions)} stage(s) regressed more than {REGRESSION_TOLERANCE*100:.0f}% vs baseline.")
+        return 1
+    print("[SUCCESS] No regressions against baseline." if baseline else "[INFO] No baseline yet (use --save-baseline).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,52 +1,48 @@
-import joblib
 import os
-import pandas as pd
+import sys
 
 # Load Model
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 MODEL_PATH = os.path.join(BASE_DIR, 'models', 'nlp', 'task_categorizer_model.pkl')
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'core'))
+
+from task_categorizer import TaskCategorizer, ICONS
 
 if not os.path.exists(MODEL_PATH):
     print("Model not found. Run 'src/utils/train_task_category.py' first.")
     exit()
 
-model = joblib.load(MODEL_PATH)
-
-def predict_task(task_text):
-    # Prediksi Kategori
-    category = model.predict([task_text])[0]
-    
-    # Ambil tingkat keyakinan (Confidence Score)
-    probs = model.predict_proba([task_text])[0]
-    max_prob = max(probs)
-    
-    # Logika UI: Beri ikon biar cantik
-    icons = {
-        "DEVELOPMENT": "💻", "BUGFIX": "🐞", "MEETING": "📅", 
-        "DESIGN": "🎨", "DEVOPS": "🚀"
-    }
-    icon = icons.get(category, "❓")
-    
-    print(f"\nINPUT: '{task_text}'")
-    print(f" -> AI Category : {icon} {category}")
-    print(f" -> Confidence  : {max_prob*100:.1f}%")
-    
-    # Jika confidence rendah (< 50%), mungkin AI bingung
-    if max_prob < 0.5:
-        print("    (⚠️ AI ragu-ragu, mungkin perlu dikoreksi manusia)")
+categorizer = TaskCategorizer(MODEL_PATH)
+
+def predict_tasks(texts):
+    # Semua teks diklasifikasi sekali jalan (1x TF-IDF transform untuk seluruh batch)
+    results = categorizer.classify(texts)
+    for text, res in zip(texts, results.itertuples()):
+        # Logika UI: Beri ikon biar cantik
+        icon = ICONS.get(res.category, "❓")
+
+        print(f"\nINPUT: '{text}'")
+        print(f" -> AI Category : {icon} {res.category}")
+        print(f" -> Confidence  : {res.confidence*100:.1f}%")
+
+        # Jika confidence rendah (< 50%), mungkin AI bingung
+        if res.low_confidence:
+            print("    (⚠️ AI ragu-ragu, mungkin perlu dikoreksi manusia)")
 
 # --- TEST CASES ---
 print("=== SMART TASK CATEGORIZER TEST ===")
 
-# Skenario 1: Jelas
-predict_task("benerin error di halaman login")
-predict_task("meeting sama pak bos")
-predict_task("slicing design dashboard admin")
+predict_tasks([
+    # Skenario 1: Jelas
+    "benerin error di halaman login",
+    "meeting sama pak bos",
+    "slicing design dashboard admin",
 
-# Skenario 2: Campuran Inggris/Indo (Model TF-IDF cukup kuat di sini)
-predict_task("deploy to production server")
-predict_task("fixing bug typo di navbar")
+    # Skenario 2: Campuran Inggris/Indo (Model TF-IDF cukup kuat di sini)
+    "deploy to production server",
+    "fixing bug typo di navbar",
 
-# Skenario 3: Kalimat agak ambigu
-predict_task("diskusi soal api backend") # Harusnya Meeting atau Dev? Tergantung training
-predict_task("makan siang") # Out of context test
\ No newline at end of file
+    # Skenario 3: Kalimat agak ambigu
+    "diskusi soal api backend", # Harusnya Meeting atau Dev? Tergantung training
+    "makan siang", # Out of context test
+])
@@ -1,8 +1,11 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import os
-import random
+import time
+import argparse
 
 # --- KONFIGURASI 4 TIPE PROJECT BERBEDA ---
 PROJECTS_DB = [
@@ -39,71 +42,226 @@ PROJECTS_DB = [
 
 YEARS = 3
 DAYS = 365 * YEARS
-START_DATE = datetime.now() - timedelta(days=DAYS)
-
-def get_seasonality(date):
-    # [F2] Simulasi pola mingguan & akhir bulan
-    if date.weekday() >= 5: return 0.9 # Weekend cost 90% (Lembur/Server)
-    if date.day >= 25: return 1.2      # End month spike
-    return 1.0
-
-def generate_data():
-    print(f"[INFO] Generating dataset: {YEARS} Years ({DAYS} rows/project)...")
-    
-    costs, events = [], []
-
-    for p in PROJECTS_DB:
-        print(f"[INFO] Processing: {p['name']}")
-        curr_hc = p['start_hc']
-        shock_rem = 0
-        is_shock = False
-
-        for i in range(DAYS):
-            date = START_DATE + timedelta(days=i)
-            
-            # [F6] Headcount Dynamics
-            if i % 30 == 0 and i > 0:
-                # Logic beda tiap tipe project
-                if "Growth" in p['name']: change = random.choice([0, 1, 2])
-                elif "Declining" in p['name']: change = random.choice([-1, 0])
-                else: change = random.choice([-1, 0, 1])
-                
-                curr_hc = max(2, min(p['max_hc'], curr_hc + change))
-
-            # [F4] Shock Injection (Project Hold)
-            if (not is_shock and random.random() < 0.001) or (i == 300):
-                if random.random() < p['shock_prob']:
-                    is_shock = True
-                    shock_rem = random.randint(5, 14)
-                    events.append({
-                        'project_id': p['id'], 'holiday': 'project_hold',
-                        'ds': date, 'lower_window': 0, 'upper_window': shock_rem
-                    })
-
-            # Base Cost Calculation
-            base = curr_hc * p['rate']
-            season = get_seasonality(date)
-            noise = np.random.normal(0, base * p['volatility'])
-            daily = (base * season) + noise
-            
-            if is_shock:
-                daily = base * 0.1 # Maintenance only
-                shock_rem -= 1
-                if shock_rem <= 0: is_shock = False
-
-            costs.append({
-                'project_id': p['id'],
-                'ds': date,
-                'y': max(0, round(daily)),
-                'cap': p['budget'],    # [F1] Data Plafon
-                'headcount': curr_hc   # [F6] Data Regressor
-            })
-
-    # Export
-    os.makedirs('datasets/synthetic', exist_ok=True)
-    pd.DataFrame(costs).to_csv('datasets/synthetic/multi_project_costs.csv', index=False)
-    pd.DataFrame(events).to_csv('datasets/synthetic/multi_project_events.csv', index=False)
-    print("[SUCCESS] Data generated in datasets/synthetic/")
+# Tanpa --start-date: data berakhir tengah malam hari ini, kecuali ada --seed ->
+# tanggal akhir tetap supaya seed yang sama selalu menghasilkan file yang identik
+SEED_END_DATE = datetime(2026, 1, 1)
+
+OUT_DIR = os.path.join('datasets', 'synthetic')
+COST_COLUMNS = ['project_id', 'ds', 'y', 'cap', 'headcount']
+EVENT_COLUMNS = ['project_id', 'holiday', 'ds', 'lower_window', 'upper_window']
+
+# Load test: project diproses per chunk, tiap chunk 1 task worker -> memori terbatas
+CHUNK_PROJECTS = 64
+GEN_WORKERS = max(1, os.cpu_count() or 1)
+
+SHOCK_DAILY_PROB = 0.001   # Peluang cek project hold per hari
+SHOCK_FORCED_DAY = 300     # Hari ke-300 selalu dicek (supaya tiap dataset punya contoh hold)
+HC_STEP_DAYS = 30
+
+def hc_changes(p):
+    # Logic beda tiap tipe project
+    if "Growth" in p['name']: return [0, 1, 2]
+    if "Declining" in p['name']: return [-1, 0]
+    return [-1, 0, 1]
+
+def seasonality(ds):
+    # [F2] Simulasi pola mingguan & akhir bulan: weekend 90% (lembur/server), tanggal >= 25 spike 120%
+    return np.where(ds.weekday >= 5, 0.9, np.where(ds.day >= 25, 1.2, 1.0))
+
+def make_projects(n):
+    """N project configs for load testing, cycling through the 4 PROJECTS_DB archetypes."""
+    if n <= len(PROJECTS_DB): return PROJECTS_DB[:n]
+    return [{**PROJECTS_DB[i % len(PROJECTS_DB)], "id": f"PROJ_{i:05d}"} for i in range(n)]
+
+def project_rng(seed, index):
+    """Independent stream per project, keyed by its position - same output for any chunking/worker count."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+
+def shock_windows(rng, days, shock_prob):
+    """[F4] Project hold start days and lengths; a new hold only starts outside an active one."""
+    checks = np.flatnonzero(rng.random(days) < SHOCK_DAILY_PROB)
+    if days > SHOCK_FORCED_DAY: checks = np.union1d(checks, [SHOCK_FORCED_DAY])
+    accepted = checks[rng.random(len(checks)) < shock_prob]
+    lengths = rng.integers(5, 15, size=len(accepted))   # 5..14 hari
+
+    starts, lens, free_from = [], [], 0
+    for day, length in zip(accepted, lengths):   # hanya beberapa kandidat per project
+        if day >= free_from or day == SHOCK_FORCED_DAY:
+            starts.append(int(day))
+            lens.append(int(length))
+            free_from = day + length
+    return np.array(starts, dtype=int), np.array(lens, dtype=int)
+
+def simulate_project(p, index, days, dates, season, seed):
+    """Vectorized simulation of one project: (costs, events) DataFrames."""
+    rng = project_rng(seed, index)
+
+    # [F6] Headcount Dynamics: langkah tiap 30 hari, clip ke [2, max_hc] secara berurutan
+    n_steps = (days - 1) // HC_STEP_DAYS
+    steps = rng.choice(hc_changes(p), size=n_steps)
+    levels = np.empty(n_steps + 1, dtype=np.int64)
+    levels[0] = p['start_hc']
+    for j, change in enumerate(steps):   # clip path-dependent, tapi cuma days/30 langkah
+        levels[j + 1] = max(2, min(p['max_hc'], levels[j] + change))
+    hc = levels[np.arange(days) // HC_STEP_DAYS]
+
+    # Base Cost Calculation
+    base = hc * float(p['rate'])
+    daily = base * season + rng.normal(0.0, 1.0, days) * base * p['volatility']
+
+    starts, lens = shock_windows(rng, days, p['shock_prob'])
+    if len(starts):
+        delta = np.zeros(days + 1, dtype=int)
+        np.add.at(delta, starts, 1)
+        np.add.at(delta, np.minimum(starts + lens, days), -1)
+        hold = np.cumsum(delta[:-1]) > 0
+        daily = np.where(hold, base * 0.1, daily)   # Maintenance only
+
+    costs = pd.DataFrame({
+        'project_id': p['id'],
+        'ds': dates,
+        'y': np.maximum(0, np.round(daily)).astype(np.int64),
+        'cap': np.int64(p['budget']),   # [F1] Data Plafon
+        'headcount': hc,                # [F6] Data Regressor
+    })
+    events = pd.DataFrame({
+        'project_id': p['id'], 'holiday': 'project_hold',
+        'ds': dates[starts], 'lower_window': 0, 'upper_window': lens,
+    }, columns=EVENT_COLUMNS)
+    return costs, events
+
+def build_chunk(projects, offset, days, start_date, seed):
+    dates = pd.date_range(start_date, periods=days, freq='D')
+    season = seasonality(dates)
+    parts = [simulate_project(p, offset + i, days, dates, season, seed) for i, p in enumerate(projects)]
+    return (pd.concat([c for c, _ in parts], ignore_index=True),
+            pd.concat([e for _, e in parts], ignore_index=True))
+
+def _chunk_task(task, fmt="frame"):
+    costs, events = build_chunk(*task)
+    if fmt != "csv": return costs, events
+    # Format CSV (bagian paling mahal) ikut dikerjakan worker, proses utama tinggal append
+    return costs.to_csv(header=False, index=False), events.to_csv(header=False, index=False)
+
+def resolve_start(start_date, days, seed):
+    """First simulated day (midnight): explicit, fixed for a seeded run, else `days` before today."""
+    if start_date is not None: return pd.Timestamp(start_date).normalize()
+    end = SEED_END_DATE if seed is not None else datetime.now()
+    return pd.Timestamp(end).normalize() - timedelta(days=days)
+
+def build_frames(projects=PROJECTS_DB, days=DAYS, start_date=None, seed=None, verbose=True):
+    """Simulate cost + event rows and return them as (costs, events) DataFrames."""
+    start_date = resolve_start(start_date, days, seed)
+    if seed is None: seed = np.random.SeedSequence().entropy
+    if verbose:
+        for p in projects: print(f"[INFO] Processing: {p['name']}")
+    return build_chunk(list(projects), 0, days, start_date, seed)
+
+# ==========================================
+# STREAMING WRITER (CSV / parquet)
+# ==========================================
+class ChunkWriter:
+    """Appends DataFrame chunks to one CSV or parquet file without holding them all."""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+        self.tmp = f"{path}.{os.getpid()}.tmp"
+        self.writer, self.rows = None, 0
+
+    def write(self, df, columns=None):
+        """`df` is a DataFrame, or for CSV also pre-rendered rows without header."""
+        if isinstance(df, str):
+            with open(self.tmp, 'a' if self.rows else 'w') as f:
+                if not self.rows: f.write(",".join(columns) + "\n")
+                f.write(df)
+            self.rows += df.count("\n")
+            return
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None: self.writer = pq.ParquetWriter(self.tmp, table.schema)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.tmp, mode='a' if self.rows else 'w', header=not self.rows, index=False)
+        self.rows += len(df)
+
+    def close(self, empty=None):
+        if self.rows == 0 and empty is not None: self.write(empty)   # file tetap punya header/schema
+        if self.writer is not None: self.writer.close()
+        os.replace(self.tmp, self.path)   # file lama baru diganti setelah semua chunk selesai
+
+def peak_rss_mb():
+    """Peak RSS of this process and of finished workers (tracemalloc would slow generation ~8x)."""
+    try: import resource
+    except ImportError: return None, None   # Windows
+    kb = lambda who: resource.getrusage(who).ru_maxrss / 1024   # Linux: KB
+    return kb(resource.RUSAGE_SELF), kb(resource.RUSAGE_CHILDREN)
+
+def generate_data(n_projects=None, days=DAYS, seed=None, fmt="csv", out_dir=OUT_DIR,
+                  workers=None, chunk_projects=CHUNK_PROJECTS, start_date=None):
+    """Write the cost/event dataset chunk by chunk; output only depends on `seed` (and `start_date`).
+
+    Defaults reproduce the 4-project multi_project_costs.csv used by the
+    forecaster; `n_projects` scales it up for load tests.
+    """
+    projects = make_projects(n_projects) if n_projects else PROJECTS_DB
+    start_date = resolve_start(start_date, days, seed)
+    if seed is None: seed = np.random.SeedSequence().entropy
+    workers = workers or GEN_WORKERS
+    ext = "parquet" if fmt == "parquet" else "csv"
+    print(f"[INFO] Generating dataset: {len(projects)} projects x {days} days from {start_date.date()} "
+          f"({len(projects) * days:,} rows), seed={seed}, {workers} worker(s), {ext}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    costs_out = ChunkWriter(os.path.join(out_dir, f"multi_project_costs.{ext}"), fmt)
+    events_out = ChunkWriter(os.path.join(out_dir, f"multi_project_events.{ext}"), fmt)
+    tasks = [(projects[i:i + chunk_projects], i, days, start_date, seed)
+             for i in range(0, len(projects), chunk_projects)]
+
+    start = time.perf_counter()
+
+    def write(result):
+        costs, events = result
+        costs_out.write(costs, COST_COLUMNS)
+        if len(events): events_out.write(events, EVENT_COLUMNS)
+
+    if workers > 1 and len(tasks) > 1:
+        # Maksimal 2 chunk per worker di antrian -> memori tidak tumbuh dengan jumlah project
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending, queue = deque(), iter(tasks)
+            for task in queue:
+                pending.append(pool.submit(_chunk_task, task, fmt))
+                if len(pending) >= 2 * workers: write(pending.popleft().result())
+            while pending: write(pending.popleft().result())   # urutan chunk tetap
+    else:
+        for task in tasks: write(_chunk_task(task, fmt))
+
+    costs_out.close()
+    events_out.close(empty=pd.DataFrame({c: pd.Series(dtype='object') for c in EVENT_COLUMNS}))
+    elapsed = time.perf_counter() - start
+    rss_main, rss_worker = peak_rss_mb()
+
+    print(f"[SUCCESS] {costs_out.rows:,} cost rows + {events_out.rows:,} events in {elapsed:.2f}s "
+          f"({costs_out.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    if rss_main is not None:
+        print(f"[INFO] Peak RSS: main {rss_main:.0f} MB, largest worker {rss_worker:.0f} MB")
+    print(f"[INFO] Written to {out_dir}/")
+    return {"rows": costs_out.rows, "events": events_out.rows, "elapsed_s": elapsed,
+            "rss_main_mb": rss_main, "rss_worker_mb": rss_worker,
+            "costs_path": costs_out.path, "events_path": events_out.path}
 
 if __name__ == "__main__":
-    generate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Synthetic multi-project cost generator")
+    parser.add_argument("--projects", type=int, default=None, help="default: 4 archetype projects")
+    parser.add_argument("--years", type=int, default=YEARS)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--start-date", default=None,
+                        help=f"YYYY-MM-DD; default: {{years}} before today, or before {SEED_END_DATE.date()} with --seed")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-projects", type=int, default=CHUNK_PROJECTS)
+    args = parser.parse_args()
+    generate_data(args.projects, 365 * args.years, args.seed, args.format, args.out_dir,
+                  args.workers, args.chunk_projects, args.start_date)
@@ -2,8 +2,11 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
-import datetime
-import shutil
+import sys
+import time
+import itertools
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.ensemble import IsolationForest
 from sklearn.metrics import accuracy_score
 
@@ -13,121 +16,283 @@ from sklearn.metrics import accuracy_score
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 MODEL_DIR = os.path.join(BASE_DIR, 'models', 'anomaly')
 DATA_DIR = os.path.join(BASE_DIR, 'datasets', 'synthetic')
+CSV_PATH = os.path.join(DATA_DIR, 'timesheet_anomaly_train_data.csv')
+REGISTRY_DIR = os.path.join(BASE_DIR, 'models', 'registry')
+LEADERBOARD_PATH = os.path.join(BASE_DIR, 'datasets', 'cache', 'anomaly', 'sweep_leaderboard.csv')
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'core'))
 
-os.makedirs(MODEL_DIR, exist_ok=True)
-os.makedirs(DATA_DIR, exist_ok=True)
+from model_registry import ModelRegistry, ANOMALY_MODEL
 
 # KONFIGURASI UTAMA
 # Kita turunkan threshold karena data "Smart Cheater" lebih sulit diprediksi
-MIN_ACCURACY_THRESHOLD = 0.85  
-TOTAL_SAMPLES = 5000           
-CONTAMINATION_RATE = 0.05      
+MIN_ACCURACY_THRESHOLD = 0.85
+TOTAL_SAMPLES = 5000
+CONTAMINATION_RATE = 0.05
+N_JOBS = -1
+SEED = 42
 
-print(f"[INFO] Config: Samples={TOTAL_SAMPLES}, Contamination={CONTAMINATION_RATE}, Min Acc={MIN_ACCURACY_THRESHOLD}")
+FEATURES = ['complexity', 'hist_avg', 'skill', 'duration', 'deviation_ratio']
+
+# Grid sweep (3 x 2 x 2 x 3 = 36 kandidat); feature set = subset FEATURES (urutan tetap)
+SWEEP_GRID = {
+    'contamination': [0.03, 0.05, 0.08],
+    'n_estimators': [100, 200],
+    'max_samples': [256, 1024],
+    'features': ['all', 'no_hist', 'ratio_skill'],
+}
+FEATURE_SETS = {
+    'all': FEATURES,
+    'no_hist': ['complexity', 'skill', 'duration', 'deviation_ratio'],
+    'ratio_skill': ['skill', 'deviation_ratio'],
+}
+SWEEP_WORKERS = max(1, os.cpu_count() or 1)
+
+# Per skill level: (faktor kecepatan, noise min, noise max)
+# Junior (1): Noise lebar (0.8 - 1.6) -> Boleh lambat
+SKILL_PROFILE = {1: (1.3, 0.8, 1.6), 2: (1.0, 0.8, 1.2), 3: (0.8, 0.7, 1.1)}
 
 # ==========================================
 # 2. GENERATE DATA (SMART CHEATER EDITION)
 # ==========================================
-np.random.seed(42)
-
-def generate_data(n_samples=1000, anomaly=False):
-    data = []
-    for _ in range(n_samples):
-        complexity = np.random.randint(1, 6) # 1-5
-        skill = np.random.randint(1, 4)      # 1-3
-        hist_avg = complexity * 2.0          
-        
-        if not anomaly:
-            # === LOGIKA NORMAL (Toleransi Junior) ===
-            # Junior (1): Noise lebar (0.8 - 1.6) -> Boleh lambat
-            if skill == 1:
-                skill_factor = 1.3
-                noise = np.random.uniform(0.8, 1.6) 
-            elif skill == 2:
-                skill_factor = 1.0
-                noise = np.random.uniform(0.8, 1.2)
-            else:
-                skill_factor = 0.8
-                noise = np.random.uniform(0.7, 1.1)
-                
-            duration = hist_avg * skill_factor * noise
-            label = 0 # Normal
-        else:
-            # === LOGIKA ANOMALI (SMART CHEATER) ===
-            # Markup tipis (1.6x - 2.5x) agar mirip dengan Junior yg lambat
-            # Ini membuat model bekerja keras membedakan pola.
-            markup_factor = np.random.uniform(1.6, 2.5)
-            duration = hist_avg * markup_factor
-            label = 1 # Anomaly
-            
-        data.append([complexity, hist_avg, skill, duration, label])
-        
-    return pd.DataFrame(data, columns=['complexity', 'hist_avg', 'skill', 'duration', 'label'])
-
-# Generate Data: 95% Normal, 5% Anomaly
-print(f"[INFO] Generating {TOTAL_SAMPLES} synthetic records (Realistis)...")
-n_normal = int(TOTAL_SAMPLES * (1 - CONTAMINATION_RATE))
-n_anomaly = int(TOTAL_SAMPLES * CONTAMINATION_RATE)
-
-df = pd.concat([generate_data(n_normal, False), generate_data(n_anomaly, True)], ignore_index=True)
-
-# Feature Engineering
-df['deviation_ratio'] = df['duration'] / df['hist_avg']
-
-# Save CSV untuk audit manual
-csv_path = os.path.join(DATA_DIR, 'timesheet_anomaly_train_data.csv')
-df.to_csv(csv_path, index=False)
-print(f"[INFO] Dataset saved to CSV for review.")
+def generate_data(n_samples=1000, anomaly=False, rng=None):
+    """Vectorized synthetic timesheets; one array op per column instead of per-row draws."""
+    rng = rng if rng is not None else np.random.default_rng(SEED)
+    complexity = rng.integers(1, 6, n_samples)   # 1-5
+    skill = rng.integers(1, 4, n_samples)        # 1-3
+    hist_avg = complexity * 2.0
+
+    if not anomaly:
+        # === LOGIKA NORMAL (Toleransi Junior) ===
+        factor, low, high = (np.array([SKILL_PROFILE[s][i] for s in (1, 2, 3)])[skill - 1] for i in range(3))
+        duration = hist_avg * factor * rng.uniform(low, high)
+        label = 0 # Normal
+    else:
+        # === LOGIKA ANOMALI (SMART CHEATER) ===
+        # Markup tipis (1.6x - 2.5x) agar mirip dengan Junior yg lambat
+        # Ini membuat model bekerja keras membedakan pola.
+        duration = hist_avg * rng.uniform(1.6, 2.5, n_samples)
+        label = 1 # Anomaly
+
+    return pd.DataFrame({
+        'complexity': complexity, 'hist_avg': hist_avg, 'skill': skill,
+        'duration': duration, 'label': np.full(n_samples, label, dtype=np.int8),
+    })
+
+def build_dataset(total_samples=TOTAL_SAMPLES, contamination=CONTAMINATION_RATE, seed=SEED):
+    """95% normal + 5% anomaly (by default) with the engineered deviation_ratio."""
+    rng = np.random.default_rng(seed)
+    n_normal = int(total_samples * (1 - contamination))
+    n_anomaly = int(total_samples * contamination)
+    df = pd.concat([generate_data(n_normal, False, rng), generate_data(n_anomaly, True, rng)], ignore_index=True)
+
+    # Feature Engineering
+    df['deviation_ratio'] = df['duration'] / df['hist_avg']
+    return df
 
 # ==========================================
-# 3. TRAINING
+# 3. TRAINING & EVALUATION
 # ==========================================
-features = ['complexity', 'hist_avg', 'skill', 'duration', 'deviation_ratio']
-X = df[features]
-y_true = df['label'] 
+def train_model(df, contamination=CONTAMINATION_RATE, n_jobs=N_JOBS, seed=SEED, n_estimators=100,
+                max_samples='auto', features=FEATURES):
+    model = IsolationForest(contamination=contamination, n_estimators=n_estimators, max_samples=max_samples,
+                            random_state=seed, n_jobs=n_jobs)
+    model.fit(df[features])
+    return model
 
-print("[INFO] Training Isolation Forest...")
-model = IsolationForest(contamination=CONTAMINATION_RATE, random_state=42, n_jobs=-1)
-model.fit(X)
+def evaluate(model, df):
+    # Convert prediksi model (-1/1) ke format label kita (1/0)
+    preds = (model.predict(df[FEATURES]) == -1).astype(int)
+    return accuracy_score(df['label'], preds)
 
 # ==========================================
-# 4. EVALUATION
+# 4. SAVE MODEL (REGISTRY & CHECK)
 # ==========================================
-# Convert prediksi model (-1/1) ke format label kita (1/0)
-preds_raw = model.predict(X)
-preds_converted = [1 if x == -1 else 0 for x in preds_raw]
+def save_model(model, accuracy, model_dir=MODEL_DIR, min_accuracy=MIN_ACCURACY_THRESHOLD, registry_dir=REGISTRY_DIR):
+    """Register + promote to latest when accuracy passes the gate; returns the latest path or None.
+
+    Versions and their accuracy live in the model registry (stored once by
+    content hash), so no dated/BACKUP copies are written any more.
+    """
+    acc_percent = round(accuracy * 100, 2)
+    if accuracy < min_accuracy:
+        print(f"[FAILED] Accuracy ({acc_percent}%) is below threshold ({min_accuracy*100}%). Model NOT saved.")
+        return None
+
+    # 1. Simpan versi baru di registry (versi lama tetap bisa di-load lewat hash)
+    registry = ModelRegistry(registry_dir)
+    version = registry.register_object(ANOMALY_MODEL, model, metrics={"accuracy": acc_percent},
+                                       source="train_anomaly.py")
+    print(f"[REGISTRY] {ANOMALY_MODEL}@{version['hash'][:12]} (ACC{acc_percent}) -> latest")
+
+    # 2. Simpan model baru (Versi Production/Latest) untuk consumer yang pakai path langsung
+    os.makedirs(model_dir, exist_ok=True)
+    latest_path = os.path.join(model_dir, 'timesheet_model_latest.pkl')
+    joblib.dump(model, latest_path)
+
+    print(f"[SUCCESS] Model Saved! Accuracy ({acc_percent}%) passed threshold.")
+    print(f"[PATH] {latest_path}")
+    return latest_path
+
+def run(total_samples=TOTAL_SAMPLES, contamination=CONTAMINATION_RATE, n_jobs=N_JOBS, seed=SEED,
+        write_csv=True, save=True, model_dir=MODEL_DIR, min_accuracy=MIN_ACCURACY_THRESHOLD):
+    """Generate -> (CSV) -> fit -> evaluate -> gated save, with timings per stage."""
+    print(f"[INFO] Config: Samples={total_samples:,}, Contamination={contamination}, "
+          f"n_jobs={n_jobs}, Min Acc={min_accuracy}")
+    timings = {}
+
+    start = time.perf_counter()
+    df = build_dataset(total_samples, contamination, seed)
+    timings['generate_s'] = time.perf_counter() - start
+    print(f"[INFO] Generated {len(df):,} synthetic records in {timings['generate_s']:.2f}s")
+
+    if write_csv:
+        # Save CSV untuk audit manual
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(CSV_PATH), exist_ok=True)
+        df[['complexity', 'hist_avg', 'skill', 'duration', 'label', 'deviation_ratio']].to_csv(CSV_PATH, index=False)
+        timings['csv_s'] = time.perf_counter() - start
+        print(f"[INFO] Dataset saved to CSV for review ({timings['csv_s']:.2f}s).")
+
+    print("[INFO] Training Isolation Forest...")
+    start = time.perf_counter()
+    model = train_model(df, contamination, n_jobs, seed)
+    timings['fit_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    accuracy = evaluate(model, df)
+    timings['eval_s'] = time.perf_counter() - start
 
-accuracy = accuracy_score(y_true, preds_converted)
-acc_percent = round(accuracy * 100, 2)
+    print("-" * 30)
+    print(f"MODEL ACCURACY: {round(accuracy * 100, 2)}%")
+    print(f"TIMINGS: generate {timings['generate_s']:.2f}s | fit {timings['fit_s']:.2f}s | "
+          f"eval {timings['eval_s']:.2f}s ({len(df) / timings['eval_s']:,.0f} rows/s)")
+    print("-" * 30)
 
-print("-" * 30)
-print(f"MODEL ACCURACY: {acc_percent}%")
-print("-" * 30)
+    path = save_model(model, accuracy, model_dir, min_accuracy) if save else None
+    return {"model": model, "accuracy": accuracy, "rows": len(df), "timings": timings, "path": path}
 
 # ==========================================
-# 5. SAVE MODEL (WITH BACKUP & CHECK)
+# 5. SWEEP (GRID KANDIDAT, PARALEL)
 # ==========================================
-MODEL_PATH = os.path.join(MODEL_DIR, 'timesheet_model.pkl')
-LATEST_PATH = os.path.join(MODEL_DIR, 'timesheet_model_latest.pkl')
-
-if accuracy >= MIN_ACCURACY_THRESHOLD:
-    # 1. Backup model lama jika ada
-    if os.path.exists(LATEST_PATH):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"timesheet_model_BACKUP_{timestamp}.pkl"
-        shutil.copy(LATEST_PATH, os.path.join(MODEL_DIR, backup_name))
-        print(f"[BACKUP] Old model backed up to {backup_name}")
-
-    # 2. Simpan model baru (Versi Arsip)
-    today_str = datetime.datetime.now().strftime("%Y%m%d")
-    filename = f"timesheet_model_{today_str}_ACC{acc_percent}.pkl"
-    save_path = os.path.join(MODEL_DIR, filename)
-    joblib.dump(model, save_path)
-    
-    # 3. Simpan model baru (Versi Production/Latest)
-    joblib.dump(model, LATEST_PATH)
-    
-    print(f"[SUCCESS] Model Saved! Accuracy ({acc_percent}%) passed threshold.")
-    print(f"[PATH] {LATEST_PATH}")
-else:
-    print(f"[FAILED] Accuracy ({acc_percent}%) is below threshold ({MIN_ACCURACY_THRESHOLD*100}%). Model NOT saved.")
\ No newline at end of file
+def sweep_candidates(grid=SWEEP_GRID):
+    return [dict(zip(grid.keys(), v)) for v in itertools.product(*grid.values())]
+
+_SHARED = None   # (train, eval) dikirim sekali ke tiap worker lewat initializer, bukan per kandidat
+
+def _init_worker(shared):
+    global _SHARED
+    _SHARED = shared
+
+def _fit_candidate(task):
+    """Fit one candidate on the shared train set; return its decision scores on the shared eval set."""
+    i, cand, seed = task
+    train, evals = _SHARED
+    cols = FEATURE_SETS[cand['features']]
+    start = time.perf_counter()
+    model = train_model(train, cand['contamination'], 1, seed, cand['n_estimators'], cand['max_samples'], cols)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = model.score_samples(evals[cols]) - model.offset_
+    return i, scores.astype(np.float64), fit_s, time.perf_counter() - start
+
+def leaderboard_metrics(scores, labels):
+    """Accuracy / precision / recall / F1 for every candidate at once from a (candidates x rows) score matrix."""
+    pred = scores < 0                      # == predict() == -1 -> anomaly
+    truth = np.asarray(labels, dtype=bool)[None, :]
+    tp = (pred & truth).sum(axis=1)
+    fp = (pred & ~truth).sum(axis=1)
+    fn = (~pred & truth).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.nan_to_num(tp / (tp + fp))
+        recall = np.nan_to_num(tp / (tp + fn))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return pd.DataFrame({"accuracy": (pred == truth).mean(axis=1), "precision": precision, "recall": recall,
+                         "f1": f1, "flag_rate": pred.mean(axis=1)})
+
+def sweep(total_samples=TOTAL_SAMPLES, contamination=CONTAMINATION_RATE, seed=SEED, grid=SWEEP_GRID,
+          workers=None, min_accuracy=MIN_ACCURACY_THRESHOLD, save=True, model_dir=MODEL_DIR,
+          leaderboard_path=LEADERBOARD_PATH):
+    """Fit every grid candidate in parallel, rank them on one shared eval set, promote the best passing one.
+
+    Train and eval sets are generated once (eval with its own seed, so the
+    gate is not measured on training rows) and shipped to each worker once.
+    Workers only return eval scores; metrics for all candidates come from
+    one vectorized pass over the stacked scores, and just the winner is
+    refitted (same seed -> same forest) for saving.
+    """
+    workers = workers or SWEEP_WORKERS
+    cands = sweep_candidates(grid)
+    start = time.perf_counter()
+    train = build_dataset(total_samples, contamination, seed)
+    evals = build_dataset(total_samples, contamination, seed + 1)
+    print(f"[INFO] Sweep: {len(cands)} candidates, {len(train):,} train / {len(evals):,} eval rows, {workers} worker(s)")
+
+    tasks = [(i, cand, seed) for i, cand in enumerate(cands)]
+    results = [None] * len(cands)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=((train, evals),)) as pool:
+            for fut in as_completed([pool.submit(_fit_candidate, t) for t in tasks]):
+                i, *res = fut.result()
+                results[i] = res
+    else:
+        _init_worker((train, evals))
+        for t in tasks:
+            i, *res = _fit_candidate(t)
+            results[i] = res
+    fit_wall = time.perf_counter() - start
+
+    start = time.perf_counter()
+    board = pd.concat([pd.DataFrame(cands), leaderboard_metrics(np.vstack([r[0] for r in results]), evals['label'])],
+                      axis=1)
+    eval_s = time.perf_counter() - start
+    board['fit_s'] = [r[1] for r in results]
+    board['score_s'] = [r[2] for r in results]
+    board['passed'] = board['accuracy'] >= min_accuracy
+    board = board.sort_values(['passed', 'accuracy', 'f1', 'fit_s'], ascending=[False, False, False, True])
+    board.insert(0, 'rank', np.arange(1, len(board) + 1))
+
+    os.makedirs(os.path.dirname(leaderboard_path), exist_ok=True)
+    board.to_csv(leaderboard_path, index=False)
+    print(board.head(10).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"[INFO] Fit+score wall {fit_wall:.1f}s (CPU in fits {board['fit_s'].sum():.1f}s), "
+          f"metrics for {len(board)} candidates in {eval_s * 1000:.1f} ms -> {leaderboard_path}")
+
+    best = board.iloc[0]
+    res = {"leaderboard": board, "best": None, "path": None, "fit_wall_s": fit_wall}
+    if not best['passed']:
+        print(f"[FAILED] No candidate reached {min_accuracy*100}% (best {best['accuracy']*100:.2f}%). Nothing saved.")
+        return res
+
+    params = {k: (best[k].item() if hasattr(best[k], 'item') else best[k]) for k in grid}
+    res["best"] = params
+    print(f"[INFO] Best: {params} | ACC {best['accuracy']*100:.2f}% | F1 {best['f1']:.3f}")
+    if save:
+        model = train_model(train, params['contamination'], N_JOBS, seed, params['n_estimators'],
+                            params['max_samples'], FEATURE_SETS[params['features']])
+        res["path"] = save_model(model, best['accuracy'], model_dir, min_accuracy)
+    return res
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the timesheet Isolation Forest")
+    parser.add_argument("--samples", type=int, default=TOTAL_SAMPLES)
+    parser.add_argument("--contamination", type=float, default=CONTAMINATION_RATE)
+    parser.add_argument("--n-jobs", type=int, default=N_JOBS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--min-accuracy", type=float, default=MIN_ACCURACY_THRESHOLD)
+    parser.add_argument("--no-csv", action="store_true", help="skip the audit CSV (large runs)")
+    parser.add_argument("--dry-run", action="store_true", help="train + evaluate only, do not save")
+    parser.add_argument("--sweep", action="store_true", help="fit the SWEEP_GRID candidates, promote the best")
+    parser.add_argument("--workers", type=int, default=None, help="sweep worker processes")
+    args = parser.parse_args(argv)
+
+    if args.sweep:
+        res = sweep(args.samples, args.contamination, args.seed, workers=args.workers,
+                    min_accuracy=args.min_accuracy, save=not args.dry_run)
+        return 0 if res['best'] else 1
+
+    res = run(args.samples, args.contamination, args.n_jobs, args.seed, write_csv=not args.no_csv,
+              save=not args.dry_run, min_accuracy=args.min_accuracy)
+    return 0 if res['accuracy'] >= args.min_accuracy else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,13 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+import sys
+import time
+import pickle
+import argparse
+import tempfile
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
@@ -12,12 +17,36 @@ from sklearn.metrics import classification_report
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 MODEL_DIR = os.path.join(BASE_DIR, 'models', 'nlp')
 DATA_DIR = os.path.join(BASE_DIR, 'datasets', 'synthetic')
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'core'))
+
+from task_categorizer import TaskCategorizer, CORRECTION_BATCH
+
+MODEL_PATH = os.path.join(MODEL_DIR, 'task_categorizer_model.pkl')
+HASHED_MODEL_PATH = os.path.join(MODEL_DIR, 'task_categorizer_hashed.pkl')
+
+# Mode hashed: ruang fitur tetap (tanpa vocabulary), classifier online (partial_fit)
+HASH_FEATURES = 2 ** 16   # coef_ = 5 kelas x 65k x 8 byte ~ 2.6 MB, tidak tumbuh dengan vocabulary
+EPOCHS = 20
+SEED = 42
+
+# Koreksi contoh (frase baru yang tidak ada di data sintetis) untuk --compare
+CORRECTIONS = [
+    ("rapat mingguan dengan tim", "MEETING"), ("sync dengan product owner", "MEETING"),
+    ("rapat evaluasi sprint", "MEETING"), ("postmortem insiden", "BUGFIX"),
+    ("analisa insiden login", "BUGFIX"), ("rollback rilis gagal", "DEVOPS"),
+    ("ilustrasi onboarding", "DESIGN"), ("tulis unit test modul invoice", "DEVELOPMENT"),
+]
+NOVEL_TASKS = [
+    ("rapat bulanan", "MEETING"), ("postmortem insiden payment", "BUGFIX"), ("rollback rilis", "DEVOPS"),
+    ("ilustrasi halaman promo", "DESIGN"), ("tulis unit test api", "DEVELOPMENT"),
+]
 
 os.makedirs(MODEL_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
 # --- 1. GENERATE DATASET (SYNTHETIC) ---
-def generate_task_data():
+def generate_task_data(seed=None):
+    rng = np.random.RandomState(seed)   # seed=None -> variasi beda tiap training
     data = {
         "text": [],
         "category": []
@@ -65,8 +94,8 @@ def generate_task_data():
             
             # Tambahkan 5 variasi kalimat untuk setiap frase agar model lebih pintar
             for _ in range(5):
-                p = np.random.choice(prefixes)
-                s = np.random.choice(suffixes)
+                p = rng.choice(prefixes)
+                s = rng.choice(suffixes)
                 sentence = f"{p} {phrase} {s}".strip()
                 data["text"].append(sentence)
                 data["category"].append(label)
@@ -74,7 +103,45 @@ def generate_task_data():
     return pd.DataFrame(data)
 
 # --- 2. TRAINING PIPELINE ---
-def train_model():
+def build_tfidf():
+    # Pipeline:
+    # 1. TfidfVectorizer: Mengubah teks menjadi angka (vektor) berdasarkan frekuensi kata
+    # 2. LogisticRegression: Mengklasifikasikan vektor tersebut ke kategori
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(ngram_range=(1,2))),
+        # Ganti solver ke 'lbfgs' yang support multiclass native & tambah max_iter agar training tuntas
+        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000, C=10))
+    ])
+
+def build_hashed(n_features=HASH_FEATURES):
+    # 1. HashingVectorizer: n-gram di-hash ke n_features kolom -> stateless, tidak perlu fit/vocabulary
+    # 2. SGDClassifier(log_loss): logistic regression online, bisa partial_fit + predict_proba
+    return Pipeline([
+        ('hash', HashingVectorizer(ngram_range=(1,2), n_features=n_features, alternate_sign=False)),
+        ('clf', SGDClassifier(loss='log_loss', alpha=1e-5, random_state=SEED))
+    ])
+
+def fit_online(pipeline, X, y, epochs=EPOCHS, batch_size=CORRECTION_BATCH, seed=SEED):
+    """Train the hashed pipeline with the same partial_fit path later used for corrections."""
+    features, y = pipeline[:-1].transform(list(X)), np.asarray(y)
+    classes = np.unique(y)
+    rng = np.random.default_rng(seed)
+    for _ in range(epochs):
+        order = rng.permutation(len(y))
+        for i in range(0, len(order), batch_size):
+            idx = order[i:i + batch_size]
+            pipeline[-1].partial_fit(features[idx], y[idx], classes=classes)
+    return pipeline
+
+def save_pipeline(pipeline, path):
+    # Hashed: coef_ sebagian besar nol -> kompresi bikin file kecil
+    compress = 3 if 'hash' in pipeline.named_steps else 0
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(pipeline, tmp, compress=compress)
+    os.replace(tmp, path)
+    return path
+
+def train_model(mode="tfidf"):
     df = generate_task_data()
     
     # Simpan dataset untuk referensi
@@ -85,27 +152,109 @@ def train_model():
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    print(f"[INFO] Training on {len(df)} sentences...")
-    
-    # Pipeline: 
-    # 1. TfidfVectorizer: Mengubah teks menjadi angka (vektor) berdasarkan frekuensi kata
-    # 2. LogisticRegression: Mengklasifikasikan vektor tersebut ke kategori
-    pipeline = Pipeline([
-        ('tfidf', TfidfVectorizer(ngram_range=(1,2))), 
-        # Ganti solver ke 'lbfgs' yang support multiclass native & tambah max_iter agar training tuntas
-        ('clf', LogisticRegression(solver='lbfgs', max_iter=1000, C=10))
-    ])
+    print(f"[INFO] Training on {len(df)} sentences ({mode})...")
     
-    pipeline.fit(X_train, y_train)
+    if mode == "hashed":
+        pipeline = fit_online(build_hashed(), X_train, y_train)
+    else:
+        pipeline = build_tfidf().fit(X_train, y_train)
     
     # Evaluasi
     acc = pipeline.score(X_test, y_test)
     print(f"[RESULT] Model Accuracy: {acc*100:.2f}%")
     
     # Save Model
-    model_path = os.path.join(MODEL_DIR, 'task_categorizer_model.pkl')
-    joblib.dump(pipeline, model_path)
+    model_path = save_pipeline(pipeline, HASHED_MODEL_PATH if mode == "hashed" else MODEL_PATH)
     print(f"[SUCCESS] Model saved to: {model_path}")
+    return pipeline
+
+# --- 3. KOREKSI MANUSIA (ONLINE) ---
+def learn_corrections(csv_path, model_path=HASHED_MODEL_PATH):
+    """Absorb a CSV of human corrections (text,category) into the hashed model and save it."""
+    corrections = pd.read_csv(csv_path)
+    cat = TaskCategorizer(model_path)
+    before = cat.model.score(corrections['text'], corrections['category'])
+    start = time.perf_counter()
+    cat.learn(corrections['text'], corrections['category'])
+    learn_s = time.perf_counter() - start
+    after = cat.model.score(corrections['text'], corrections['category'])
+    save_pipeline(cat.model, model_path)
+    print(f"[SUCCESS] {len(corrections)} corrections learned in {learn_s * 1000:.0f} ms "
+          f"(accuracy on them {before*100:.0f}% -> {after*100:.0f}%) -> {model_path}")
+
+# --- 4. PERBANDINGAN TF-IDF vs HASHED ---
+def compare(tmp_dir=None, seed=SEED):
+    """Size, load time, latency, throughput and accuracy of both modes on the same split."""
+    if tmp_dir is None:
+        with tempfile.TemporaryDirectory(prefix="task_compare_") as tmp:
+            return compare(tmp, seed)
+
+    df = generate_task_data(seed)   # data tetap -> angka accuracy bisa diulang
+    X_train, X_test, y_train, y_test = train_test_split(df['text'], df['category'], test_size=0.2, random_state=42)
+    novel_x, novel_y = map(list, zip(*NOVEL_TASKS))
+    corr_x, corr_y = map(list, zip(*CORRECTIONS))
+    batch = list(X_test) * (10_000 // len(X_test) + 1)
+
+    rows = []
+    for mode in ("tfidf", "hashed"):
+        start = time.perf_counter()
+        pipeline = fit_online(build_hashed(), X_train, y_train) if mode == "hashed" else build_tfidf().fit(X_train, y_train)
+        fit_s = time.perf_counter() - start
+        path = save_pipeline(pipeline, os.path.join(tmp_dir, f"task_categorizer_{mode}_{os.getpid()}.pkl"))
+
+        start = time.perf_counter()
+        cat = TaskCategorizer(path)
+        load_s = time.perf_counter() - start
+
+        latency = []
+        for text in list(X_test)[:200]:
+            t0 = time.perf_counter()
+            cat.classify_one(text)
+            latency.append(time.perf_counter() - t0)
+        start = time.perf_counter()
+        cat.classify(batch)
+        batch_s = time.perf_counter() - start
+
+        row = {"mode": mode, "file_kb": os.path.getsize(path) / 1e3, "memory_kb": len(pickle.dumps(pipeline)) / 1e3,
+               "vocabulary": len(pipeline[0].vocabulary_) if mode == "tfidf" else None,
+               "fit_s": fit_s, "load_ms": load_s * 1000, "p50_latency_ms": np.median(latency) * 1000,
+               "batch_texts_s": len(batch) / batch_s, "accuracy": pipeline.score(X_test, y_test),
+               "novel_before": pipeline.score(novel_x, novel_y)}
+        if mode == "hashed":
+            start = time.perf_counter()
+            cat.learn(corr_x, corr_y)
+            row["learn_ms"] = (time.perf_counter() - start) * 1000
+            row["novel_after"] = cat.model.score(novel_x, novel_y)
+            row["accuracy_after"] = cat.model.score(X_test, y_test)
+            row["memory_kb_after"] = len(pickle.dumps(cat.model)) / 1e3
+        else:
+            # TF-IDF tidak bisa partial_fit: koreksi = retrain penuh, vocabulary ikut tumbuh
+            start = time.perf_counter()
+            retrained = build_tfidf().fit(list(X_train) + corr_x, list(y_train) + corr_y)
+            row["learn_ms"] = (time.perf_counter() - start) * 1000
+            row["novel_after"] = retrained.score(novel_x, novel_y)
+            row["accuracy_after"] = retrained.score(X_test, y_test)
+            row["memory_kb_after"] = len(pickle.dumps(retrained)) / 1e3
+        rows.append(row)
+        os.remove(path)
+
+    table = pd.DataFrame(rows).set_index("mode").T
+    print(table.to_string(float_format=lambda v: f"{v:,.3f}"))
+    return table
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the task categorizer")
+    parser.add_argument("--mode", choices=["tfidf", "hashed"], default="tfidf",
+                        help="hashed = fixed-size HashingVectorizer + SGD, supports --learn")
+    parser.add_argument("--learn", metavar="CSV", default=None,
+                        help="partial_fit human corrections (text,category) into the hashed model")
+    parser.add_argument("--compare", action="store_true", help="benchmark tfidf vs hashed")
+    args = parser.parse_args(argv)
+
+    if args.compare: compare()
+    elif args.learn: learn_corrections(args.learn)
+    else: train_model(args.mode)
+    return 0
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    sys.exit(main())
@@ -1,89 +1,309 @@
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-from prophet.diagnostics import cross_validation, performance_metrics
 import itertools
 import os
+import sys
+import json
+import math
+import hashlib
+import time
 import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Modul core (backtest fold, train, lokasi best params)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(BASE_DIR, 'src', 'core'))
+
+import backtest
+import engines
+from forecast_engine import MODEL_PARAMS, BEST_PARAMS_PATH, PROJECT_CONFIGS, get_data
 
 # Matikan log sampah
 logging.getLogger('prophet').setLevel(logging.WARNING)
 logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
 
 # --- KONFIGURASI ---
-DATA_PATH = os.path.join('datasets', 'synthetic', 'project_cost.csv')
-EVENTS_PATH = os.path.join('datasets', 'synthetic', 'project_events.csv')
-
-def load_data():
-    df = pd.read_csv(DATA_PATH)
-    holidays = pd.read_csv(EVENTS_PATH) if os.path.exists(EVENTS_PATH) else None
-    return df, holidays
-
-def auto_tune():
-    df, holidays = load_data()
-    print(f"🔧 Memulai Auto-Tuning pada {len(df)} baris data...")
-
-    # 1. Tentukan Grid Parameter (Kombinasi yang mau dicoba)
-    # Kita akan mencoba semua kemungkinan di bawah ini:
-    param_grid = {  
-        'changepoint_prior_scale': [0.01, 0.05, 0.1, 0.5], # Sensitivitas Tren
-        'seasonality_prior_scale': [0.1, 1.0, 10.0],       # Kekuatan Pola Musiman
-        'seasonality_mode': ['additive', 'multiplicative'] # Jenis Musiman
+# Data: multi_project_costs via data_store (sama dengan forecast_engine.get_data)
+TRIALS_DIR = os.path.join('datasets', 'cache', 'tuning')
+
+# Grid Parameter (4 x 3 x 2 = 24 Kombinasi)
+PARAM_GRID = {
+    'changepoint_prior_scale': [0.01, 0.05, 0.1, 0.5], # Sensitivitas Tren
+    'seasonality_prior_scale': [0.1, 1.0, 10.0],       # Kekuatan Pola Musiman
+    'seasonality_mode': ['additive', 'multiplicative'] # Jenis Musiman
+}
+
+# Default Prophet untuk key grid yang tidak diset di MODEL_PARAMS (pembanding holdout)
+PROPHET_DEFAULTS = {'changepoint_prior_scale': 0.05, 'seasonality_prior_scale': 10.0, 'seasonality_mode': 'additive'}
+
+# Cutoff tuning lebih rapat dari backtest harian supaya successive halving punya ruang
+TUNE_INITIAL = '365 days'
+TUNE_PERIOD = '60 days'
+TUNE_HORIZON = '30 days'
+HOLDOUT_DAYS = 90   # Ekor data yang tidak pernah dilihat tuning, untuk cek akhir
+
+MIN_FOLDS = 2     # Rung pertama: semua kandidat dites di 2 cutoff terbaru
+ETA = 3           # Tiap rung: simpan 1/3 terbaik, fold x3
+TUNE_WORKERS = max(1, os.cpu_count() or 1)
+
+def candidates(grid=PARAM_GRID):
+    return [dict(zip(grid.keys(), v)) for v in itertools.product(*grid.values())]
+
+# ==========================================
+# TRIAL STORE (resume setelah interrupt)
+# ==========================================
+def trials_path(key):
+    return os.path.join(TRIALS_DIR, f"trials_{key}.jsonl")
+
+def load_trials(key):
+    """Completed fold evaluations by fold key (data + params + cutoff hash)."""
+    path = trials_path(key)
+    if not os.path.exists(path): return {}
+    trials = {}
+    with open(path) as f:
+        for line in f:
+            try: rec = json.loads(line)
+            except json.JSONDecodeError: continue   # baris terakhir terpotong saat interrupt
+            trials[rec['key']] = rec
+    return trials
+
+def append_trial(key, rec):
+    os.makedirs(TRIALS_DIR, exist_ok=True)
+    with open(trials_path(key), 'a') as f:
+        f.write(json.dumps(rec) + "\n")
+        f.flush()
+
+def save_best(key, entry, path=BEST_PARAMS_PATH):
+    """Merge one project's winner into the best-params file read by forecast_engine.train."""
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f: data = json.load(f)
+    data[key] = entry
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f: json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ==========================================
+# PERSIAPAN FOLD (sekali per project)
+# ==========================================
+def prepare(df, holidays, holdout_days=HOLDOUT_DAYS):
+    """Split off the holdout and slice every CV fold once; every candidate reuses these frames."""
+    df = df.assign(ds=pd.to_datetime(df['ds'])).sort_values('ds').reset_index(drop=True)
+    split = df['ds'].max() - pd.Timedelta(days=holdout_days)
+    train_df, holdout = df[df['ds'] <= split], df[df['ds'] > split]
+
+    if holidays is not None and not holidays.empty:
+        holidays = (holidays[['holiday', 'ds', 'lower_window', 'upper_window']]
+                    .assign(ds=pd.to_datetime(holidays['ds']), holiday=holidays['holiday'].astype(str))
+                    .reset_index(drop=True))
+    else: holidays = None
+
+    cutoffs = backtest.make_cutoffs(train_df['ds'], TUNE_INITIAL, TUNE_PERIOD, TUNE_HORIZON)[::-1]  # terbaru dulu
+    horizon = pd.Timedelta(TUNE_HORIZON)
+    folds = [(train_df[train_df['ds'] <= c], train_df[(train_df['ds'] > c) & (train_df['ds'] <= c + horizon)])
+             for c in cutoffs]
+    folds.append((train_df, holdout))   # index terakhir = cek holdout
+
+    # Hash data per fold dihitung sekali; id trial = hash ini + params
+    keys = [backtest.fold_key(train_df, holidays, {}, c, TUNE_HORIZON) for c in cutoffs]
+    keys.append(backtest.fold_key(df, holidays, {}, split, f"{holdout_days} days"))
+    return {"cutoffs": cutoffs, "folds": folds, "fold_keys": keys, "holidays": holidays,
+            "holdout_start": split, "rows": len(df)}
+
+def trial_id(prep, params, fold):
+    payload = prep['fold_keys'][fold] + json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+# ==========================================
+# EVALUASI FOLD
+# ==========================================
+_PREP = None   # Fold siap pakai; dikirim sekali ke tiap worker lewat initializer
+
+def _init_worker(prep):
+    global _PREP
+    _PREP = prep
+
+def _eval_fold(task):
+    tid, params, fold = task
+    train_df, test_df = _PREP['folds'][fold]
+    start = time.perf_counter()
+    try:
+        model = engines.make_engine("prophet").fit(train_df, _PREP['holidays'], params=params, verbose=False)
+        yhat = model.predict(test_df[['ds', 'headcount']])['yhat'].to_numpy()
+        y = test_df['y'].to_numpy(dtype=float)
+        return tid, {"mape": engines.mape(y, yhat), "rmse": float(np.sqrt(np.mean((y - yhat) ** 2))),
+                     "fit_s": time.perf_counter() - start}
+    except Exception as e:
+        return tid, {"mape": None, "rmse": None, "error": str(e), "fit_s": time.perf_counter() - start}
+
+def evaluate(key, prep, cands, folds, trials, pool=None):
+    """Mean fold MAPE per candidate; folds already in `trials` are not refitted."""
+    pending, trial_ids = {}, []
+    for cand in cands:
+        params = {**MODEL_PARAMS, **cand}
+        ids = [trial_id(prep, params, f) for f in folds]
+        trial_ids.append(ids)
+        for tid, f in zip(ids, folds):
+            if tid not in trials: pending[tid] = (tid, params, f)
+
+    def record(tid, res):
+        _, params, fold = pending[tid]
+        cutoff = prep['cutoffs'][fold] if fold < len(prep['cutoffs']) else prep['holdout_start']
+        rec = {"key": tid, "params": {k: params[k] for k in PARAM_GRID}, "cutoff": cutoff.isoformat(),
+               "holdout": fold == len(prep['cutoffs']), **res}
+        trials[tid] = rec
+        append_trial(key, rec)   # langsung ditulis: interrupt tidak menghilangkan fold selesai
+
+    if pool is not None and len(pending) > 1:
+        for fut in as_completed([pool.submit(_eval_fold, t) for t in pending.values()]):
+            record(*fut.result())
+    else:
+        for t in list(pending.values()): record(*_eval_fold(t))
+
+    scores = []
+    for ids in trial_ids:
+        recs = [trials[t] for t in ids]
+        failed = any(r.get('mape') is None for r in recs)
+        scores.append({"mape": math.inf if failed else float(np.mean([r['mape'] for r in recs])),
+                       "rmse": math.inf if failed else float(np.mean([r['rmse'] for r in recs]))})
+    new = [trials[t] for t in pending]
+    return scores, len(new), sum(r['fit_s'] for r in new)
+
+# ==========================================
+# SUCCESSIVE HALVING
+# ==========================================
+def tune(df, holidays, key, grid=PARAM_GRID, workers=None, min_folds=MIN_FOLDS, eta=ETA,
+         save=True, verbose=True):
+    """Successive-halving search over `grid` for one project, scored by rolling-origin MAPE.
+
+    Every candidate starts on the `min_folds` most recent cutoffs; each rung
+    keeps the best 1/eta and multiplies the folds by eta until the survivors
+    are scored on all cutoffs. The winner and the untuned MODEL_PARAMS are
+    then compared on a holdout the search never saw; only a winner that
+    beats the defaults there is saved for training, otherwise the defaults
+    are saved for the project. Fold results are
+    appended to a trials file as they finish, so an interrupted run picks
+    up where it stopped.
+    """
+    start = time.perf_counter()
+    workers = workers or TUNE_WORKERS
+
+    prep = prepare(df, holidays)
+    prep_s = time.perf_counter() - start
+    cutoffs, holdout_fold = prep['cutoffs'], len(prep['cutoffs'])
+    cands = candidates(grid)
+    trials = load_trials(key)
+    if verbose:
+        print(f"🔧 Tuning {key}: {len(cands)} kombinasi, {len(cutoffs)} cutoff + holdout {HOLDOUT_DAYS} hari, "
+              f"{len(trials)} fold dari run sebelumnya, {workers} worker")
+
+    _init_worker(prep)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prep,)) if workers > 1 else None
+    try:
+        alive = list(range(len(cands)))
+        n_folds = min(max(1, min_folds), len(cutoffs))
+        rungs, fits, fit_cpu = [], 0, 0.0
+        while True:
+            scores, computed, cpu = evaluate(key, prep, [cands[i] for i in alive], range(n_folds), trials, pool)
+            scores = dict(zip(alive, scores))
+            fits, fit_cpu = fits + computed, fit_cpu + cpu
+            ranked = sorted(alive, key=lambda i: scores[i]['mape'])
+            rungs.append({"candidates": len(alive), "folds": n_folds, "fits": computed,
+                          "best_mape": scores[ranked[0]]['mape']})
+            if verbose:
+                print(f"  Rung {len(rungs)}: {len(alive):>2} kandidat x {n_folds:>2} fold "
+                      f"({computed} fit baru) ➡️ terbaik MAPE {scores[ranked[0]]['mape']:.2f}%")
+            if n_folds >= len(cutoffs) or len(alive) == 1: break
+            alive = ranked[:max(1, math.ceil(len(alive) / eta))]
+            n_folds = min(len(cutoffs), n_folds * eta)
+
+        best = ranked[0]
+        if not math.isfinite(scores[best]['mape']):
+            raise RuntimeError(f"[ERR] Semua kandidat gagal untuk {key}.")
+
+        # Holdout: pemenang vs MODEL_PARAMS apa adanya
+        default = {k: MODEL_PARAMS.get(k, PROPHET_DEFAULTS[k]) for k in grid}
+        (hold_best, hold_default), computed, cpu = evaluate(key, prep, [cands[best], default], [holdout_fold], trials, pool)
+        fits, fit_cpu = fits + computed, fit_cpu + cpu
+    finally:
+        if pool is not None: pool.shutdown()
+
+    # Tuning yang kalah di holdout tidak boleh masuk training produksi
+    improved = hold_best['mape'] < hold_default['mape']
+    result = {
+        "project": key,
+        "params": cands[best] if improved else default,
+        "tuned_params": cands[best],
+        "improved": bool(improved),
+        "mape": scores[best]['mape'],
+        "rmse": scores[best]['rmse'],
+        "folds": n_folds,
+        "holdout_mape": hold_best['mape'],
+        "holdout_mape_default": hold_default['mape'],
+        "rungs": rungs,
+        "fits": fits,
+        "full_grid_fits": len(cands) * len(cutoffs),
+        "prep_s": prep_s,
+        "fit_cpu_s": fit_cpu,
+        "elapsed_s": time.perf_counter() - start,
+        "tuned_at": datetime.now().isoformat(timespec='seconds'),
     }
+    if verbose:
+        print(f"  Holdout MAPE: tuned {hold_best['mape']:.2f}% vs default {hold_default['mape']:.2f}% | "
+              f"{fits} fit, {result['elapsed_s']:.1f}s")
+    if not improved:
+        print(f"[WARN] {key}: tuned params do not beat the defaults on the holdout, keeping the defaults")
+    if save:
+        save_best(key, {k: result[k] for k in ("params", "tuned_params", "improved", "mape", "rmse", "folds",
+                                              "holdout_mape", "holdout_mape_default", "tuned_at")})
+    return result
 
-    # Generate semua kombinasi (4 x 3 x 2 = 24 Kombinasi)
-    all_params = [dict(zip(param_grid.keys(), v)) for v in itertools.product(*param_grid.values())]
-    
-    results = []  
-
-    # 2. Loop Semua Kombinasi
-    print(f"Total Kombinasi yang akan dites: {len(all_params)}")
-    
-    for i, params in enumerate(all_params):
-        print(f"[{i+1}/{len(all_params)}] Testing: {params} ...", end=" ")
-        
-        try:
-            # Setup Model dengan parameter dinamis
-            m = Prophet(**params, holidays=holidays, interval_width=0.95)
-            m.add_country_holidays(country_name='ID')
-            m.add_regressor('headcount')
-            
-            m.fit(df)
-
-            # Ujian (Cross Validation)
-            # Kita perpendek periode ujian biar tuningnya cepat (initial 200 hari)
-            df_cv = cross_validation(m, initial='200 days', period='60 days', horizon='30 days', parallel="processes")
-            
-            # Hitung Error
-            df_p = performance_metrics(df_cv)
-            rmse = df_p['rmse'].mean()
-            mape = df_p['mape'].mean() * 100
-
-            results.append({
-                **params,
-                'rmse': rmse,
-                'mape': mape
-            })
-            print(f"➡️ MAPE: {mape:.2f}%")
-            
-        except Exception as e:
-            print(f"❌ Gagal: {e}")
-
-    # 3. Cari Pemenangnya
-    tuning_results = pd.DataFrame(results)
-    best_params = tuning_results.sort_values('mape').iloc[0]
+def tune_all(pids=None, workers=None, grid=PARAM_GRID, save=True):
+    """Tune every project separately and report what the tuning cost."""
+    rows = []
+    for pid in pids or PROJECT_CONFIGS:
+        df, holidays = get_data(pid)
+        res = tune(df, holidays, pid, grid=grid, workers=workers, save=save)
+        rows.append({"project": pid, **res['params'], "improved": res['improved'], "cv_mape": res['mape'],
+                     "holdout_mape": res['holdout_mape'], "default_mape": res['holdout_mape_default'],
+                     "fits": res['fits'], "fit_cpu_s": res['fit_cpu_s'], "prep_s": res['prep_s'],
+                     "wall_s": res['elapsed_s']})
+    report = pd.DataFrame(rows)
+    os.makedirs(TRIALS_DIR, exist_ok=True)
+    report.to_csv(os.path.join(TRIALS_DIR, 'tuning_report.csv'), index=False)
+    return report
 
+def print_cost(report, workers=None):
+    workers = workers or TUNE_WORKERS
     print("\n" + "="*50)
-    print("🏆 JUARA 1 (SETTINGAN TERBAIK)")
+    print("💰 BIAYA TUNING PER PROJECT")
     print("="*50)
-    print(f"MAPE Terendah : {best_params['mape']:.2f}%")
-    print(f"RMSE Terendah : {best_params['rmse']:.0f}")
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    fresh = report[report['fits'] > 0]   # project yang semua fold-nya dari cache tidak representatif
+    if fresh.empty: return
+    per_fit = fresh['fit_cpu_s'].sum() / fresh['fits'].sum()
+    per_project = fresh['wall_s'].mean()
     print("-" * 30)
-    print("👇 COPY PARAMETER INI KE forecast_engine.py 👇")
-    print(f"changepoint_prior_scale = {best_params['changepoint_prior_scale']}")
-    print(f"seasonality_prior_scale = {best_params['seasonality_prior_scale']}")
-    print(f"seasonality_mode        = '{best_params['seasonality_mode']}'")
+    print(f"Rata-rata: {fresh['fits'].mean():.0f} fit/project, {per_fit:.2f}s CPU/fit, "
+          f"{per_project:.1f}s wall/project ({workers} worker)")
+    for n in (100, 500, 1000):
+        print(f"Estimasi {n:>4} project: {n * per_project / 3600:6.2f} jam wall")
+
+def auto_tune(pids=None, workers=None):
+    print(f"🔧 Memulai Auto-Tuning per project ({len(pids or PROJECT_CONFIGS)} project)...")
+    report = tune_all(pids, workers)
+    print_cost(report, workers)
+    print(f"✅ Disimpan ke {BEST_PARAMS_PATH} (dibaca otomatis oleh forecast_engine.train)")
     print("="*50)
+    return report
 
 if __name__ == "__main__":
-    auto_tune() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Per-project successive-halving Prophet hyperparameter search")
+    parser.add_argument("--project", nargs="*", default=None, help="default: semua PROJECT_CONFIGS")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    auto_tune(args.project, workers=args.workers)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Modul core memakai os.getcwd() sebagai BASE_DIR -> jalankan dari root repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src', 'core'))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'utils'))
@@ -0,0 +1,46 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detector import score_file
+
+TRAIN_CSV = os.path.join('datasets', 'synthetic', 'timesheet_anomaly_train_data.csv')
+
+def test_score_file_replaces_existing_result_columns(tmp_path):
+    out = tmp_path / "scored.csv"
+    stats = score_file(TRAIN_CSV, str(out), chunk_rows=1_000, workers=1, progress=False)
+
+    df = pd.read_csv(out)
+    assert list(df.columns) == ['complexity', 'hist_avg', 'skill', 'duration', 'deviation_ratio', 'score', 'label']
+    assert stats['flagged'] == len(df) and (df['label'] == -1).all()
+
+def test_score_file_failure_keeps_old_output(tmp_path):
+    bad = tmp_path / "bad.csv"
+    pd.read_csv(TRAIN_CSV, nrows=10).drop(columns='duration').to_csv(bad, index=False)
+    out = tmp_path / "scored.csv"
+    out.write_text("old\n")
+
+    with pytest.raises(KeyError):
+        score_file(str(bad), str(out), workers=1, progress=False)
+    assert out.read_text() == "old\n"
+    assert sorted(os.listdir(tmp_path)) == ["bad.csv", "scored.csv"]   # tanpa scored.csv.<pid>.tmp
+
+@pytest.mark.parametrize("max_features, bootstrap", [(0.6, True), (1.0, False)])
+def test_flat_forest_matches_sklearn(max_features, bootstrap):
+    from sklearn.ensemble import IsolationForest
+
+    from forest_arrays import FlatForest
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    X[rng.random(X.shape) < 0.05] = np.nan   # NaN ikut training -> missing_go_to_left terpakai
+    model = IsolationForest(n_estimators=25, max_samples=128, max_features=max_features, bootstrap=bootstrap,
+                            random_state=0).fit(X)
+
+    test = np.vstack([rng.normal(scale=3, size=(300, 5)), X[:50]])
+    test[rng.random(test.shape) < 0.1] = np.nan
+    flat = FlatForest.from_model(model)
+    np.testing.assert_allclose(flat.decision_function(test), model.decision_function(test), rtol=0, atol=1e-12)
+    assert (flat.predict(test) == model.predict(test)).all()
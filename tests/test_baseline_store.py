@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from baseline_store import ALL, PRIOR_HOURS, BaselineStore, training_scale
+
+def test_star_employee_does_not_share_the_aggregate_key():
+    store = BaselineStore()
+    store.update("*", 3, 10.0)
+    store.update_batch(["*", "None"], [3, 3], [10.0, 4.0])
+
+    assert len(store) == 3                          # "*", "None", agregat
+    own = store.stats([store.index[("*", 3)]])
+    agg = store.stats([store.index[(ALL, 3)]])
+    assert own['count'][0] == 2 and agg['count'][0] == 3
+
+def test_snapshot_roundtrip_keeps_aggregate_separate(tmp_path):
+    store = BaselineStore()
+    store.update_batch(["*"] * 6 + ["b"] * 6, [2] * 12, [5.0] * 6 + [3.0] * 6)
+    restored = BaselineStore.load(store.save(str(tmp_path / "snap.npz")))
+
+    assert restored.keys == store.keys
+    pd.testing.assert_frame_equal(restored.lookup(["*", "c"], [2, 2]), store.lookup(["*", "c"], [2, 2]))
+    assert restored.lookup(["c"], [2])['hist_avg'][0] == pytest.approx(4.0)   # rata-rata semua karyawan
+
+def test_training_scale_keeps_ratio_on_training_grid():
+    df = pd.DataFrame({'complexity': [1, 4], 'hist_avg': [3.1, 9.0], 'duration': [6.2, 9.0]})
+    scaled = training_scale(df)
+    assert scaled['hist_avg'].tolist() == [1 * PRIOR_HOURS, 4 * PRIOR_HOURS]
+    np.testing.assert_allclose(scaled['duration'] / scaled['hist_avg'], df['duration'] / df['hist_avg'])
+
+def test_entries_without_employee_are_skipped(capsys):
+    store = BaselineStore()
+    store.update_batch(["a", "a", "b"], [2, 2, 2], [4.0, 4.0, 8.0])
+    before = store.stats([store.index[("b", 2)]])
+
+    store.update_batch(np.array(["a", None, np.nan], dtype=object), [2, 2, np.nan], [4.0, 100.0, 100.0])
+    store.update(None, 2, 100.0)
+    assert "[ERR]" in capsys.readouterr().out
+
+    pd.testing.assert_frame_equal(store.stats([store.index[("b", 2)]]), before)   # "b" tidak ikut tercemar
+    assert store.stats([store.index[(ALL, 2)]])['mean'][0] == pytest.approx(20.0 / 4)
+    assert ("None", 2) not in store.index
+
+    df = pd.DataFrame({'employee_id': ["a", None], 'complexity': [2, 2], 'duration': [4.0, 9.0]})
+    assert store.enrich(df).index.tolist() == [0]
+
+def test_training_scale_guards_missing_hist_avg():
+    df = pd.DataFrame({'complexity': [2, 2], 'hist_avg': [0.0, np.nan], 'duration': [5.0, 6.0]})
+    scaled = training_scale(df)
+    assert scaled['duration'].tolist() == [5.0, 6.0] and scaled['hist_avg'].tolist() == [4.0, 4.0]
@@ -0,0 +1,18 @@
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.getcwd(), 'src', 'core', 'forecast_engine.py')
+
+def run_script(tmp_path, *args):
+    # Scratch cwd: model/cache yang ditulis tidak menyentuh artifact repo
+    (tmp_path / 'datasets').mkdir()
+    (tmp_path / 'datasets' / 'synthetic').symlink_to(os.path.join(os.getcwd(), 'datasets', 'synthetic'))
+    return subprocess.run([sys.executable, SCRIPT, *args], cwd=tmp_path, capture_output=True, text=True,
+                          timeout=600)
+
+def test_quiet_silences_training_log_when_run_as_script(tmp_path):
+    res = run_script(tmp_path, 'single', 'PROJ_DELTA', '--quiet')
+    assert res.returncode == 0, res.stderr
+    assert "REPORT:" in res.stdout
+    assert "Training model" not in res.stdout + res.stderr
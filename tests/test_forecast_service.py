@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+import pytest
+
+from forecast_service import ForecastService, model_history
+
+@pytest.fixture(scope="module")
+def svc():
+    return ForecastService()
+
+def test_model_history_headcount_is_raw(svc):
+    model = svc.get_model('PROJ_ALPHA')
+    raw = svc.history('PROJ_ALPHA')['headcount'].iloc[-1]
+    assert model_history(model)['headcount'].iloc[-1] == pytest.approx(raw, abs=1e-6)
+
+@pytest.mark.parametrize("pid", ['PROJ_ALPHA', 'PROJ_DELTA'])
+def test_default_headcount_matches_explicit(svc, pid):
+    raw = float(svc.history(pid)['headcount'].iloc[-1])
+    assert svc.next_30d(pid) == pytest.approx(svc.next_30d(pid, headcount=raw))
+
+def test_model_only_project_uses_raw_headcount(svc):
+    # PROJ_BSI tidak ada di data store -> history dari model
+    hc = svc.history('PROJ_BSI')['headcount']
+    assert hc.min() > 0 and np.isfinite(hc).all()
+
+def test_numpy_artifact_replaces_prophet_json(tmp_path, monkeypatch):
+    import shutil
+    import engines
+    import forecast_engine
+
+    pid = 'PROJ_ALPHA'
+    monkeypatch.setattr(forecast_engine, 'MODEL_DIR', str(tmp_path))
+    shutil.copy(ForecastService().model_path(pid), tmp_path / f"model_{pid}.json")
+    local = ForecastService(model_dir=str(tmp_path))
+    prophet_fc = local.next_30d(pid)
+
+    df, holidays = forecast_engine.get_data(pid)
+    engine = engines.NumpyEngine().fit(df, holidays)
+    engine.save(pid)
+
+    assert not (tmp_path / f"model_{pid}.json").exists()
+    assert local.projects() == [pid]
+    assert isinstance(local.get_model(pid), engines.NumpyEngine)
+    expected = engine.predict(local.get_model(pid).make_future_dataframe(30, include_history=False)
+                              .assign(headcount=df['headcount'].iloc[-1]))['yhat'].sum()
+    assert local.next_30d(pid) == pytest.approx(expected)
+    assert local.next_30d(pid) != pytest.approx(prophet_fc)
+
+def test_next_30d_matches_run_analysis_window(svc):
+    from forecast_engine import next_window
+
+    pid = 'PROJ_ALPHA'
+    df = svc.history(pid)
+    window = next_window(svc.predict(pid, 90, uncertainty=False), df)
+    assert window['ds'].iloc[0] > df['ds'].max() and len(window) == 30
+    assert window['yhat'].sum() == pytest.approx(svc.next_30d(pid))
+
+def test_stale_model_forecasts_after_last_actual_row(tmp_path, monkeypatch):
+    import engines
+    import forecast_engine
+
+    pid = 'PROJ_DELTA'
+    monkeypatch.setattr(forecast_engine, 'MODEL_DIR', str(tmp_path))
+    df, holidays = forecast_engine.get_data(pid)
+    engine = engines.NumpyEngine().fit(df.iloc[:-20], holidays)   # model 20 hari di belakang data
+    engine.save(pid)
+
+    local = ForecastService(model_dir=str(tmp_path))
+    fc = local.predict(pid, 30, uncertainty=False)
+    assert fc['ds'].iloc[0] == df['ds'].max() + pd.Timedelta(days=1)
+
+    future = pd.DataFrame({'ds': fc['ds'], 'headcount': df['headcount'].iloc[-1]})
+    assert local.next_30d(pid) == pytest.approx(engine.predict(future)['yhat'].sum())
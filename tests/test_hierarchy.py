@@ -0,0 +1,26 @@
+import json
+
+import hierarchy
+
+def test_fingerprint_tracks_data_changes():
+    total, _, pids = hierarchy.aggregate_data()
+    base = hierarchy.fingerprint(total, pids)
+    assert hierarchy.fingerprint(total.copy(), pids) == base
+
+    edited = total.copy()
+    edited.loc[edited.index[-1], 'y'] += 1
+    assert hierarchy.fingerprint(edited, pids) != base
+    assert hierarchy.fingerprint(total.iloc[:-1], pids)['rows'] == base['rows'] - 1
+
+def test_load_top_rejects_stale_model(tmp_path, monkeypatch):
+    model_path, meta_path = tmp_path / "model_TOTAL.json", tmp_path / "model_TOTAL.meta.json"
+    monkeypatch.setattr(hierarchy, 'TOP_MODEL_PATH', str(model_path))
+    monkeypatch.setattr(hierarchy, 'TOP_META_PATH', str(meta_path))
+    model_path.write_text("{}")
+
+    total, _, pids = hierarchy.aggregate_data()
+    current = hierarchy.fingerprint(total, pids)
+    assert hierarchy.load_top(current) is None                    # tanpa fingerprint -> refit
+
+    meta_path.write_text(json.dumps({**current, "rows": current["rows"] - 1}))
+    assert hierarchy.load_top(current) is None
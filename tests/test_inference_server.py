@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from inference_server import InferenceServer, MicroBatcher
+
+def test_cancelled_request_keeps_other_results_aligned():
+    def slow_times_ten(items):
+        time.sleep(0.05)   # request b dibatalkan selagi batch jalan
+        return [x * 10 for x in items]
+
+    async def scenario():
+        batcher = MicroBatcher("t", slow_times_ten, max_batch=100, max_wait_ms=20)
+        batcher.start()
+        a = asyncio.ensure_future(batcher.submit([1, 2]))
+        b = asyncio.ensure_future(batcher.submit([3]))
+        c = asyncio.ensure_future(batcher.submit([4, 5]))
+        await asyncio.sleep(0.03)   # batch sudah diambil worker
+        b.cancel()
+        res = await asyncio.gather(a, c)
+        assert b.cancelled() and batcher.batches == 1
+        return res
+
+    assert asyncio.run(scenario()) == [[10, 20], [40, 50]]
+
+def test_bad_content_length_gets_400():
+    async def scenario():
+        server = InferenceServer(categorizer=object(), detector=object())
+        srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        async with srv:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /categorize HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\n")
+            await writer.drain()
+            status = (await reader.readline()).split()[1]
+            rest = await reader.read()   # server menutup koneksi setelah jawab
+            writer.close()
+        return int(status), rest
+
+    status, rest = asyncio.run(scenario())
+    assert status == 400
+    assert b"Connection: close" in rest and b"bad content-length" in rest
@@ -0,0 +1,22 @@
+import pytest
+
+from task_categorizer import normalize_text
+
+@pytest.mark.parametrize("text, key", [
+    ("Tolong  FIX bug login  hari ini", "fix bug login"),
+    ("sedang lanjut deploy ke server untuk klien secepatnya", "deploy ke server"),
+    ("tolong hari ini", "tolong hari ini"),            # semua filler -> utuh
+    ("progress report", "progress report"),            # sisa 1 kata -> bukan filler
+    ("presentasi progress", "presentasi progress"),    # prefix filler di akhir tidak dibuang
+    ("tolong deploy pending", "tolong deploy pending"),
+    ("cekout keranjang belanja", "cekout keranjang belanja"),   # "cek" harus kata utuh
+    ("update sertifikat ssl hari inipun", "update sertifikat ssl hari inipun"),
+    ("", ""),
+])
+def test_normalize_text_edge_cases(text, key):
+    assert normalize_text(text) == key
+
+def test_variants_share_a_key():
+    keys = {normalize_text(t) for t in ["setup ci/cd", "tolong setup ci/cd", "setup ci/cd di production",
+                                        "urgent cek setup ci/cd besok pending"]}
+    assert keys == {"setup ci/cd"}
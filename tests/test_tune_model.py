@@ -0,0 +1,26 @@
+import pytest
+
+import tune_model
+from forecast_engine import get_data
+
+@pytest.mark.parametrize("tuned, default, improved", [(10.0, 5.0, False), (4.0, 5.0, True)])
+def test_only_saves_params_that_beat_the_defaults(monkeypatch, capsys, tuned, default, improved):
+    saved = {}
+
+    def fake_evaluate(key, prep, cands, folds, trials, pool=None):
+        if list(folds) == [len(prep['cutoffs'])]:   # holdout: pemenang vs default
+            return [{'mape': tuned, 'rmse': 1.0}, {'mape': default, 'rmse': 1.0}], 0, 0.0
+        return [{'mape': 1.0 + i, 'rmse': 1.0} for i in range(len(cands))], 0, 0.0
+
+    monkeypatch.setattr(tune_model, 'evaluate', fake_evaluate)
+    monkeypatch.setattr(tune_model, 'load_trials', lambda key: {})
+    monkeypatch.setattr(tune_model, 'save_best', lambda key, entry: saved.update({key: entry}))
+
+    df, holidays = get_data('PROJ_DELTA')
+    res = tune_model.tune(df, holidays, 'PROJ_DELTA', workers=1, verbose=False)
+
+    default_params = {k: tune_model.MODEL_PARAMS.get(k, tune_model.PROPHET_DEFAULTS[k]) for k in tune_model.PARAM_GRID}
+    entry = saved['PROJ_DELTA']
+    assert entry['improved'] is improved and res['improved'] is improved
+    assert entry['params'] == (entry['tuned_params'] if improved else default_params)
+    assert ("[WARN]" in capsys.readouterr().out) is not improved